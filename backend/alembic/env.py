@@ -28,6 +28,11 @@ import app.models.report         # noqa: F401
 import app.models.admin_log      # noqa: F401
 import app.models.system_setting # noqa: F401
 import app.models.saved_search   # noqa: F401
+import app.models.user_block     # noqa: F401
+import app.models.badge_counter  # noqa: F401
+import app.models.ws_presence    # noqa: F401
+import app.models.outbox_job     # noqa: F401
+import app.models.job_run        # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -42,12 +47,29 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# Full-text search objects are managed by raw DDL in migration d1a7e4c93f20
+# and are not mapped on the models; keep autogenerate from trying to drop them.
+SEARCH_COLUMNS = {"search_vector"}
+SEARCH_TABLES = {"listings_fts", "requests_fts"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "column" and name in SEARCH_COLUMNS:
+        return False
+    # FTS5 also creates shadow tables such as listings_fts_data
+    if type_ == "table" and any(name == t or name.startswith(f"{t}_") for t in SEARCH_TABLES):
+        return False
+    if type_ == "index" and name in {"ix_listings_search_vector", "ix_requests_search_vector"}:
+        return False
+    return True
+
 
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -67,6 +89,7 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
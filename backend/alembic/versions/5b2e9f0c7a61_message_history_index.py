@@ -0,0 +1,31 @@
+"""message_history_index
+
+Revision ID: 5b2e9f0c7a61
+Revises: e83b5f1d2a64
+Create Date: 2026-10-17 15:02:37.410922
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9f0c7a61'
+down_revision: Union[str, Sequence[str], None] = 'e83b5f1d2a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index message history pages (conversation, then id)."""
+    op.create_index(
+        'ix_messages_conversation_id_id', 'messages', ['conversation_id', 'id'],
+        unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Drop the message history index."""
+    op.drop_index('ix_messages_conversation_id_id', table_name='messages', if_exists=True)
@@ -0,0 +1,71 @@
+"""conversation_summaries
+
+Revision ID: a3c1f7e9d245
+Revises: 5b2e9f0c7a61
+Create Date: 2026-10-17 16:21:08.553190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c1f7e9d245'
+down_revision: Union[str, Sequence[str], None] = '5b2e9f0c7a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREVIEW_LENGTH = 120
+
+BACKFILL_SQL = """
+    INSERT INTO conversation_summaries
+        (conversation_id, user_id, last_message_id, last_message_preview, last_activity_at, unread_count)
+    SELECT c.id, c.{role}_id, lm.id, substr(lm.text, 1, {preview}),
+           coalesce(lm.created_at, c.created_at, CURRENT_TIMESTAMP),
+           (SELECT count(*) FROM messages m
+            WHERE m.conversation_id = c.id AND m.sender_id != c.{role}_id AND m.is_read = false)
+    FROM conversations c
+    LEFT JOIN messages lm ON lm.id = (
+        SELECT max(m.id) FROM messages m
+        WHERE m.conversation_id = c.id AND m.hidden_by_{role} IS NOT true
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM conversation_summaries s
+        WHERE s.conversation_id = c.id AND s.user_id = c.{role}_id
+    )
+"""
+
+
+def upgrade() -> None:
+    """Add per-participant conversation summaries for the inbox and backfill them."""
+    op.create_table(
+        'conversation_summaries',
+        sa.Column('conversation_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('last_message_id', sa.Integer(), nullable=True),
+        sa.Column('last_message_preview', sa.String(), nullable=True),
+        sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['last_message_id'], ['messages.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('conversation_id', 'user_id'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_conversation_summaries_inbox', 'conversation_summaries',
+        ['user_id', sa.text('last_activity_at DESC'), sa.text('conversation_id DESC')],
+        unique=False, if_not_exists=True
+    )
+    conn = op.get_bind()
+    for role in ("buyer", "seller"):
+        conn.execute(text(BACKFILL_SQL.format(role=role, preview=PREVIEW_LENGTH)))
+
+
+def downgrade() -> None:
+    """Drop the conversation summaries."""
+    op.drop_index('ix_conversation_summaries_inbox', table_name='conversation_summaries', if_exists=True)
+    op.drop_table('conversation_summaries')
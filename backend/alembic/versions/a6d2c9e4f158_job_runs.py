@@ -0,0 +1,44 @@
+"""job_runs
+
+Revision ID: a6d2c9e4f158
+Revises: f2c8e4a1d637
+Create Date: 2026-10-17 22:02:41.775190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2c9e4f158'
+down_revision: Union[str, Sequence[str], None] = 'f2c8e4a1d637'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the history of scheduled job runs."""
+    op.create_table(
+        'job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job', sa.String(length=50), nullable=False),
+        sa.Column('worker_id', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('duration_ms', sa.Float(), nullable=False),
+        sa.Column('rows_processed', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index(op.f('ix_job_runs_id'), 'job_runs', ['id'], unique=False, if_not_exists=True)
+    op.create_index('ix_job_runs_job_started_at', 'job_runs', ['job', 'started_at'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Drop the job history."""
+    op.drop_index('ix_job_runs_job_started_at', table_name='job_runs')
+    op.drop_index(op.f('ix_job_runs_id'), table_name='job_runs')
+    op.drop_table('job_runs')
@@ -1,7 +1,7 @@
 """initial schema
 
 Revision ID: b24f6e52988d
-Revises: 
+Revises: 0a1f3c5e7b92
 Create Date: 2026-02-27 17:30:56.347914
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = 'b24f6e52988d'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '0a1f3c5e7b92'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
@@ -0,0 +1,36 @@
+"""badge_counters
+
+Revision ID: b7d4e2a9c613
+Revises: a3c1f7e9d245
+Create Date: 2026-10-17 17:48:55.031274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4e2a9c613'
+down_revision: Union[str, Sequence[str], None] = 'a3c1f7e9d245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add per-user unread notification counters (rows are computed lazily on first read)."""
+    op.create_table(
+        'badge_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_notifications', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Drop the badge counters."""
+    op.drop_table('badge_counters')
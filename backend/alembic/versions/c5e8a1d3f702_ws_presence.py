@@ -0,0 +1,37 @@
+"""ws_presence
+
+Revision ID: c5e8a1d3f702
+Revises: b7d4e2a9c613
+Create Date: 2026-10-17 19:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a1d3f702'
+down_revision: Union[str, Sequence[str], None] = 'b7d4e2a9c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add WebSocket presence rows for the Postgres backplane."""
+    op.create_table(
+        'ws_presence',
+        sa.Column('worker_id', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('seen_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('worker_id', 'user_id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_ws_presence_user_id_seen_at', 'ws_presence', ['user_id', 'seen_at'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Drop the presence table."""
+    op.drop_index('ix_ws_presence_user_id_seen_at', table_name='ws_presence')
+    op.drop_table('ws_presence')
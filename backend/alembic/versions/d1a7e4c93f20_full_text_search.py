@@ -0,0 +1,97 @@
+"""full_text_search
+
+Revision ID: d1a7e4c93f20
+Revises: c7bb95785938
+Create Date: 2026-10-17 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1a7e4c93f20'
+down_revision: Union[str, Sequence[str], None] = 'c7bb95785938'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCHABLE_TABLES = ("listings", "requests")
+
+
+def _upgrade_postgresql(conn) -> None:
+    # unaccent is STABLE, so it can't be used in a generated column directly;
+    # pin the dictionary and wrap it in an IMMUTABLE function.
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """))
+    for table in SEARCHABLE_TABLES:
+        # 'simple' config: no language-specific stemming, so French and English
+        # titles tokenize the same way. Title matches outrank description matches.
+        conn.execute(text(f"""
+            ALTER TABLE {table} ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', immutable_unaccent(coalesce(title, ''))), 'A') ||
+                setweight(to_tsvector('simple', immutable_unaccent(coalesce(description, ''))), 'B')
+            ) STORED
+        """))
+        conn.execute(text(f"CREATE INDEX ix_{table}_search_vector ON {table} USING GIN (search_vector)"))
+
+
+def _upgrade_sqlite(conn) -> None:
+    for table in SEARCHABLE_TABLES:
+        fts = f"{table}_fts"
+        conn.execute(text(f"""
+            CREATE VIRTUAL TABLE {fts} USING fts5(
+                title, description,
+                content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """))
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        conn.execute(text(f"""
+            CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description);
+            END
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+            END
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER {fts}_au AFTER UPDATE OF title, description ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description);
+            END
+        """))
+
+
+def upgrade() -> None:
+    """Add full-text search indexes on listings and requests (tsvector + GIN, or FTS5 on SQLite)."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        _upgrade_postgresql(conn)
+    elif conn.dialect.name == "sqlite":
+        _upgrade_sqlite(conn)
+
+
+def downgrade() -> None:
+    """Drop the full-text search indexes."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        for table in SEARCHABLE_TABLES:
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_search_vector"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"))
+        conn.execute(text("DROP FUNCTION IF EXISTS immutable_unaccent(text)"))
+    elif conn.dialect.name == "sqlite":
+        for table in SEARCHABLE_TABLES:
+            fts = f"{table}_fts"
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
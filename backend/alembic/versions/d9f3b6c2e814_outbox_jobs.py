@@ -0,0 +1,44 @@
+"""outbox_jobs
+
+Revision ID: d9f3b6c2e814
+Revises: c5e8a1d3f702
+Create Date: 2026-10-17 20:05:12.604911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f3b6c2e814'
+down_revision: Union[str, Sequence[str], None] = 'c5e8a1d3f702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the outbox for background side effects (push, email, notifications)."""
+    op.create_table(
+        'outbox_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index(op.f('ix_outbox_jobs_id'), 'outbox_jobs', ['id'], unique=False, if_not_exists=True)
+    op.create_index('ix_outbox_jobs_status_run_at', 'outbox_jobs', ['status', 'run_at'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Drop the outbox."""
+    op.drop_index('ix_outbox_jobs_status_run_at', table_name='outbox_jobs')
+    op.drop_index(op.f('ix_outbox_jobs_id'), table_name='outbox_jobs')
+    op.drop_table('outbox_jobs')
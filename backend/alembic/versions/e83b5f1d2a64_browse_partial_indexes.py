@@ -0,0 +1,53 @@
+"""browse_partial_indexes
+
+Revision ID: e83b5f1d2a64
+Revises: d1a7e4c93f20
+Create Date: 2026-10-17 11:40:02.118764
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e83b5f1d2a64'
+down_revision: Union[str, Sequence[str], None] = 'd1a7e4c93f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match the predicate get_listings emits (see Listing.__table_args__), otherwise
+# the planner can't prove the partial index covers the query.
+BROWSE_WHERE = dict(
+    postgresql_where=sa.text("is_active = true AND is_sold = false"),
+    sqlite_where=sa.text("is_active = 1 AND is_sold = 0"),
+)
+
+BROWSE_INDEXES = {
+    # sort=newest / oldest (backward scan), and the created_at tiebreak of the boost sort
+    "ix_listings_browse_created": ["created_at DESC", "id DESC"],
+    # sort=price_asc / price_desc
+    "ix_listings_browse_price": ["price", "id"],
+    # same two orders with the category filter as an equality prefix
+    "ix_listings_browse_category_created": ["category", "created_at DESC", "id DESC"],
+    "ix_listings_browse_category_price": ["category", "price", "id"],
+}
+
+
+def upgrade() -> None:
+    """Add partial indexes for the active, unsold browse filter and its sort orders."""
+    for name, columns in BROWSE_INDEXES.items():
+        op.create_index(
+            name, 'listings', [sa.text(c) for c in columns],
+            unique=False, if_not_exists=True, **BROWSE_WHERE
+        )
+    # University filter joins users on university
+    op.create_index('ix_users_university', 'users', ['university'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Drop the browse indexes."""
+    op.drop_index('ix_users_university', table_name='users', if_exists=True)
+    for name in reversed(list(BROWSE_INDEXES)):
+        op.drop_index(name, table_name='listings', if_exists=True)
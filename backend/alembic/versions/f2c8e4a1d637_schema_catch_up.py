@@ -0,0 +1,86 @@
+"""schema catch-up from app startup
+
+Revision ID: f2c8e4a1d637
+Revises: d9f3b6c2e814
+Create Date: 2026-10-17 21:14:52.093517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8e4a1d637'
+down_revision: Union[str, Sequence[str], None] = 'd9f3b6c2e814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Columns app/main.py used to ALTER in on every import without a migration
+CATCH_UP_COLUMNS = [
+    ('listings', sa.Column('original_price', sa.Float(), nullable=True)),
+    ('listings', sa.Column('view_count', sa.Integer(), nullable=True)),
+    ('users', sa.Column('push_token', sa.String(), nullable=True)),
+    ('users', sa.Column('referral_code', sa.String(), nullable=True)),
+    ('users', sa.Column('referred_by_id', sa.Integer(), nullable=True)),
+    ('users', sa.Column('boost_credits', sa.Integer(), nullable=True)),
+    ('messages', sa.Column('hidden_by_buyer', sa.Boolean(), nullable=True)),
+    ('messages', sa.Column('hidden_by_seller', sa.Boolean(), nullable=True)),
+    ('messages', sa.Column('image_url', sa.String(), nullable=True)),
+]
+
+
+def upgrade() -> None:
+    """Move the DDL the app ran at import time into the migration history.
+
+    Databases built by 0a1f3c5e7b92, or that went through app startup, already have all
+    of this; it is for ones that were only ever upgraded by Alembic. Every step only
+    applies what is missing.
+    """
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    for table, column in CATCH_UP_COLUMNS:
+        if column.name not in {c['name'] for c in inspector.get_columns(table)}:
+            op.add_column(table, column)
+            if column.name == 'referral_code':
+                op.create_index(op.f('ix_users_referral_code'), 'users', ['referral_code'], unique=True)
+
+    if 'reply_to_id' not in {c['name'] for c in inspector.get_columns('messages')}:
+        with op.batch_alter_table('messages') as batch_op:
+            batch_op.add_column(sa.Column('reply_to_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(
+                'messages_reply_to_id_fkey', 'messages', ['reply_to_id'], ['id'], ondelete='SET NULL'
+            )
+
+    if conn.dialect.name == 'postgresql':
+        # ADD VALUE can't run inside a transaction block before PG 12
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE transactionstatus ADD VALUE IF NOT EXISTS 'disputed'")
+
+    if not inspector.has_table('user_blocks'):
+        op.create_table('user_blocks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('blocker_id', sa.Integer(), nullable=False),
+        sa.Column('blocked_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['blocked_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['blocker_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('blocker_id', 'blocked_id', name='uq_user_block')
+        )
+        op.create_index(op.f('ix_user_blocks_id'), 'user_blocks', ['id'], unique=False)
+        op.create_index(op.f('ix_user_blocks_blocker_id'), 'user_blocks', ['blocker_id'], unique=False)
+        op.create_index(op.f('ix_user_blocks_blocked_id'), 'user_blocks', ['blocked_id'], unique=False)
+
+    # Default system settings
+    op.execute(
+        "INSERT INTO system_settings (key, value) SELECT 'sponsored_pins_in_all', 'false' "
+        "WHERE NOT EXISTS (SELECT 1 FROM system_settings WHERE key = 'sponsored_pins_in_all')"
+    )
+
+
+def downgrade() -> None:
+    """Nothing to undo: databases built by app startup had all of this before the revision existed."""
@@ -20,6 +20,19 @@ class Settings(BaseSettings):
     stripe_webhook_secret: Optional[str] = None
     sentry_dsn: Optional[str] = None
     super_admin_email: Optional[str] = None
+    redis_url: Optional[str] = None
+    ws_backplane: Optional[str] = None
+    expo_api_url: Optional[str] = None
+    expo_access_token: Optional[str] = None
+    bcrypt_rounds: int = 12
+    password_pool_workers: Optional[int] = None
+    threadpool_size: int = 40
+    db_pool_size: int = 10
+    db_max_overflow: Optional[int] = None
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000
 
     model_config = ConfigDict(env_file=".env", extra='ignore')
 
@@ -1,22 +1,55 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .utils.db_pool import engine_options, instrument
 
 # PostgreSQL doesn't need check_same_thread, only SQLite does
 connect_args = {}
 if settings.database_url.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(settings.database_url, connect_args=connect_args)
+# Pool sizing, pre-ping, recycle and the PostgreSQL statement timeout come from settings (utils/db_pool.py)
+engine = create_engine(settings.database_url, connect_args=connect_args, **engine_options(settings.database_url, "sync"))
+instrument(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def _async_url(url: str):
+    """The same database through its asyncio driver: asyncpg for PostgreSQL, aiosqlite for SQLite."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+        # libpq's sslmode is called ssl in asyncpg
+        if "sslmode" in url.query:
+            url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+        return url
+    return url
+
+
+# Used by the async endpoints (messages, WebSocket) so their queries don't block the event loop.
+# Objects stay loaded after commit: an expired attribute can't be lazily refreshed from async code.
+async_engine = create_async_engine(_async_url(settings.database_url), **engine_options(settings.database_url, "async"))
+instrument(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
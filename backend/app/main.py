@@ -1,32 +1,34 @@
 import os
-import sentry_sdk
-from sentry_sdk.integrations.fastapi import FastApiIntegration
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+import asyncio
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from .utils.limiter import limiter
-from sqlalchemy import text, inspect
-from .database import engine, Base, SessionLocal
+from .utils.view_counter import flush_views, VIEW_FLUSH_INTERVAL_SECONDS
+from .utils import badges
+from .database import async_engine, SessionLocal
 from .routers import auth, listings, requests, messages, upload, reviews, users, transactions, admin, notifications, announcements, payments, saved, ws, saved_searches
 from .models.user import User
 from .models.listing import Listing
-from .models.notification import Notification, NotificationRead
-from .models.announcement import Announcement, AnnouncementDismissal
-from .models.report import Report
-from .models.admin_log import AdminLog
-from .models.system_setting import SystemSetting
-from .models.saved_listing import SavedListing
 from .models.saved_search import SavedSearch
-from .models.user_block import UserBlock
+from .utils.ws_backplane import create_backplane
+from .utils.outbox import start_outbox_worker, stop_outbox_worker
+from .utils.push import dispatcher as push_dispatcher
+from .utils.passwords import start_password_pool, stop_password_pool
+from .utils.db_pool import THREADPOOL_SIZE
+from .utils.scheduling import leader_job, release_leadership
 
-# Create database tables (new tables are auto-created here)
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic (`alembic upgrade head`, the Procfile release step):
+# importing the app runs no DDL and doesn't touch the database.
 
-# Sentry error monitoring (only active when SENTRY_DSN env var is set)
+# Sentry error monitoring (only active when SENTRY_DSN env var is set, and only imported then)
 from .config import settings as _settings
 if _settings.sentry_dsn:
+    import sentry_sdk
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
     sentry_sdk.init(
         dsn=_settings.sentry_dsn,
         integrations=[FastApiIntegration(), SqlalchemyIntegration()],
@@ -35,139 +37,6 @@ if _settings.sentry_dsn:
         send_default_pii=False,
     )
 
-# Migrate: add new columns to existing tables if they don't exist
-with engine.connect() as conn:
-    inspector = inspect(engine)
-    existing_columns = [col["name"] for col in inspector.get_columns("users")]
-    listing_columns = [col["name"] for col in inspector.get_columns("listings")]
-    transaction_columns = [col["name"] for col in inspector.get_columns("transactions")]
-
-    # Listing boost columns
-    if "is_boosted" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN is_boosted BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "boosted_at" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN boosted_at TIMESTAMP WITH TIME ZONE"))
-        conn.commit()
-    if "boosted_until" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN boosted_until TIMESTAMP WITH TIME ZONE"))
-        conn.commit()
-
-    # Listing expiry & bump columns
-    if "expires_at" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN expires_at TIMESTAMP WITH TIME ZONE"))
-        conn.commit()
-    if "last_bumped_at" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN last_bumped_at TIMESTAMP WITH TIME ZONE"))
-        conn.commit()
-    if "expiry_email_sent" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN expiry_email_sent BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "review_prompt_sent" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN review_prompt_sent BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "original_price" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN original_price FLOAT"))
-        conn.commit()
-    if "view_count" not in listing_columns:
-        conn.execute(text("ALTER TABLE listings ADD COLUMN view_count INTEGER DEFAULT 0"))
-        conn.commit()
-
-    # Transaction payment columns
-    if "payment_method" not in transaction_columns:
-        conn.execute(text("ALTER TABLE transactions ADD COLUMN payment_method VARCHAR DEFAULT 'cash'"))
-        conn.commit()
-    if "stripe_payment_intent_id" not in transaction_columns:
-        conn.execute(text("ALTER TABLE transactions ADD COLUMN stripe_payment_intent_id VARCHAR"))
-        conn.commit()
-    if "payment_status" not in transaction_columns:
-        conn.execute(text("ALTER TABLE transactions ADD COLUMN payment_status VARCHAR"))
-        conn.commit()
-    if "seller_confirmed_at" not in transaction_columns:
-        conn.execute(text("ALTER TABLE transactions ADD COLUMN seller_confirmed_at TIMESTAMP WITH TIME ZONE"))
-        conn.commit()
-
-    # Add DISPUTED value to transactionstatus enum if not present
-    try:
-        conn.execute(text("ALTER TYPE transactionstatus ADD VALUE IF NOT EXISTS 'disputed'"))
-        conn.commit()
-    except Exception:
-        conn.rollback()
-
-    # Notification personal recipient column
-    notification_columns = [col["name"] for col in inspector.get_columns("notifications")]
-    if "recipient_user_id" not in notification_columns:
-        conn.execute(text("ALTER TABLE notifications ADD COLUMN recipient_user_id INTEGER REFERENCES users(id)"))
-        conn.commit()
-
-    # Referral columns
-    if "referral_code" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN referral_code VARCHAR UNIQUE"))
-        conn.commit()
-    if "referred_by_id" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN referred_by_id INTEGER"))
-        conn.commit()
-    if "boost_credits" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN boost_credits INTEGER DEFAULT 0"))
-        conn.commit()
-
-    # User columns
-    if "is_admin" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN is_admin BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "is_suspended" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN is_suspended BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "is_super_admin" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN is_super_admin BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "is_sponsor" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN is_sponsor BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "sponsored_category" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN sponsored_category VARCHAR"))
-        conn.commit()
-    if "sponsored_universities" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN sponsored_universities VARCHAR"))
-        conn.commit()
-    if "avatar_url" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN avatar_url VARCHAR"))
-        conn.commit()
-    if "push_token" not in existing_columns:
-        conn.execute(text("ALTER TABLE users ADD COLUMN push_token VARCHAR"))
-        conn.commit()
-
-    # Message hidden-by columns
-    message_columns = [col["name"] for col in inspector.get_columns("messages")]
-    if "hidden_by_buyer" not in message_columns:
-        conn.execute(text("ALTER TABLE messages ADD COLUMN hidden_by_buyer BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "hidden_by_seller" not in message_columns:
-        conn.execute(text("ALTER TABLE messages ADD COLUMN hidden_by_seller BOOLEAN DEFAULT FALSE"))
-        conn.commit()
-    if "reply_to_id" not in message_columns:
-        conn.execute(text("ALTER TABLE messages ADD COLUMN reply_to_id INTEGER REFERENCES messages(id) ON DELETE SET NULL"))
-        conn.commit()
-    if "image_url" not in message_columns:
-        conn.execute(text("ALTER TABLE messages ADD COLUMN image_url TEXT"))
-        conn.commit()
-
-    # Request university column
-    request_columns = [col["name"] for col in inspector.get_columns("requests")]
-    if "university" not in request_columns:
-        conn.execute(text("ALTER TABLE requests ADD COLUMN university VARCHAR"))
-        conn.commit()
-
-    # Seed default system settings
-    existing_setting = conn.execute(
-        text("SELECT key FROM system_settings WHERE key = 'sponsored_pins_in_all'")
-    ).fetchone()
-    if not existing_setting:
-        conn.execute(
-            text("INSERT INTO system_settings (key, value) VALUES ('sponsored_pins_in_all', 'false')")
-        )
-        conn.commit()
-
 
 # Seed super admin user
 def seed_admin():
@@ -189,8 +58,6 @@ def seed_admin():
     finally:
         db.close()
 
-seed_admin()
-
 
 # APScheduler: daily job to send expiry warning emails and deactivate expired listings
 def run_expiry_job():
@@ -231,14 +98,16 @@ def run_expiry_job():
                     listing_title=listing.title,
                     listing_id=listing.id,
                     days_left=days_left,
+                    db=db,
                 )
                 listing.expiry_email_sent = True
         if expiring_soon:
             db.commit()
             print(f"[expiry] Sent warning emails for {len(expiring_soon)} listing(s).")
-    except Exception as e:
+        return len(expired) + len(expiring_soon)
+    except Exception:
         db.rollback()
-        print(f"[expiry] Job error: {e}")
+        raise
     finally:
         db.close()
 
@@ -246,8 +115,8 @@ def run_expiry_job():
 # APScheduler: every-4-hour job to alert users about new listings matching saved searches
 def run_saved_search_job():
     from datetime import datetime, timezone
-    from sqlalchemy import and_, or_, ilike
     from .utils.email import send_saved_search_alert_email
+    from .utils.search import apply_search
     from .routers.notifications import send_user_notification
     from .config import settings
 
@@ -267,10 +136,7 @@ def run_saved_search_job():
                 Listing.created_at > since,
             )
             if search.query:
-                term = f"%{search.query}%"
-                query = query.filter(
-                    or_(Listing.title.ilike(term), Listing.description.ilike(term))
-                )
+                query, _ = apply_search(db, query, Listing, search.query)
             if search.category:
                 query = query.filter(Listing.category == search.category)
             if search.min_price is not None:
@@ -302,14 +168,16 @@ def run_saved_search_job():
                     search_desc=search_desc,
                     match_count=matches,
                     frontend_url=frontend_url,
+                    db=db,
                 )
                 search.last_notified_at = now
 
         db.commit()
         print(f"[saved-search] Job ran, checked {len(searches)} saved search(es).")
-    except Exception as e:
+        return len(searches)
+    except Exception:
         db.rollback()
-        print(f"[saved-search] Job error: {e}")
+        raise
     finally:
         db.close()
 
@@ -334,6 +202,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
@@ -354,15 +223,29 @@ app.include_router(ws.router)
 app.include_router(saved_searches.router)
 
 
+@app.on_event("startup")
+async def size_threadpool():
+    """Sync endpoints run in anyio's threadpool; the sync DB pool is sized to match it."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+def promote_super_admin():
+    seed_admin()
+
+
 @app.on_event("startup")
 def start_scheduler():
     """Start APScheduler to run daily listing expiry jobs."""
     try:
         from apscheduler.schedulers.background import BackgroundScheduler
         scheduler = BackgroundScheduler()
+        # Every worker schedules these; only the leader runs them (utils/scheduling.py)
         # Run daily at 06:00 UTC
-        scheduler.add_job(run_expiry_job, "cron", hour=6, minute=0)
-        scheduler.add_job(run_saved_search_job, "interval", hours=4)
+        scheduler.add_job(leader_job("expiry", run_expiry_job), "cron", hour=6, minute=0)
+        scheduler.add_job(leader_job("saved-search", run_saved_search_job), "interval", hours=4)
+        # Each worker flushes its own buffered views
+        scheduler.add_job(flush_views, "interval", seconds=VIEW_FLUSH_INTERVAL_SECONDS)
         scheduler.start()
         print("[scheduler] Expiry job scheduled (daily at 06:00 UTC). Saved search job scheduled (every 4 hours).")
     except ImportError:
@@ -371,6 +254,73 @@ def start_scheduler():
         print(f"[scheduler] Failed to start: {e}")
 
 
+@app.on_event("startup")
+async def bind_badge_pushes():
+    """Let sessions committed in worker threads schedule `badges` WebSocket pushes on this loop."""
+    badges.bind_event_loop(asyncio.get_running_loop())
+
+
+@app.on_event("startup")
+async def start_ws_backplane():
+    """Fan WebSocket events out to (and receive them from) the other workers."""
+    await ws.manager.start(create_backplane())
+
+
+@app.on_event("startup")
+def start_outbox():
+    """Run background side effects (push, email, notifications) committed to the outbox."""
+    start_outbox_worker()
+
+
+@app.on_event("startup")
+def start_push_dispatcher():
+    """Send Expo pushes in batches and check their receipts."""
+    push_dispatcher.start()
+
+
+@app.on_event("startup")
+def start_password_hashing():
+    """bcrypt runs in its own processes so auth bursts don't take the shared threadpool."""
+    start_password_pool()
+
+
+@app.on_event("shutdown")
+def stop_password_hashing():
+    stop_password_pool()
+
+
+@app.on_event("shutdown")
+def stop_outbox():
+    stop_outbox_worker()
+
+
+@app.on_event("shutdown")
+def stop_push_dispatcher():
+    # After the outbox, so pushes queued by its last jobs still go out
+    push_dispatcher.stop()
+
+
+@app.on_event("shutdown")
+def step_down_as_scheduler_leader():
+    release_leadership()
+
+
+@app.on_event("shutdown")
+def flush_buffered_views():
+    """Write out listing views still buffered in memory."""
+    flush_views()
+
+
+@app.on_event("shutdown")
+async def stop_ws_backplane():
+    await ws.manager.stop()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
+
 @app.get("/")
 def read_root():
     return {"message": "UniCycle API is running!", "version": "1.0.0"}
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class BadgeCounter(Base):
+    """Per-user unread notification counter behind GET /me/badges (see utils/badges.py)"""
+    __tablename__ = "badge_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_notifications = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
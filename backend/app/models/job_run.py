@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Index
+from ..database import Base
+
+
+class JobRun(Base):
+    """One run of a scheduled job on the leader worker (see utils/scheduling.py)"""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String(50), nullable=False)
+    worker_id = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False)            # succeeded | failed
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    rows_processed = Column(Integer, nullable=True)        # whatever the job counts as its unit of work
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_job_runs_job_started_at", "job", "started_at"),
+    )
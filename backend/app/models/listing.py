@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -48,4 +48,21 @@ class Listing(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    seller = relationship("User", backref="listings")
\ No newline at end of file
+    seller = relationship("User", backref="listings")
+
+    # Partial indexes for the browse hot path (migration e83b5f1d2a64). The WHERE clause
+    # must match what get_listings emits for is_active/is_sold so the planner can use them.
+    __table_args__ = (
+        Index("ix_listings_browse_created", created_at.desc(), id.desc(),
+              postgresql_where=text("is_active = true AND is_sold = false"),
+              sqlite_where=text("is_active = 1 AND is_sold = 0")),
+        Index("ix_listings_browse_price", price, id,
+              postgresql_where=text("is_active = true AND is_sold = false"),
+              sqlite_where=text("is_active = 1 AND is_sold = 0")),
+        Index("ix_listings_browse_category_created", category, created_at.desc(), id.desc(),
+              postgresql_where=text("is_active = true AND is_sold = false"),
+              sqlite_where=text("is_active = 1 AND is_sold = 0")),
+        Index("ix_listings_browse_category_price", category, price, id,
+              postgresql_where=text("is_active = true AND is_sold = false"),
+              sqlite_where=text("is_active = 1 AND is_sold = 0")),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -30,6 +30,7 @@ class Conversation(Base):
     buyer = relationship("User", foreign_keys=[buyer_id], backref="conversations_as_buyer")
     seller = relationship("User", foreign_keys=[seller_id], backref="conversations_as_seller")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", order_by="Message.created_at")
+    summaries = relationship("ConversationSummary", back_populates="conversation", cascade="all, delete-orphan")
 
 
 class Message(Base):
@@ -62,4 +63,35 @@ class Message(Base):
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", backref="sent_messages")
-    reply_to = relationship("Message", foreign_keys=[reply_to_id], remote_side="Message.id", lazy="joined")
\ No newline at end of file
+    reply_to = relationship("Message", foreign_keys=[reply_to_id], remote_side="Message.id", lazy="joined")
+
+    # Message history pages by id within a conversation (migration 5b2e9f0c7a61)
+    __table_args__ = (
+        Index("ix_messages_conversation_id_id", conversation_id, id),
+    )
+
+
+class ConversationSummary(Base):
+    """Per-participant inbox row: last visible message and unread count (see utils/inbox.py)"""
+    __tablename__ = "conversation_summaries"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # Last message this participant can see (their hidden messages are skipped)
+    last_message_id = Column(Integer, ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
+    last_message_preview = Column(String, nullable=True)
+    # Inbox sort key: time of the last message, or of the conversation if it has none
+    last_activity_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Messages from the other participant not yet read by this one
+    unread_count = Column(Integer, nullable=False, default=0)
+
+    # Relationships
+    conversation = relationship("Conversation", back_populates="summaries")
+    last_message = relationship("Message", foreign_keys=[last_message_id])
+
+    # Inbox query: a user's conversations, most recent first (migration a3c1f7e9d245)
+    __table_args__ = (
+        Index("ix_conversation_summaries_inbox", user_id, last_activity_at.desc(), conversation_id.desc()),
+    )
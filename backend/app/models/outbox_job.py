@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class OutboxJob(Base):
+    """A side effect committed with the change that caused it and run by the outbox worker (see utils/outbox.py)"""
+    __tablename__ = "outbox_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)                 # JSON keyword arguments for the handler
+    status = Column(String(20), nullable=False, default="pending")   # pending | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # Next attempt; while a worker runs the job this is pushed out by the lease
+    run_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_outbox_jobs_status_run_at", "status", "run_at"),
+    )
@@ -9,7 +9,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
-    university = Column(String, nullable=False)
+    university = Column(String, nullable=False, index=True)
     hashed_password = Column(String, nullable=True)  # Added for password auth
     is_verified = Column(Boolean, default=False)
     verification_token = Column(String, nullable=True)
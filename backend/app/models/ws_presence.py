@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class WebSocketPresence(Base):
+    """Users with an open WebSocket on a given worker, for the Postgres backplane (see utils/ws_backplane.py)"""
+    __tablename__ = "ws_presence"
+
+    worker_id = Column(String(64), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    # Refreshed by the worker's heartbeat; rows of a worker that died stop counting after PRESENCE_TTL_SECONDS
+    seen_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_ws_presence_user_id_seen_at", "user_id", "seen_at"),
+    )
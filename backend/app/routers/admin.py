@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, text
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models.user import User
 from ..models.listing import Listing
 from ..models.transaction import Transaction, TransactionStatus
@@ -15,9 +15,17 @@ from ..models.admin_log import AdminLog
 from ..models.system_setting import SystemSetting
 from ..utils.dependencies import get_admin_required, get_super_admin_required
 from ..utils.email import send_suspension_email, send_direct_email
+from ..utils.visibility import invalidate_suspended
+from ..utils.system_settings import invalidate_settings, settings_cache_stats
+from ..utils.view_counter import view_counter_stats
+from .ws import manager as ws_manager
+from ..utils.outbox import outbox_stats
+from ..utils.push import dispatcher as push_dispatcher
+from ..utils.passwords import hash_password, password_pool_stats
+from ..utils.db_pool import pool_stats
+from ..utils.scheduling import job_history
 from ..config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -230,13 +238,10 @@ def toggle_suspend(
         raise HTTPException(status_code=404, detail="User not found")
 
     user.is_suspended = not user.is_suspended
-    db.commit()
-
     if user.is_suspended:
-        try:
-            send_suspension_email(user.email, user.name)
-        except Exception as e:
-            print(f"Failed to send suspension email: {e}")
+        send_suspension_email(user.email, user.name, db=db)
+    db.commit()
+    invalidate_suspended()
 
     log_action(db, current_user.id, "suspend_user" if user.is_suspended else "unsuspend_user",
                "user", user_id, user.name)
@@ -277,11 +282,8 @@ def email_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    try:
-        send_direct_email(user.email, user.name, body.subject, body.message)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
-
+    # Committed with the audit log entry
+    send_direct_email(user.email, user.name, body.subject, body.message, db=db)
     log_action(db, current_user.id, "email_user", "user", user_id,
                f"Subject: {body.subject}")
     return {"message": f"Email sent to {user.name}"}
@@ -611,6 +613,72 @@ def get_settings(
     return {row.key: row.value for row in settings_rows}
 
 
+@router.get("/settings/cache-stats")
+def get_settings_cache_stats(
+    current_user: User = Depends(get_admin_required)
+):
+    """Hit/miss counters for this worker's system settings cache"""
+    return settings_cache_stats()
+
+
+@router.get("/view-counter-stats")
+def get_view_counter_stats(
+    current_user: User = Depends(get_admin_required)
+):
+    """Buffered vs flushed listing view counts for this worker"""
+    return view_counter_stats()
+
+
+@router.get("/ws-stats")
+def get_ws_stats(
+    current_user: User = Depends(get_admin_required)
+):
+    """WebSocket connections, outbound queue depth and dropped frames for this worker"""
+    return ws_manager.stats()
+
+
+@router.get("/outbox-stats")
+def get_outbox_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_required)
+):
+    """Pending / failed background jobs, and this worker's job outcomes"""
+    return outbox_stats(db)
+
+
+@router.get("/push-stats")
+def get_push_stats(current_user: User = Depends(get_admin_required)):
+    """
+    Queued / sent / failed pushes and pending receipts of the Expo push dispatcher in the
+    worker that answers this request only; other workers keep their own counts. Tickets
+    still awaiting receipts are dropped (never checked) when a worker shuts down.
+    """
+    return push_dispatcher.stats()
+
+
+@router.get("/password-pool-stats")
+def get_password_pool_stats(current_user: User = Depends(get_admin_required)):
+    """This worker's bcrypt process pool: queue depth, rejections and latency"""
+    return password_pool_stats()
+
+
+@router.get("/db-pool-stats")
+def get_db_pool_stats(current_user: User = Depends(get_admin_required)):
+    """This worker's database connection pools: connections in use, overflow and checkout waits"""
+    return pool_stats()
+
+
+@router.get("/job-runs")
+def get_job_runs(
+    job: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_required)
+):
+    """Duration, rows processed and failures of scheduled jobs, per job and per recent run"""
+    return job_history(db, job=job, limit=limit)
+
+
 @router.put("/settings/{key}")
 def update_setting(
     key: str,
@@ -624,6 +692,7 @@ def update_setting(
         raise HTTPException(status_code=404, detail="Setting not found")
     setting.value = body.value
     db.commit()
+    invalidate_settings()
     log_action(db, current_user.id, "update_setting", "setting", None, f"{key} = {body.value}")
     return {"key": key, "value": body.value}
 
@@ -631,17 +700,17 @@ def update_setting(
 # ─── Business Account Creation ─────────────────────────────────────────────────
 
 @router.post("/users/create-business")
-def create_business_user(
+async def create_business_user(
     body: CreateBusinessUserRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_super_admin_required)
 ):
     """Create a pre-verified business account (super admin only)"""
-    existing = db.query(User).filter(User.email == body.email).first()
+    existing = (await db.execute(select(User.id).where(User.email == body.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = pwd_context.hash(body.password)
+    hashed_pw = await hash_password(body.password)
     new_user = User(
         name=body.name,
         email=body.email,
@@ -651,8 +720,7 @@ def create_business_user(
         is_sponsor=True,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    log_action(db, current_user.id, "create_business_user", "user", new_user.id,
-               f"Created business account: {body.email}")
+    await db.commit()
+    await db.run_sync(log_action, current_user.id, "create_business_user", "user", new_user.id,
+                      f"Created business account: {body.email}")
     return {"message": f"Business account created for {body.name}", "user_id": new_user.id}
@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
 from ..utils.limiter import limiter
 from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timezone
 import secrets
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models.user import User
 from ..schemas.user import UserCreate, UserLogin, UserResponse, Token, SetPassword
-from ..utils.auth import get_password_hash, verify_password, create_access_token, verify_token
+from ..utils.auth import create_access_token, verify_token
 from ..utils.email import send_verification_email, send_reset_email, generate_verification_token, is_token_expired
-from ..utils.dependencies import get_current_user_required
+from ..utils.dependencies import get_current_user_required, get_current_user_required_async, load_user
+from ..utils.passwords import hash_password, verify_and_update
+from ..utils.principal import token_email
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -76,16 +80,11 @@ def signup(request: Request, user_data: UserCreate, db: Session = Depends(get_db
     )
 
     db.add(new_user)
+    # Queued with the account; sent by the outbox worker
+    send_verification_email(new_user.email, new_user.name, verification_token, db=db)
     db.commit()
     db.refresh(new_user)
 
-    # Send verification email
-    try:
-        send_verification_email(new_user.email, new_user.name, verification_token)
-    except Exception as e:
-        # Log error but don't block signup
-        print(f"Failed to send verification email: {str(e)}")
-
     return {
         "message": "Account created! Check your email to verify and set your password.",
         "email": new_user.email
@@ -94,10 +93,10 @@ def signup(request: Request, user_data: UserCreate, db: Session = Depends(get_db
 
 @router.post("/login", response_model=Token)
 @limiter.limit("5/minute")
-def login(request: Request, login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(request: Request, login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login with email and password"""
     # Find user
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = (await db.execute(select(User).where(User.email == login_data.email))).scalars().first()
     
     if not user:
         raise HTTPException(
@@ -112,7 +111,8 @@ def login(request: Request, login_data: UserLogin, db: Session = Depends(get_db)
             detail="Please check your email to verify your account and set your password."
         )
     
-    if not verify_password(login_data.password, user.hashed_password):
+    valid, new_hash = await verify_and_update(login_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -132,6 +132,11 @@ def login(request: Request, login_data: UserLogin, db: Session = Depends(get_db)
             detail="Your account has been suspended. Please contact support if you believe this is a mistake."
         )
 
+    # Hashed with an outdated cost; store it at the current one now that we have the password
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     # Create token
     token = create_access_token({"sub": user.email})
     
@@ -156,11 +161,11 @@ def get_me(
     except IndexError:
         raise HTTPException(status_code=401, detail="Invalid token format")
 
-    email = verify_token(token)
+    email = token_email(token)
     if not email:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = load_user(db, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -219,10 +224,10 @@ def verify_email(request: Request, token: str, db: Session = Depends(get_db)):
 
 @router.post("/set-password")
 @limiter.limit("10/minute")
-def set_password(request: Request, data: SetPassword, db: Session = Depends(get_db)):
+async def set_password(request: Request, data: SetPassword, db: AsyncSession = Depends(get_async_db)):
     """Set password for verified user using verification token"""
     # Find user with this verification token
-    user = db.query(User).filter(User.verification_token == data.token).first()
+    user = (await db.execute(select(User).where(User.verification_token == data.token))).scalars().first()
 
     if not user:
         raise HTTPException(
@@ -245,18 +250,18 @@ def set_password(request: Request, data: SetPassword, db: Session = Depends(get_
         )
 
     # Hash and set password
-    user.hashed_password = get_password_hash(data.password)
+    user.hashed_password = await hash_password(data.password)
     user.verification_token = None  # Clear token after password is set
     user.token_created_at = None
 
     # Credit referrer 1 boost credit (only on first password set)
     if user.referred_by_id:
-        referrer = db.query(User).filter(User.id == user.referred_by_id).first()
+        referrer = await db.get(User, user.referred_by_id)
         if referrer:
             referrer.boost_credits = (referrer.boost_credits or 0) + 1
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     # Create access token for immediate login
     token = create_access_token({"sub": user.email})
@@ -304,18 +309,10 @@ def resend_verification(
     verification_token = generate_verification_token()
     user.verification_token = verification_token
     user.token_created_at = datetime.now(timezone.utc)
-
+    send_verification_email(user.email, user.name, verification_token, db=db)
     db.commit()
 
-    # Send email
-    try:
-        send_verification_email(user.email, user.name, verification_token)
-        return {"message": "Verification email sent successfully"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to send email: {str(e)}"
-        )
+    return {"message": "Verification email sent successfully"}
 
 
 @router.post("/forgot-password")
@@ -333,21 +330,17 @@ def forgot_password(request: Request, email_data: dict, db: Session = Depends(ge
     reset_token = generate_verification_token()
     user.verification_token = reset_token
     user.token_created_at = datetime.now(timezone.utc)
+    send_reset_email(user.email, user.name, reset_token, db=db)
     db.commit()
 
-    try:
-        send_reset_email(user.email, user.name, reset_token)
-    except Exception as e:
-        print(f"Failed to send reset email: {str(e)}")
-
     return {"message": "If an account exists with that email, you will receive an email shortly."}
 
 
 @router.post("/reset-password")
 @limiter.limit("5/minute")
-def reset_password(request: Request, data: SetPassword, db: Session = Depends(get_db)):
+async def reset_password(request: Request, data: SetPassword, db: AsyncSession = Depends(get_async_db)):
     """Reset password using a token from the reset email"""
-    user = db.query(User).filter(User.verification_token == data.token).first()
+    user = (await db.execute(select(User).where(User.verification_token == data.token))).scalars().first()
 
     if not user:
         raise HTTPException(
@@ -361,11 +354,11 @@ def reset_password(request: Request, data: SetPassword, db: Session = Depends(ge
             detail="Reset link has expired. Please request a new one."
         )
 
-    user.hashed_password = get_password_hash(data.password)
+    user.hashed_password = await hash_password(data.password)
     user.verification_token = None
     user.token_created_at = None
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     token = create_access_token({"sub": user.email})
     return {
@@ -396,18 +389,21 @@ class ChangePasswordRequest(BaseModel):
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user_required),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_required_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change password — requires current password for verification."""
+    # The cached principal doesn't carry the hash; read the current one
+    await db.refresh(current_user, ["hashed_password"])
     if not current_user.hashed_password:
         raise HTTPException(status_code=400, detail="No password set on this account.")
 
-    if not verify_password(data.current_password, current_user.hashed_password):
+    valid, _ = await verify_and_update(data.current_password, current_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Current password is incorrect.")
 
-    current_user.hashed_password = get_password_hash(data.new_password)
-    db.commit()
+    current_user.hashed_password = await hash_password(data.new_password)
+    await db.commit()
     return {"message": "Password changed successfully."}
\ No newline at end of file
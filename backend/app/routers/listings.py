@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Request, Response
+from sqlalchemy.orm import Session, joinedload, load_only
 from sqlalchemy import asc, desc, case, and_, or_
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from ..database import get_db
 from ..models.listing import Listing
 from ..models.user import User
 from ..models.transaction import Transaction
-from ..models.system_setting import SystemSetting
 from ..models.message import Conversation
-from ..models.user_block import UserBlock
-from ..schemas.listing import ListingCreate, ListingUpdate, ListingResponse
+from ..schemas.listing import ListingCreate, ListingUpdate, ListingResponse, ListingCard
 from ..utils.dependencies import get_current_user_optional, get_current_user_required
 from ..utils.email import send_review_prompt_email
+from ..utils.pagination import (
+    encode_cursor, decode_cursor, keyset_condition, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+)
+from ..utils.search import apply_search
+from ..utils.visibility import hidden_user_ids
+from ..utils.system_settings import get_bool_setting
+from ..utils.browse_cache import get_cached_page, store_page
+from ..utils.view_counter import record_view
+from ..utils.etag import not_modified, listings_etag
+from ..utils.principal import invalidate_users
 from ..routers.notifications import send_user_notification
 
 
@@ -23,6 +31,27 @@ class MarkSoldRequest(BaseModel):
 
 router = APIRouter(prefix="/listings", tags=["Listings"])
 
+_listing_cards = TypeAdapter(List[ListingCard])
+
+
+def _browse_options(card: bool) -> list:
+    """Loader options for browse queries; card mode skips the long text columns."""
+    if not card:
+        return [joinedload(Listing.seller)]
+    return [
+        load_only(
+            Listing.id, Listing.title, Listing.price, Listing.original_price, Listing.category,
+            Listing.condition, Listing.images, Listing.is_sold, Listing.is_boosted,
+            Listing.seller_id, Listing.created_at,
+            # read by the ETag
+            Listing.updated_at, Listing.view_count,
+        ),
+        joinedload(Listing.seller).load_only(
+            User.id, User.name, User.is_sponsor, User.sponsored_category,
+            User.created_at, User.updated_at,
+        ),
+    ]
+
 
 @router.post("/", response_model=ListingResponse, status_code=status.HTTP_201_CREATED)
 def create_listing(
@@ -51,6 +80,8 @@ def create_listing(
 
 @router.get("/", response_model=List[ListingResponse])
 def get_listings(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     search: Optional[str] = None,
     university: Optional[str] = None,
@@ -59,12 +90,29 @@ def get_listings(
     max_price: Optional[float] = None,
     condition: Optional[str] = None,
     sort: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^(full|card)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    """Get all listings with optional filters"""
+    """Get all listings with optional filters.
+
+    sort=relevance orders search results by full-text rank (ignored without `search`).
+    Pass `limit` (and then `cursor`) to page through results; the token for the
+    next page is returned in the X-Next-Cursor header and is absent on the last page.
+    Without either parameter the full result set is returned, as older clients expect.
+
+    Results are cached per filter combination (see utils/browse_cache.py) and hidden
+    sellers are removed afterwards, so a page can hold fewer than `limit` listings.
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified.
+
+    fields=card returns the ListingCard projection the browse grid needs (no
+    description, first image only, seller badge) instead of full ListingResponse rows.
+    """
     now = datetime.now(timezone.utc)
-    query = db.query(Listing).options(joinedload(Listing.seller))
+    card = fields == 'card'
+    query = db.query(Listing).options(*_browse_options(card))
 
     # Only show active, non-expired listings
     query = query.filter(Listing.is_active == True)
@@ -72,19 +120,6 @@ def get_listings(
         or_(Listing.expires_at.is_(None), Listing.expires_at > now)
     )
 
-    # Hide listings from suspended sellers
-    query = query.filter(
-        Listing.seller_id.in_(
-            db.query(User.id).filter(User.is_suspended == False)
-        )
-    )
-
-    # Hide listings from users that the current user has blocked (and vice versa)
-    blocked_by_me = db.query(UserBlock.blocked_id).filter(UserBlock.blocker_id == current_user.id)
-    blocking_me = db.query(UserBlock.blocker_id).filter(UserBlock.blocked_id == current_user.id)
-    query = query.filter(Listing.seller_id.notin_(blocked_by_me))
-    query = query.filter(Listing.seller_id.notin_(blocking_me))
-
     # Filter out sold items by default
     if not include_sold:
         query = query.filter(Listing.is_sold == False)
@@ -93,14 +128,22 @@ def get_listings(
     if category and category != 'All':
         query = query.filter(Listing.category == category)
     
-    # Search filter
+    # Search filter (full-text index when available, ILIKE otherwise)
+    search_rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Listing.title.ilike(search_term)) | 
-            (Listing.description.ilike(search_term))
-        )
+        query, search_rank = apply_search(db, query, Listing, search)
     
+    # Sponsored listings are pinned above everything else within their category,
+    # and in the All view too when the sponsored_pins_in_all toggle is on
+    if category and category != 'All':
+        pinned = and_(User.is_sponsor == True, User.sponsored_category == category)
+    elif get_bool_setting(db, "sponsored_pins_in_all"):
+        pinned = User.is_sponsor == True
+    else:
+        pinned = None
+    if university or pinned is not None:
+        query = query.join(User, Listing.seller_id == User.id)
+
     # University filter — sponsored listings respect their targeted-university setting:
     #   sponsored_universities null / '' = visible at all schools (All Montreal tier)
     #   sponsored_universities JSON array = only visible at the listed schools
@@ -113,9 +156,7 @@ def get_listings(
                 User.sponsored_universities.like(f'%"{university}"%'),
             )
         )
-        query = query.join(User, Listing.seller_id == User.id).filter(
-            or_(User.university == university, sponsored_visible)
-        )
+        query = query.filter(or_(User.university == university, sponsored_visible))
     
     # Price filters
     if min_price is not None:
@@ -128,44 +169,88 @@ def get_listings(
     if condition and condition != 'All':
         query = query.filter(Listing.condition == condition)
     
-    # Sorting
-    if sort == 'price_asc':
-        query = query.order_by(asc(Listing.price))
-    elif sort == 'price_desc':
-        query = query.order_by(desc(Listing.price))
-    elif sort == 'oldest':
-        query = query.order_by(asc(Listing.created_at))
+    # Sorting — every mode ends in Listing.id so the key is unique and pages never overlap
+    sort_mode = sort if sort in ('price_asc', 'price_desc', 'oldest') else 'newest'
+    if sort == 'relevance' and search_rank is not None:
+        sort_mode = 'relevance'
+    if sort_mode == 'relevance':
+        sort_key, descending = [search_rank, Listing.id], True
+    elif sort_mode == 'price_asc':
+        sort_key, descending = [Listing.price, Listing.id], False
+    elif sort_mode == 'price_desc':
+        sort_key, descending = [Listing.price, Listing.id], True
+    elif sort_mode == 'oldest':
+        sort_key, descending = [Listing.created_at, Listing.id], False
     else:
-        # Default: active boosts first (by most recently boosted), then newest
+        # Default: active boosts first, then newest
         is_active_boost = and_(Listing.is_boosted == True, Listing.boosted_until > now)
-        query = query.order_by(
-            case((is_active_boost, 1), else_=0).desc(),
-            Listing.created_at.desc()
-        )
-    
-    results = query.all()
-
-    # Check settings for sponsored behaviour
-    pins_in_all_setting = db.query(SystemSetting).filter(
-        SystemSetting.key == "sponsored_pins_in_all"
-    ).first()
-    sponsored_pins_in_all = pins_in_all_setting and pins_in_all_setting.value == "true"
-
-    def is_sponsored_for(listing, cat):
-        return (listing.seller and listing.seller.is_sponsor
-                and listing.seller.sponsored_category == cat)
-
-    if category and category != 'All':
-        # Always pin sponsored to top within their category
-        sponsored = [l for l in results if is_sponsored_for(l, category)]
-        regular = [l for l in results if not is_sponsored_for(l, category)]
-        results = sponsored + regular
-    elif sponsored_pins_in_all:
-        # Only pin in All view if the toggle is on
-        sponsored = [l for l in results if l.seller and l.seller.is_sponsor]
-        regular = [l for l in results if not (l.seller and l.seller.is_sponsor)]
-        results = sponsored + regular
-
+        sort_key, descending = [case((is_active_boost, 1), else_=0), Listing.created_at, Listing.id], True
+
+    # Pinning is the leading sort key. Its values are flipped for ascending sorts so the
+    # whole key runs in one direction and the cursor stays a single row comparison.
+    if pinned is not None:
+        sort_mode = f"{sort_mode}:pinned"
+        pin_rank = case((pinned, 1), else_=0) if descending else case((pinned, 0), else_=1)
+        sort_key = [pin_rank] + sort_key
+
+    # Keyset pagination: resume strictly after the last row of the previous page
+    if cursor:
+        last_key = decode_cursor(cursor, sort_mode, len(sort_key))
+        query = query.filter(keyset_condition(sort_key, last_key, descending, db.get_bind().dialect.name))
+
+    query = query.order_by(*[desc(col) if descending else asc(col) for col in sort_key])
+
+    paginate = limit is not None or cursor is not None
+    page_size = limit or DEFAULT_PAGE_SIZE
+
+    cache_key, cached = get_cached_page({
+        "category": category if category != 'All' else None,
+        "search": search or None,
+        "university": university or None,
+        "include_sold": include_sold,
+        "min_price": min_price,
+        "max_price": max_price,
+        "condition": condition if condition != 'All' else None,
+        "sort": sort_mode,
+        "limit": page_size if paginate else None,
+        "cursor": cursor,
+    })
+
+    # Hide listings from suspended sellers and from users blocked in either direction
+    hidden_ids = hidden_user_ids(db, current_user.id)
+
+    if cached is not None:
+        ids = [listing_id for listing_id, seller_id in cached["ids"] if seller_id not in hidden_ids]
+        by_id = {
+            l.id: l for l in db.query(Listing).options(*_browse_options(card)).filter(Listing.id.in_(ids))
+        } if ids else {}
+        results = [by_id[i] for i in ids if i in by_id]
+        next_cursor = cached["next"]
+    else:
+        if paginate:
+            # Select the sort key alongside each listing so the cursor holds exactly the
+            # values the database ordered by
+            rows = query.add_columns(*sort_key).limit(page_size + 1).all()
+            next_cursor = None
+            if len(rows) > page_size:
+                next_cursor = encode_cursor(sort_mode, list(rows[page_size - 1][1:]))
+            page = [row[0] for row in rows[:page_size]]
+        else:
+            page, next_cursor = query.all(), None
+        store_page(cache_key, page, next_cursor)
+        results = [l for l in page if l.seller_id not in hidden_ids]
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    etag = listings_etag(results, next_cursor, card)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+    if card:
+        # Serialize straight to JSON; returning a Response skips response_model validation
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        body = _listing_cards.dump_json(_listing_cards.validate_python(results, from_attributes=True))
+        return Response(content=body, media_type="application/json", headers=headers)
     return results
 
 
@@ -184,6 +269,8 @@ def get_my_listings(
 
 @router.get("/user/{user_id}", response_model=List[ListingResponse])
 def get_user_listings(
+    request: Request,
+    response: Response,
     user_id: int,
     include_sold: bool = True,
     db: Session = Depends(get_db),
@@ -197,11 +284,14 @@ def get_user_listings(
     if not include_sold:
         query = query.filter(Listing.is_sold == False)
     
-    return query.order_by(desc(Listing.created_at)).all()
+    listings = query.order_by(desc(Listing.created_at)).all()
+    return not_modified(request, response, listings_etag(listings)) or listings
 
 
 @router.get("/{listing_id}", response_model=ListingResponse)
 def get_listing(
+    request: Request,
+    response: Response,
     listing_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
@@ -217,12 +307,11 @@ def get_listing(
             detail="Listing not found"
         )
 
-    # Increment view count for non-owners
+    # Count views from non-owners (buffered, written in batches by the scheduler)
     if listing.seller_id != current_user.id:
-        listing.view_count = (listing.view_count or 0) + 1
-        db.commit()
+        record_view(listing.id, current_user.id)
 
-    return listing
+    return not_modified(request, response, listings_etag([listing])) or listing
 
 
 @router.put("/{listing_id}", response_model=ListingResponse)
@@ -358,6 +447,7 @@ def mark_as_sold(
                 seller_name=listing.seller.name,
                 listing_title=listing.title,
                 seller_id=listing.seller_id,
+                db=db,
             )
             listing.review_prompt_sent = True
 
@@ -470,14 +560,20 @@ def boost_listing_free(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
     if listing.seller_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
-    if (current_user.boost_credits or 0) < 1:
+
+    # Spend the credit in the database, not from the (possibly cached) principal: the
+    # conditional UPDATE can't go below zero even with two boosts racing
+    spent = db.query(User).filter(
+        User.id == current_user.id, User.boost_credits >= 1
+    ).update({User.boost_credits: User.boost_credits - 1}, synchronize_session=False)
+    if not spent:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No boost credits available. Invite friends to earn credits!")
 
     now = datetime.now(timezone.utc)
     listing.is_boosted = True
     listing.boosted_at = now
     listing.boosted_until = now + timedelta(hours=48)
-    current_user.boost_credits = current_user.boost_credits - 1
     db.commit()
+    invalidate_users(current_user.id)
     db.refresh(listing)
     return listing
\ No newline at end of file
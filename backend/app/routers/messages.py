@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_, func, desc
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy import or_, and_, func, desc, select, update
+from typing import List, Optional
 from datetime import datetime, timezone
-from ..database import get_db
-from ..models.message import Conversation, Message
+from ..database import get_db, get_async_db, SessionLocal
+from ..models.message import Conversation, ConversationSummary, Message
 from ..models.listing import Listing
 from ..models.user import User
 from ..models.user_block import UserBlock
@@ -12,12 +13,18 @@ from ..schemas.message import (
     ConversationCreate, ConversationResponse, ConversationListResponse,
     MessageCreate, MessageResponse
 )
-from ..utils.dependencies import get_current_user_required
+from ..utils.dependencies import get_current_user_required, get_current_user_required_async
 from .notifications import send_user_notification
 from ..utils.email import send_message_email
 from ..utils.push import send_push_notification
 from .ws import manager as ws_manager
 from ..utils.limiter import limiter
+from ..utils.pagination import (
+    encode_cursor, decode_cursor, keyset_condition, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+)
+from ..utils.inbox import create_summaries, record_message, mark_read, refresh_summary
+from ..utils.badges import unread_messages_query, touch as touch_badges
+from ..utils.outbox import enqueue, job_handler
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
@@ -25,49 +32,55 @@ router = APIRouter(prefix="/messages", tags=["Messages"])
 # CONVERSATION ENDPOINTS
 @router.get("/conversations", response_model=List[ConversationListResponse])
 def get_conversations(
+    response: Response,
     include_archived: bool = Query(False),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    """Get all conversations for the current user. include_archived=true returns only archived ones."""
-    if include_archived:
-        conversations = db.query(Conversation).options(
-            joinedload(Conversation.buyer),
-            joinedload(Conversation.seller),
-            joinedload(Conversation.listing),
-            joinedload(Conversation.messages).joinedload(Message.sender),
-            joinedload(Conversation.messages).joinedload(Message.reply_to).joinedload(Message.sender)
-        ).filter(
-            or_(
-                and_(Conversation.buyer_id == current_user.id, Conversation.archived_by_buyer == True),
-                and_(Conversation.seller_id == current_user.id, Conversation.archived_by_seller == True)
+    """Get all conversations for the current user, most recently active first.
+
+    include_archived=true returns only archived ones. Pass `limit` (and then `cursor`)
+    to page through the inbox; the next-page token is returned in the X-Next-Cursor header.
+    """
+    archived = include_archived
+    query = db.query(ConversationSummary).join(
+        Conversation, ConversationSummary.conversation_id == Conversation.id
+    ).options(
+        contains_eager(ConversationSummary.conversation).joinedload(Conversation.buyer),
+        contains_eager(ConversationSummary.conversation).joinedload(Conversation.seller),
+        contains_eager(ConversationSummary.conversation).joinedload(Conversation.listing),
+        joinedload(ConversationSummary.last_message).joinedload(Message.sender)
+    ).filter(
+        ConversationSummary.user_id == current_user.id,
+        or_(
+            and_(Conversation.buyer_id == current_user.id, Conversation.archived_by_buyer == archived),
+            and_(Conversation.seller_id == current_user.id, Conversation.archived_by_seller == archived)
+        )
+    )
+
+    sort_key = [ConversationSummary.last_activity_at, ConversationSummary.conversation_id]
+    if cursor:
+        last_key = decode_cursor(cursor, "inbox", len(sort_key))
+        query = query.filter(keyset_condition(sort_key, last_key, True, db.get_bind().dialect.name))
+    query = query.order_by(*[desc(col) for col in sort_key])
+
+    if limit is not None or cursor is not None:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        summaries = query.limit(page_size + 1).all()
+        if len(summaries) > page_size:
+            summaries = summaries[:page_size]
+            last = summaries[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                "inbox", [last.last_activity_at, last.conversation_id]
             )
-        ).order_by(desc(Conversation.updated_at)).all()
     else:
-        conversations = db.query(Conversation).options(
-            joinedload(Conversation.buyer),
-            joinedload(Conversation.seller),
-            joinedload(Conversation.listing),
-            joinedload(Conversation.messages).joinedload(Message.sender),
-            joinedload(Conversation.messages).joinedload(Message.reply_to).joinedload(Message.sender)
-        ).filter(
-            or_(
-                and_(Conversation.buyer_id == current_user.id, Conversation.archived_by_buyer == False),
-                and_(Conversation.seller_id == current_user.id, Conversation.archived_by_seller == False)
-            )
-        ).order_by(desc(Conversation.updated_at)).all()
-    
-    # Build response with last message and unread count
+        summaries = query.all()
+
     result = []
-    for conv in conversations:
-        last_message = conv.messages[-1] if conv.messages else None
-        
-        # Count unread messages (messages not from current user that are unread)
-        unread_count = sum(
-            1 for m in conv.messages 
-            if m.sender_id != current_user.id and not m.is_read
-        )
-        
+    for summary in summaries:
+        conv = summary.conversation
         result.append({
             "id": conv.id,
             "listing_id": conv.listing_id,
@@ -78,10 +91,10 @@ def get_conversations(
             "seller": conv.seller,
             "created_at": conv.created_at,
             "updated_at": conv.updated_at,
-            "last_message": last_message,
-            "unread_count": unread_count
+            "last_message": summary.last_message,
+            "unread_count": summary.unread_count
         })
-    
+
     return result
 
 
@@ -108,6 +121,7 @@ def create_conversation(
         )
 
     # Can't message a user you've blocked or who has blocked you
+    # Checked directly rather than through the visibility cache, so a block made on another worker applies at once
     block = db.query(UserBlock).filter(
         or_(
             and_(UserBlock.blocker_id == current_user.id, UserBlock.blocked_id == listing.seller_id),
@@ -134,6 +148,8 @@ def create_conversation(
         db.add(new_message)
         existing.archived_by_buyer = False  # Unarchive if was archived
         existing.archived_by_seller = False
+        db.flush()
+        record_message(db, existing, new_message)
         db.commit()
         db.refresh(existing)
         return existing
@@ -154,6 +170,8 @@ def create_conversation(
         sender_id=current_user.id
     )
     db.add(initial_message)
+    db.flush()
+    create_summaries(db, conversation, initial_message)
     db.commit()
     db.refresh(conversation)
     
@@ -162,18 +180,28 @@ def create_conversation(
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
+    response: Response,
     conversation_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_required)
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_required_async)
 ):
-    """Get a single conversation with all messages"""
-    conversation = db.query(Conversation).options(
-        joinedload(Conversation.buyer),
-        joinedload(Conversation.seller),
-        joinedload(Conversation.listing),
-        joinedload(Conversation.messages).joinedload(Message.sender),
-        joinedload(Conversation.messages).joinedload(Message.reply_to).joinedload(Message.sender)
-    ).filter(Conversation.id == conversation_id).first()
+    """Get a single conversation with its messages (oldest first).
+
+    Pass `before=<message id>` for the page of older messages just before it, or
+    `after=<message id>` for newer ones, `limit` messages at a time (just `limit` gives
+    the latest page). When more messages exist in that direction, the id to pass next
+    is returned in the X-Next-Cursor header. Without any of these every message is returned.
+    """
+    conversation = (await db.execute(
+        select(Conversation).options(
+            joinedload(Conversation.buyer),
+            joinedload(Conversation.seller),
+            joinedload(Conversation.listing)
+        ).where(Conversation.id == conversation_id)
+    )).scalars().first()
 
     if not conversation:
         raise HTTPException(
@@ -188,13 +216,16 @@ async def get_conversation(
             detail="Not authorized to view this conversation"
         )
 
-    # Mark messages as read and track if any were newly read
-    newly_read = False
-    for message in conversation.messages:
-        if message.sender_id != current_user.id and not message.is_read:
-            message.is_read = True
-            newly_read = True
-    db.commit()
+    # Mark the other user's messages as read in one statement
+    newly_read = (await db.execute(
+        update(Message).where(
+            Message.conversation_id == conversation_id,
+            Message.sender_id != current_user.id,
+            Message.is_read == False
+        ).values(is_read=True).execution_options(synchronize_session=False)
+    )).rowcount
+    await db.run_sync(mark_read, conversation_id, current_user.id)
+    await db.commit()
 
     # Notify the other user that their messages were read
     if newly_read:
@@ -207,15 +238,45 @@ async def get_conversation(
         except Exception:
             pass
 
-    # Filter out messages hidden by this user
-    is_buyer = conversation.buyer_id == current_user.id
-    visible = [
-        m for m in conversation.messages
-        if not (is_buyer and m.hidden_by_buyer) and not (not is_buyer and m.hidden_by_seller)
-    ]
-    conversation.messages = visible
+    # Leave out messages hidden by this user
+    hidden_column = Message.hidden_by_buyer if conversation.buyer_id == current_user.id else Message.hidden_by_seller
+    query = select(Message).options(
+        joinedload(Message.sender),
+        joinedload(Message.reply_to).joinedload(Message.sender)
+    ).where(
+        Message.conversation_id == conversation_id,
+        hidden_column.isnot(True)
+    )
 
-    return conversation
+    if before is None and after is None and limit is None:
+        messages = (await db.execute(query.order_by(Message.id))).scalars().all()
+    else:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        if after is not None:
+            query = query.where(Message.id > after).order_by(Message.id).limit(page_size + 1)
+            rows = (await db.execute(query)).scalars().all()
+            messages = rows[:page_size]
+        else:
+            if before is not None:
+                query = query.where(Message.id < before)
+            rows = (await db.execute(query.order_by(desc(Message.id)).limit(page_size + 1))).scalars().all()
+            messages = list(reversed(rows[:page_size]))
+        if len(rows) > page_size:
+            boundary = messages[-1] if after is not None else messages[0]
+            response.headers[NEXT_CURSOR_HEADER] = str(boundary.id)
+
+    return {
+        "id": conversation.id,
+        "listing_id": conversation.listing_id,
+        "listing": conversation.listing,
+        "buyer_id": conversation.buyer_id,
+        "seller_id": conversation.seller_id,
+        "buyer": conversation.buyer,
+        "seller": conversation.seller,
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at,
+        "messages": messages,
+    }
 
 
 @router.delete("/conversations/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -244,6 +305,7 @@ def archive_conversation(
             detail="Not authorized to archive this conversation"
         )
     
+    touch_badges(db, current_user.id)
     db.commit()
     return None
 
@@ -264,6 +326,7 @@ def unarchive_conversation(
         conversation.archived_by_seller = False
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    touch_badges(db, current_user.id)
     db.commit()
     return None
 
@@ -275,11 +338,13 @@ async def send_message(
     request: Request,
     conversation_id: int,
     message_data: MessageCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_required)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_required_async)
 ):
     """Send a message in a conversation"""
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    conversation = (await db.execute(
+        select(Conversation).options(joinedload(Conversation.listing)).where(Conversation.id == conversation_id)
+    )).scalars().first()
     
     if not conversation:
         raise HTTPException(
@@ -308,15 +373,33 @@ async def send_message(
     conversation.archived_by_buyer = False
     conversation.archived_by_seller = False
     conversation.updated_at = datetime.now(timezone.utc)
-
-    # Commit message first so a notification failure can't block the send
-    db.commit()
-    db.refresh(message)
+    await db.flush()
+    await db.run_sync(record_message, conversation, message)
 
     recipient_id = conversation.seller_id if current_user.id == conversation.buyer_id else conversation.buyer_id
 
+    # Push, notification and email run from the outbox once the message is committed
+    # (see the job handlers below). An OS push is only needed if the recipient has no
+    # WebSocket open (app is in background/closed).
+    try:
+        recipient_on_ws = await ws_manager.is_online(recipient_id)
+    except Exception as e:
+        print(f"[ws] Presence check failed: {e}")
+        recipient_on_ws = False
+    if not recipient_on_ws:
+        enqueue(db, "message_push", message_id=message.id, recipient_id=recipient_id)
+    enqueue(db, "message_notification", message_id=message.id, recipient_id=recipient_id)
+    enqueue(db, "message_email", message_id=message.id, recipient_id=recipient_id)
+    await db.commit()
+
+    message = (await db.execute(
+        select(Message).options(
+            joinedload(Message.sender),
+            joinedload(Message.reply_to).joinedload(Message.sender)
+        ).where(Message.id == message.id).execution_options(populate_existing=True)
+    )).scalars().one()
+
     # Push message to recipient via WebSocket if they have an active connection
-    recipient_on_ws = False
     try:
         await ws_manager.send_to_user(recipient_id, {
             "type": "new_message",
@@ -336,58 +419,9 @@ async def send_message(
                 },
             },
         })
-        recipient_on_ws = recipient_id in ws_manager.active_connections
     except Exception as e:
         print(f"[ws] Failed to push message: {e}")
 
-    # Send OS push notification if recipient is not on WebSocket (app is in background/closed)
-    if not recipient_on_ws:
-        try:
-            recipient_user = db.query(User).filter(User.id == recipient_id).first()
-            if recipient_user and getattr(recipient_user, "push_token", None):
-                listing_title = conversation.listing.title if conversation.listing else "an item"
-                send_push_notification(
-                    token=recipient_user.push_token,
-                    title=f"New message from {current_user.name}",
-                    body=f"{message_data.text[:80]}..." if len(message_data.text) > 80 else message_data.text,
-                    data={"conversation_id": conversation_id, "type": "message"},
-                )
-        except Exception as e:
-            print(f"[push] Failed to send push notification: {e}")
-
-    # Notify the recipient (non-critical — separate commit)
-    listing_title = conversation.listing.title if conversation.listing else "an item"
-    try:
-        send_user_notification(
-            db, recipient_id,
-            title=f"New message from {current_user.name}",
-            message=f"{current_user.name} sent you a message about \"{listing_title}\""
-        )
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"[notifications] Failed to send message notification: {e}")
-
-    # Send email if the recipient has not yet replied in this conversation
-    # (avoids spamming both sides of an active back-and-forth)
-    try:
-        recipient_has_replied = db.query(Message).filter(
-            Message.conversation_id == conversation_id,
-            Message.sender_id == recipient_id
-        ).first() is not None
-
-        if not recipient_has_replied:
-            recipient_user = db.query(User).filter(User.id == recipient_id).first()
-            if recipient_user and recipient_user.email:
-                send_message_email(
-                    recipient_email=recipient_user.email,
-                    recipient_name=recipient_user.name,
-                    sender_name=current_user.name,
-                    listing_title=listing_title,
-                )
-    except Exception as e:
-        print(f"[email] Failed to send message email: {e}")
-
     return message
 
 
@@ -416,6 +450,11 @@ def hide_message(
         message.hidden_by_buyer = True
     else:
         message.hidden_by_seller = True
+
+    # If it was this user's inbox preview, fall back to their previous visible message
+    summary = db.get(ConversationSummary, (conversation_id, current_user.id))
+    if summary is None or summary.last_message_id == message_id:
+        refresh_summary(db, conversation, current_user.id)
     db.commit()
     return None
 
@@ -425,22 +464,91 @@ def get_unread_count(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    """Get total unread message count for the user (single optimized query)"""
-    count = db.query(func.count(Message.id)).join(
-        Conversation, Message.conversation_id == Conversation.id
-    ).filter(
-        or_(
-            and_(
-                Conversation.buyer_id == current_user.id,
-                Conversation.archived_by_buyer == False,
-                Message.sender_id != current_user.id
-            ),
-            and_(
-                Conversation.seller_id == current_user.id,
-                Conversation.archived_by_seller == False,
-                Message.sender_id != current_user.id
-            )
-        ),
-        Message.is_read == False
-    ).scalar()
-    return {"unread_count": count or 0}
\ No newline at end of file
+    """Get total unread message count for the user (sum of the inbox counters; see also /me/badges)"""
+    count = db.execute(unread_messages_query(current_user.id)).scalar()
+    return {"unread_count": count or 0}
+
+
+# BACKGROUND JOBS (run by the outbox worker, see utils/outbox.py)
+def _load_for_job(db: Session, message_id: int, recipient_id: int):
+    message = db.query(Message).options(
+        joinedload(Message.sender),
+        joinedload(Message.conversation).joinedload(Conversation.listing)
+    ).filter(Message.id == message_id).first()
+    return message, db.get(User, recipient_id)
+
+
+def _listing_title(message: Message) -> str:
+    listing = message.conversation.listing
+    return listing.title if listing else "an item"
+
+
+@job_handler("message_push")
+def push_new_message(message_id: int, recipient_id: int):
+    """
+    OS push for a message whose recipient had no WebSocket open.
+
+    The job only queues the push and succeeds once it is queued: retries belong to the push
+    dispatcher (utils/push.py), which retries failed Expo requests itself, so the outbox never
+    re-runs this job for a delivery failure and the recipient never gets the push twice.
+    """
+    db = SessionLocal()
+    try:
+        message, recipient = _load_for_job(db, message_id, recipient_id)
+        if not message or not recipient or not getattr(recipient, "push_token", None):
+            return
+        text = message.text or ""
+        send_push_notification(
+            token=recipient.push_token,
+            title=f"New message from {message.sender.name}",
+            body=f"{text[:80]}..." if len(text) > 80 else text,
+            data={"conversation_id": message.conversation_id, "type": "message"},
+        )
+    finally:
+        db.close()
+
+
+@job_handler("message_notification")
+def notify_new_message(message_id: int, recipient_id: int):
+    db = SessionLocal()
+    try:
+        message, recipient = _load_for_job(db, message_id, recipient_id)
+        if not message or not recipient:
+            return
+        sender_name = message.sender.name
+        send_user_notification(
+            db, recipient_id,
+            title=f"New message from {sender_name}",
+            message=f"{sender_name} sent you a message about \"{_listing_title(message)}\""
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+@job_handler("message_email")
+def email_new_message(message_id: int, recipient_id: int):
+    """Email the recipient unless they had already replied in this conversation
+    (avoids spamming both sides of an active back-and-forth)."""
+    db = SessionLocal()
+    try:
+        message, recipient = _load_for_job(db, message_id, recipient_id)
+        if not message or not recipient or not recipient.email:
+            return
+        recipient_has_replied = db.query(Message.id).filter(
+            Message.conversation_id == message.conversation_id,
+            Message.sender_id == recipient_id,
+            Message.id < message_id
+        ).first() is not None
+        if recipient_has_replied:
+            return
+        send_message_email(
+            recipient_email=recipient.email,
+            recipient_name=recipient.name,
+            sender_name=message.sender.name,
+            listing_title=_listing_title(message),
+            db=db,
+        )
+        db.commit()
+    finally:
+        db.close()
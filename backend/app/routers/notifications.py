@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
 from ..database import get_db
 from ..models.user import User
 from ..models.notification import Notification, NotificationRead
 from ..schemas.notification import NotificationCreate
 from ..utils.dependencies import get_admin_required, get_current_user_required
+from ..utils.badges import (
+    get_badges, notification_created, notification_read, all_notifications_read, user_notification_filter
+)
 
 router = APIRouter(tags=["Notifications"])
 
@@ -24,22 +26,7 @@ def send_user_notification(db: Session, recipient_id: int, title: str, message:
         created_by=created_by
     )
     db.add(notification)
-
-
-def _user_notification_filter(current_user: User):
-    """SQLAlchemy filter: notifications visible to current_user."""
-    return or_(
-        # Broadcasts (no recipient) scoped by university or global
-        and_(
-            Notification.recipient_user_id.is_(None),
-            or_(
-                Notification.target_university.is_(None),
-                Notification.target_university == current_user.university
-            )
-        ),
-        # Personal notifications addressed to this specific user
-        Notification.recipient_user_id == current_user.id
-    )
+    notification_created(db, notification)
 
 
 @router.post("/admin/notifications/broadcast")
@@ -57,6 +44,7 @@ def send_broadcast(
         created_by=current_user.id
     )
     db.add(notification)
+    notification_created(db, notification)
     db.commit()
     db.refresh(notification)
     return {"message": "Broadcast sent", "id": notification.id}
@@ -92,7 +80,7 @@ def get_my_notifications(
 ):
     """Get notifications for the current user (broadcasts + personal)"""
     notifications = db.query(Notification).filter(
-        _user_notification_filter(current_user)
+        user_notification_filter(current_user)
     ).order_by(Notification.created_at.desc()).limit(50).all()
 
     read_ids = set(
@@ -121,16 +109,18 @@ def get_unread_count(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    """Get count of unread notifications"""
-    total = db.query(Notification).filter(
-        _user_notification_filter(current_user)
-    ).count()
+    """Get count of unread notifications (see also /me/badges)"""
+    return {"unread_count": get_badges(db, current_user)["unread_notifications"]}
 
-    read_count = db.query(NotificationRead).filter(
-        NotificationRead.user_id == current_user.id
-    ).count()
 
-    return {"unread_count": max(0, total - read_count)}
+@router.get("/me/badges")
+def get_my_badges(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """Unread message and notification counts in one call.
+    The same payload is pushed as a `badges` WebSocket event whenever either changes."""
+    return get_badges(db, current_user)
 
 
 @router.put("/notifications/{notification_id}/read")
@@ -140,14 +130,7 @@ def mark_as_read(
     current_user: User = Depends(get_current_user_required)
 ):
     """Mark a notification as read"""
-    existing = db.query(NotificationRead).filter(
-        and_(
-            NotificationRead.notification_id == notification_id,
-            NotificationRead.user_id == current_user.id
-        )
-    ).first()
-    if not existing:
-        db.add(NotificationRead(notification_id=notification_id, user_id=current_user.id))
+    if notification_read(db, current_user, notification_id):
         db.commit()
     return {"message": "Marked as read"}
 
@@ -159,7 +142,7 @@ def mark_all_as_read(
 ):
     """Mark all notifications as read"""
     notifications = db.query(Notification).filter(
-        _user_notification_filter(current_user)
+        user_notification_filter(current_user)
     ).all()
 
     read_ids = set(
@@ -172,5 +155,6 @@ def mark_all_as_read(
     for n in notifications:
         if n.id not in read_ids:
             db.add(NotificationRead(notification_id=n.id, user_id=current_user.id))
+    all_notifications_read(db, current_user.id)
     db.commit()
     return {"message": "All marked as read"}
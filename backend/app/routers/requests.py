@@ -5,12 +5,13 @@ from typing import List, Optional
 from ..database import get_db
 from ..models.request import Request, Reply
 from ..models.user import User
-from ..models.user_block import UserBlock
 from ..schemas.request import (
     RequestCreate, RequestUpdate, RequestResponse, RequestListResponse,
     ReplyCreate, ReplyResponse
 )
 from ..utils.dependencies import get_current_user_required
+from ..utils.search import apply_search
+from ..utils.visibility import blocked_user_ids
 
 router = APIRouter(prefix="/requests", tags=["Requests"])
 
@@ -103,10 +104,9 @@ def get_requests(
     )
 
     # Hide requests from blocked users (bidirectional)
-    blocked_by_me = db.query(UserBlock.blocked_id).filter(UserBlock.blocker_id == current_user.id)
-    blocking_me = db.query(UserBlock.blocker_id).filter(UserBlock.blocked_id == current_user.id)
-    query = query.filter(Request.author_id.notin_(blocked_by_me))
-    query = query.filter(Request.author_id.notin_(blocking_me))
+    blocked_ids = blocked_user_ids(db, current_user.id)
+    if blocked_ids:
+        query = query.filter(Request.author_id.notin_(blocked_ids))
 
     if category and category != 'All':
         if category == 'Urgent':
@@ -118,11 +118,7 @@ def get_requests(
         query = query.filter(Request.urgent == urgent)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Request.title.ilike(search_term)) | 
-            (Request.description.ilike(search_term))
-        )
+        query, _ = apply_search(db, query, Request, search)
     
     if university:
         query = query.join(User, Request.author_id == User.id).filter(User.university == university)
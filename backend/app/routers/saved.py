@@ -8,6 +8,7 @@ from ..models.listing import Listing
 from ..models.user import User
 from ..schemas.listing import ListingResponse
 from ..utils.dependencies import get_current_user_required
+from ..utils.visibility import suspended_user_ids
 
 router = APIRouter(prefix="/saved", tags=["Saved"])
 
@@ -72,14 +73,15 @@ def get_saved(
     if not listing_ids:
         return []
 
-    listings = db.query(Listing).options(
+    query = db.query(Listing).options(
         joinedload(Listing.seller)
     ).filter(
         Listing.id.in_(listing_ids),
         Listing.is_active == True,
-        Listing.seller_id.in_(
-            db.query(User.id).filter(User.is_suspended == False)
-        )
-    ).order_by(Listing.created_at.desc()).all()
+    )
+    suspended_ids = suspended_user_ids(db)
+    if suspended_ids:
+        query = query.filter(Listing.seller_id.notin_(suspended_ids))
+    listings = query.order_by(Listing.created_at.desc()).all()
 
     return listings
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List
@@ -9,6 +9,8 @@ from ..models.user_block import UserBlock
 from ..schemas.user import UserResponse
 from ..utils.dependencies import get_current_user_required
 from ..utils.email import send_report_email
+from ..utils.visibility import invalidate_blocks
+from ..utils.etag import not_modified, user_etag
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -83,6 +85,8 @@ def get_blocked_users(
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user_profile(
+    request: Request,
+    response: Response,
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_required)
@@ -96,7 +100,7 @@ def get_user_profile(
             detail="User not found"
         )
 
-    return user
+    return not_modified(request, response, user_etag(user)) or user
 
 
 @router.post("/{user_id}/report")
@@ -129,22 +133,19 @@ def report_user(
         status="pending"
     )
     db.add(report)
+    send_report_email(
+        reporter_name=current_user.name,
+        reporter_email=current_user.email,
+        reporter_university=current_user.university or "",
+        reportee_name=reportee.name,
+        reportee_email=reportee.email,
+        reportee_university=reportee.university or "",
+        reason=body.reason,
+        details=body.details or "",
+        db=db,
+    )
     db.commit()
 
-    try:
-        send_report_email(
-            reporter_name=current_user.name,
-            reporter_email=current_user.email,
-            reporter_university=current_user.university or "",
-            reportee_name=reportee.name,
-            reportee_email=reportee.email,
-            reportee_university=reportee.university or "",
-            reason=body.reason,
-            details=body.details or "",
-        )
-    except Exception:
-        pass  # Don't fail the request if email fails
-
     return {"message": "Report submitted. Our team will review it within 24 hours."}
 
 
@@ -170,9 +171,11 @@ def toggle_block(
     if existing:
         db.delete(existing)
         db.commit()
+        invalidate_blocks(current_user.id, user_id)
         return {"blocked": False, "message": f"{target.name} has been unblocked."}
     else:
         block = UserBlock(blocker_id=current_user.id, blocked_id=user_id)
         db.add(block)
         db.commit()
+        invalidate_blocks(current_user.id, user_id)
         return {"blocked": True, "message": f"{target.name} has been blocked."}
@@ -1,89 +1,389 @@
+import asyncio
 import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+from ..database import AsyncSessionLocal
 from ..models.user import User
 from ..models.message import Conversation
-from ..utils.auth import verify_token
+from ..utils import principal
+from ..utils.badges import current_badges
+from ..utils.ws_backplane import Backplane, InMemoryBackplane, PRESENCE_HEARTBEAT_SECONDS
 
 router = APIRouter(tags=["WebSocket"])
 
+# /ws keepalive: the server pings this often and closes sockets silent for longer than the timeout
+WS_PING_INTERVAL_SECONDS = 25
+WS_IDLE_TIMEOUT_SECONDS = 60
+WS_AUTH_TIMEOUT_SECONDS = 10
+
+# Events only sent to sockets subscribed to their conversation_id; everything else
+# (new_message, messages_read, badges, notification) goes to all of the user's sockets
+CONVERSATION_SCOPED_EVENTS = {"typing"}
+
+# Outbound frames waiting per connection. A socket whose queue is full, or whose send
+# takes longer than the timeout, is a slow consumer: frames it can do without are
+# dropped, anything else closes it (the client reconnects and reloads over REST).
+WS_SEND_QUEUE_SIZE = 100
+WS_SEND_TIMEOUT_SECONDS = 10
+DROPPABLE_EVENTS = {"typing", "ping", "pong"}
+WS_SLOW_CONSUMER_CLOSE_CODE = 4009
+WS_IDLE_CLOSE_CODE = 4008
+# Events waiting to be published to other workers
+WS_PUBLISH_QUEUE_SIZE = 10_000
+
+
+class _Outbox:
+    """A connection's bounded send queue, drained by its own writer task."""
+
+    def __init__(self, websocket: WebSocket, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.close_code: Optional[int] = None
+
 
 class ConnectionManager:
-    """Manages active WebSocket connections keyed by user_id."""
+    """
+    Manages this worker's WebSocket connections keyed by user_id. Events are delivered
+    to local sockets and published on the backplane for the user's sockets on other
+    workers; presence (is_online) covers all workers.
+
+    Sending never waits on a socket: frames go to each connection's outbox and a
+    writer task per connection sends them, so one slow client can't hold up the
+    user's other devices or the request that produced the event. The writer is also
+    the only task that closes the socket, so a close never interleaves with a send.
+    """
 
-    def __init__(self):
+    def __init__(self, backplane: Optional[Backplane] = None):
         self.active_connections: dict[int, list[WebSocket]] = {}
+        self.subscriptions: dict[WebSocket, set[int]] = {}
+        self.backplane = backplane or InMemoryBackplane()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._outboxes: dict[WebSocket, _Outbox] = {}
+        self._publish_queue: Optional[asyncio.Queue] = None
+        self._publisher: Optional[asyncio.Task] = None
+        self._stats = {
+            "frames_sent": 0, "frames_dropped": 0, "slow_consumer_closes": 0, "send_errors": 0,
+            "published": 0, "publish_dropped": 0, "publish_errors": 0,
+        }
+
+    async def start(self, backplane: Optional[Backplane] = None):
+        """Start receiving other workers' events (and optionally swap in the configured backplane)."""
+        if backplane is not None:
+            self.backplane = backplane
+        await self.backplane.start(self.deliver_local)
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        self._publish_queue = asyncio.Queue(maxsize=WS_PUBLISH_QUEUE_SIZE)
+        self._publisher = asyncio.create_task(self._publish_loop())
+
+    async def stop(self):
+        for task in (self._heartbeat, self._publisher):
+            if task:
+                task.cancel()
+        self._publish_queue = None
+        for outbox in list(self._outboxes.values()):
+            if outbox.task:
+                outbox.task.cancel()
+        await self.backplane.stop()
+
+    async def _publish_loop(self):
+        # One publisher keeps a user's events in order across workers
+        while True:
+            user_id, data = await self._publish_queue.get()
+            try:
+                await self.backplane.publish(user_id, data)
+                self._stats["published"] += 1
+            except Exception as e:
+                self._stats["publish_errors"] += 1
+                print(f"[ws] Failed to publish event: {e}")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(PRESENCE_HEARTBEAT_SECONDS)
+            try:
+                await self.backplane.heartbeat(set(self.active_connections))
+            except Exception as e:
+                print(f"[ws] Presence heartbeat failed: {e}")
 
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
-        self.active_connections.setdefault(user_id, []).append(websocket)
+        await self.register(websocket, user_id)
+
+    async def register(self, websocket: WebSocket, user_id: int, conversation_ids=()):
+        """Track an already accepted socket, subscribed to `conversation_ids`."""
+        self.subscriptions[websocket] = set(conversation_ids)
+        outbox = _Outbox(websocket, user_id)
+        outbox.task = asyncio.create_task(self._write(outbox))
+        self._outboxes[websocket] = outbox
+        conns = self.active_connections.setdefault(user_id, [])
+        conns.append(websocket)
+        if len(conns) == 1:
+            try:
+                await self.backplane.user_connected(user_id)
+            except Exception as e:
+                print(f"[ws] Failed to record presence: {e}")
+
+    def subscribe(self, websocket: WebSocket, conversation_id: int):
+        self.subscriptions.setdefault(websocket, set()).add(conversation_id)
 
-    def disconnect(self, websocket: WebSocket, user_id: int):
+    def unsubscribe(self, websocket: WebSocket, conversation_id: int):
+        self.subscriptions.get(websocket, set()).discard(conversation_id)
+
+    async def disconnect(self, websocket: WebSocket, user_id: int):
+        self.subscriptions.pop(websocket, None)
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox and outbox.task and outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
         conns = self.active_connections.get(user_id, [])
         if websocket in conns:
             conns.remove(websocket)
-        if not conns:
-            self.active_connections.pop(user_id, None)
+        if not conns and self.active_connections.pop(user_id, None) is not None:
+            try:
+                await self.backplane.user_disconnected(user_id)
+            except Exception as e:
+                print(f"[ws] Failed to clear presence: {e}")
 
-    async def send_to_user(self, user_id: int, data: dict):
-        """Push a JSON payload to all active connections for a user."""
-        dead = []
-        for ws in list(self.active_connections.get(user_id, [])):
+    def enqueue(self, websocket: WebSocket, data: dict) -> bool:
+        """Queue a JSON payload on one connection. Returns False if it was dropped."""
+        outbox = self._outboxes.get(websocket)
+        if outbox is None or outbox.closing:
+            return False
+        try:
+            outbox.queue.put_nowait(json.dumps(data, separators=(",", ":"), default=str))
+            return True
+        except asyncio.QueueFull:
+            self._stats["frames_dropped"] += 1
+            if data.get("type") not in DROPPABLE_EVENTS:
+                self._close_slow_consumer(outbox)
+            return False
+
+    def close(self, websocket: WebSocket, code: int):
+        """Have the connection's writer close the socket once its current send is done."""
+        outbox = self._outboxes.get(websocket)
+        if outbox is not None:
+            self._close(outbox, code)
+
+    async def _write(self, outbox: _Outbox):
+        while True:
+            text = await outbox.queue.get()
+            if text is None:
+                break
             try:
-                await ws.send_json(data)
+                await asyncio.wait_for(outbox.websocket.send_text(text), WS_SEND_TIMEOUT_SECONDS)
+                self._stats["frames_sent"] += 1
+            except asyncio.TimeoutError:
+                self._close_slow_consumer(outbox)
             except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect(ws, user_id)
+                self._stats["send_errors"] += 1
+                await self.disconnect(outbox.websocket, outbox.user_id)
+                return
+        try:
+            await asyncio.wait_for(outbox.websocket.close(code=outbox.close_code), WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+        await self.disconnect(outbox.websocket, outbox.user_id)
+
+    def _close(self, outbox: _Outbox, code: int):
+        # Drop what's queued and wake the writer with the close sentinel (None)
+        if outbox.closing:
+            return
+        outbox.closing = True
+        outbox.close_code = code
+        while not outbox.queue.empty():
+            outbox.queue.get_nowait()
+            self._stats["frames_dropped"] += 1
+        outbox.queue.put_nowait(None)
+
+    def _close_slow_consumer(self, outbox: _Outbox):
+        if not outbox.closing:
+            self._stats["slow_consumer_closes"] += 1
+        self._close(outbox, WS_SLOW_CONSUMER_CLOSE_CODE)
+
+    async def deliver_local(self, user_id: int, data: dict):
+        """Queue a JSON payload on this worker's connections for a user."""
+        scoped = data.get("type") in CONVERSATION_SCOPED_EVENTS
+        for ws in list(self.active_connections.get(user_id, [])):
+            if scoped and data.get("conversation_id") not in self.subscriptions.get(ws, ()):
+                continue
+            self.enqueue(ws, data)
+
+    async def send_to_user(self, user_id: int, data: dict):
+        """Push a JSON payload to all active connections for a user, on any worker. Doesn't wait for delivery."""
+        await self.deliver_local(user_id, data)
+        if self._publish_queue is None:
+            # Not started (scripts); publish inline
+            await self.backplane.publish(user_id, data)
+            return
+        try:
+            self._publish_queue.put_nowait((user_id, data))
+        except asyncio.QueueFull:
+            self._stats["publish_dropped"] += 1
+
+    async def is_online(self, user_id: int) -> bool:
+        """Whether the user has a WebSocket open on any worker."""
+        return user_id in self.active_connections or await self.backplane.is_online(user_id)
+
+    async def online_users(self) -> set:
+        return set(self.active_connections) | await self.backplane.online_users()
+
+    def stats(self) -> dict:
+        """Connection, queue depth and dropped-frame counters for this worker since process start."""
+        depths = [outbox.queue.qsize() for outbox in self._outboxes.values()]
+        return {
+            **self._stats,
+            "backplane": type(self.backplane).__name__,
+            "users": len(self.active_connections),
+            "connections": len(self._outboxes),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "publish_queue_depth": self._publish_queue.qsize() if self._publish_queue else 0,
+        }
 
 
 # Singleton imported by messages.py to push new messages
 manager = ConnectionManager()
 
 
-@router.websocket("/ws/conversations/{conversation_id}")
-async def websocket_endpoint(
-    websocket: WebSocket,
-    conversation_id: int,
-    db: Session = Depends(get_db),
-):
-    # Accept first, then authenticate via first message (avoids token in URL/logs)
-    await websocket.accept()
+async def _active_user_id(email: str) -> Optional[int]:
+    user = principal.cached_user(email)
+    if user is None:
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(
+                select(User.id, User.is_verified, User.is_suspended).where(User.email == email)
+            )).first()
+    if not user or not user.is_verified or user.is_suspended:
+        return None
+    return user.id
+
+
+async def _conversation_peer(conversation_id: int, user_id: int) -> Optional[int]:
+    """The other participant, or None if the conversation doesn't exist or the user isn't in it."""
+    async with AsyncSessionLocal() as db:
+        conversation = (await db.execute(
+            select(Conversation.buyer_id, Conversation.seller_id).where(Conversation.id == conversation_id)
+        )).first()
+    if not conversation or user_id not in (conversation.buyer_id, conversation.seller_id):
+        return None
+    return conversation.seller_id if user_id == conversation.buyer_id else conversation.buyer_id
 
+
+async def _authenticate(websocket: WebSocket) -> Optional[int]:
+    """Read the {"type": "auth", "token": ...} first message; returns the user id or None."""
     try:
-        raw = await websocket.receive_text()
+        raw = await asyncio.wait_for(websocket.receive_text(), WS_AUTH_TIMEOUT_SECONDS)
         data = json.loads(raw)
     except Exception:
-        await websocket.close(code=4001)
-        return
+        return None
+    if not isinstance(data, dict) or data.get("type") != "auth" or not data.get("token"):
+        return None
+    email = principal.token_email(data["token"])
+    if not email:
+        return None
+    return await _active_user_id(email)
 
-    if data.get("type") != "auth" or not data.get("token"):
-        await websocket.close(code=4001)
-        return
 
-    email = verify_token(data["token"])
-    if not email:
+@router.websocket("/ws")
+async def multiplexed_websocket(websocket: WebSocket):
+    """
+    One socket per client for all real-time events, authenticated once.
+
+    Client -> server: auth (first message), subscribe / unsubscribe {conversation_id},
+    typing {conversation_id}, ping, pong.
+    Server -> client: ready, subscribed, error, new_message, messages_read, typing
+    (subscribed conversations only), badges, notification, ping, pong.
+    The server pings every WS_PING_INTERVAL_SECONDS and closes the socket (code 4008)
+    when nothing has been received for WS_IDLE_TIMEOUT_SECONDS.
+    """
+    # Accept first, then authenticate via first message (avoids token in URL/logs)
+    await websocket.accept()
+    user_id = await _authenticate(websocket)
+    if user_id is None:
         await websocket.close(code=4001)
         return
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not user.is_verified or user.is_suspended:
+    await manager.register(websocket, user_id)
+    loop = asyncio.get_running_loop()
+    last_received = loop.time()
+    peers: dict[int, int] = {}   # subscribed conversation_id -> other participant
+
+    async def keepalive():
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL_SECONDS)
+            if loop.time() - last_received > WS_IDLE_TIMEOUT_SECONDS:
+                manager.close(websocket, WS_IDLE_CLOSE_CODE)
+                return
+            manager.enqueue(websocket, {"type": "ping"})
+
+    keepalive_task = asyncio.create_task(keepalive())
+    try:
+        manager.enqueue(websocket, {"type": "ready", "user_id": user_id, "ping_interval": WS_PING_INTERVAL_SECONDS})
+        # Current counts, so the client doesn't have to poll for them on connect
+        badges = await current_badges(user_id)
+        if badges is not None:
+            manager.enqueue(websocket, {"type": "badges", **badges})
+
+        while True:
+            raw = await websocket.receive_text()
+            last_received = loop.time()
+            try:
+                msg = json.loads(raw)
+                msg_type = msg.get("type")
+                conversation_id = msg.get("conversation_id")
+                if msg_type == "ping":
+                    manager.enqueue(websocket, {"type": "pong"})
+                elif msg_type == "subscribe" and isinstance(conversation_id, int):
+                    if conversation_id not in peers:
+                        peer = await _conversation_peer(conversation_id, user_id)
+                        if peer is None:
+                            manager.enqueue(websocket, {
+                                "type": "error",
+                                "conversation_id": conversation_id,
+                                "detail": "Not authorized to view this conversation",
+                            })
+                            continue
+                        peers[conversation_id] = peer
+                        manager.subscribe(websocket, conversation_id)
+                    manager.enqueue(websocket, {"type": "subscribed", "conversation_id": conversation_id})
+                elif msg_type == "unsubscribe":
+                    peers.pop(conversation_id, None)
+                    manager.unsubscribe(websocket, conversation_id)
+                elif msg_type == "typing" and conversation_id in peers:
+                    await manager.send_to_user(peers[conversation_id], {
+                        "type": "typing",
+                        "conversation_id": conversation_id,
+                        "user_id": user_id,
+                    })
+            except (json.JSONDecodeError, AttributeError):
+                pass
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the writer closed the socket (idle or slow) while we were receiving
+        pass
+    finally:
+        keepalive_task.cancel()
+        await manager.disconnect(websocket, user_id)
+
+
+@router.websocket("/ws/conversations/{conversation_id}")
+async def websocket_endpoint(websocket: WebSocket, conversation_id: int):
+    """One socket per conversation, kept for app versions that predate /ws."""
+    # Accept first, then authenticate via first message (avoids token in URL/logs)
+    await websocket.accept()
+    user_id = await _authenticate(websocket)
+    if user_id is None:
         await websocket.close(code=4001)
         return
 
     # Verify the user is a participant in the conversation
-    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-    if not conversation or (
-        conversation.buyer_id != user.id and conversation.seller_id != user.id
-    ):
+    other_id = await _conversation_peer(conversation_id, user_id)
+    if other_id is None:
         await websocket.close(code=4003)
         return
 
     # Auth passed — register connection
-    manager.active_connections.setdefault(user.id, []).append(websocket)
-
-    other_id = conversation.seller_id if user.id == conversation.buyer_id else conversation.buyer_id
+    await manager.register(websocket, user_id, [conversation_id])
 
     try:
         while True:
@@ -95,9 +395,12 @@ async def websocket_endpoint(
                     await manager.send_to_user(other_id, {
                         "type": "typing",
                         "conversation_id": conversation_id,
-                        "user_id": user.id,
+                        "user_id": user_id,
                     })
             except (json.JSONDecodeError, Exception):
                 pass
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, user.id)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the writer closed the socket (slow consumer) while we were receiving
+        pass
+    finally:
+        await manager.disconnect(websocket, user_id)
@@ -69,6 +69,46 @@ class ListingUpdate(BaseModel):
         return v
 
 
+class SellerBadge(BaseModel):
+    id: int
+    name: str
+    is_sponsor: Optional[bool] = False
+    sponsored_category: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ListingCard(BaseModel):
+    """Browse grid projection of a listing (GET /listings?fields=card)."""
+    id: int
+    title: str
+    price: float
+    original_price: Optional[float] = None
+    category: str
+    condition: str
+    images: Optional[str] = None  # JSON array holding only the first image
+    is_sold: bool = False
+    is_boosted: bool = False
+    seller_id: int
+    seller: Optional[SellerBadge] = None
+    created_at: datetime
+
+    @field_validator('images', mode='before')
+    @classmethod
+    def first_image_only(cls, v):
+        if not v:
+            return v
+        try:
+            urls = json.loads(v) if v.startswith('[') else [p.strip() for p in v.split(',') if p.strip()]
+        except ValueError:
+            return v
+        return json.dumps(urls[:1])
+
+    class Config:
+        from_attributes = True
+
+
 class ListingResponse(BaseModel):
     id: int
     title: str
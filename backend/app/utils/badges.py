@@ -0,0 +1,260 @@
+"""
+Unread badge counters for GET /me/badges, and the `badges` / `notification` WebSocket events.
+
+- Messages: the sum of the user's conversation_summaries.unread_count over conversations
+  they haven't archived (kept current by utils/inbox.py).
+- Notifications: badge_counters.unread_notifications, incremented when a personal or
+  broadcast notification is created and decremented / zeroed when the user reads them
+  (only for notifications it counted: visible to the user and unread). A missing row is
+  computed from scratch on first read, in its own session, so new users and rows lost to
+  a failed write are always correct.
+
+Writers call touch() for users whose counts changed; once the session commits, the new
+counts are pushed to those users' open WebSockets (on any worker, see ws_backplane.py),
+preceded by a `notification` event for each notification the commit created.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import and_, event, exists, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..database import SessionLocal
+from ..models.badge_counter import BadgeCounter
+from ..models.message import Conversation, ConversationSummary
+from ..models.notification import Notification, NotificationRead
+from ..models.user import User
+
+# Sentinel for touch(): every connected user (broadcast notifications)
+ALL_CONNECTED = 0
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def bind_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Called once at startup so commits made in worker threads can schedule pushes."""
+    global _loop
+    _loop = loop
+
+
+def unread_messages_query(user_id: int):
+    """SELECT of the user's unread message count over conversations they haven't archived."""
+    return select(func.coalesce(func.sum(ConversationSummary.unread_count), 0)).join(
+        Conversation, ConversationSummary.conversation_id == Conversation.id
+    ).where(
+        ConversationSummary.user_id == user_id,
+        or_(
+            and_(Conversation.buyer_id == user_id, Conversation.archived_by_buyer == False),
+            and_(Conversation.seller_id == user_id, Conversation.archived_by_seller == False)
+        )
+    )
+
+
+def user_notification_filter(user: User):
+    """SQLAlchemy filter: notifications visible to user."""
+    return or_(
+        # Broadcasts (no recipient) scoped by university or global
+        and_(
+            Notification.recipient_user_id.is_(None),
+            or_(Notification.target_university.is_(None), Notification.target_university == user.university)
+        ),
+        # Personal notifications addressed to this specific user
+        Notification.recipient_user_id == user.id
+    )
+
+
+def _unread_by(user_id: int):
+    return ~exists().where(
+        NotificationRead.notification_id == Notification.id,
+        NotificationRead.user_id == user_id
+    )
+
+
+def _count_unread_notifications(db: Session, user: User) -> int:
+    return db.query(func.count(Notification.id)).filter(
+        user_notification_filter(user),
+        _unread_by(user.id)
+    ).scalar() or 0
+
+
+def _create_counter(user: User) -> int:
+    """Compute and store a missing counter row in its own session, leaving the caller's untouched."""
+    db = SessionLocal()
+    try:
+        unread_notifications = _count_unread_notifications(db, user)
+        db.add(BadgeCounter(user_id=user.id, unread_notifications=unread_notifications))
+        db.commit()
+        return unread_notifications
+    except IntegrityError:
+        # Created concurrently by another request
+        db.rollback()
+        return db.query(BadgeCounter.unread_notifications).filter(BadgeCounter.user_id == user.id).scalar() or 0
+    finally:
+        db.close()
+
+
+def get_badges(db: Session, user: User) -> dict:
+    """Both unread counts in one round trip (plus a few more the first time a user is seen)."""
+    row = db.execute(select(
+        unread_messages_query(user.id).scalar_subquery(),
+        select(BadgeCounter.unread_notifications).where(BadgeCounter.user_id == user.id).scalar_subquery(),
+    )).one()
+    unread_messages, unread_notifications = row
+    if unread_notifications is None:
+        unread_notifications = _create_counter(user)
+    return {
+        "unread_messages": int(unread_messages or 0),
+        "unread_notifications": max(0, int(unread_notifications)),
+    }
+
+
+def notification_created(db: Session, notification: Notification) -> None:
+    """Count a just-added notification as unread for everyone who can see it."""
+    query = db.query(BadgeCounter)
+    if notification.recipient_user_id is not None:
+        query = query.filter(BadgeCounter.user_id == notification.recipient_user_id)
+        touch(db, notification.recipient_user_id)
+    else:
+        if notification.target_university is not None:
+            query = query.filter(BadgeCounter.user_id.in_(
+                select(User.id).where(User.university == notification.target_university)
+            ))
+        touch(db, ALL_CONNECTED)
+    db.info.setdefault("new_notifications", []).append(notification)
+    # Users without a row get the notification counted when their row is first computed
+    query.update(
+        {BadgeCounter.unread_notifications: BadgeCounter.unread_notifications + 1},
+        synchronize_session=False
+    )
+
+
+def notification_read(db: Session, user: User, notification_id: int) -> bool:
+    """
+    Mark a notification read and take it off the user's counter. Does nothing (and returns
+    False) unless the notification is one the counter includes: visible to the user and unread.
+    """
+    unread = db.query(Notification.id).filter(
+        Notification.id == notification_id,
+        user_notification_filter(user),
+        _unread_by(user.id)
+    ).first()
+    if unread is None:
+        return False
+    db.add(NotificationRead(notification_id=notification_id, user_id=user.id))
+    db.query(BadgeCounter).filter(
+        BadgeCounter.user_id == user.id,
+        BadgeCounter.unread_notifications > 0
+    ).update(
+        {BadgeCounter.unread_notifications: BadgeCounter.unread_notifications - 1},
+        synchronize_session=False
+    )
+    touch(db, user.id)
+    return True
+
+
+def all_notifications_read(db: Session, user_id: int) -> None:
+    db.query(BadgeCounter).filter(BadgeCounter.user_id == user_id).update(
+        {BadgeCounter.unread_notifications: 0}, synchronize_session=False
+    )
+    touch(db, user_id)
+
+
+def touch(db: Session, *user_ids: int) -> None:
+    """Push fresh badge counts to these users after the session's next commit."""
+    db.info.setdefault("badge_users", set()).update(user_ids)
+
+
+def _notification_event(notification: Notification) -> dict:
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "message": notification.message,
+        "type": notification.type,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        # Used to pick recipients; not sent to clients
+        "recipient_user_id": notification.recipient_user_id,
+        "target_university": notification.target_university,
+    }
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _snapshot_notifications(session, flush_context):
+    # Capture new notifications while their ids are loaded (commit expires them)
+    pending = session.info.get("new_notifications")
+    if pending:
+        flushed = [n for n in pending if n.id is not None]
+        session.info.setdefault("notification_events", []).extend(_notification_event(n) for n in flushed)
+        session.info["new_notifications"] = [n for n in pending if n.id is None]
+
+
+@event.listens_for(Session, "after_commit")
+def _push_after_commit(session):
+    user_ids = session.info.pop("badge_users", None)
+    notifications = session.info.pop("notification_events", None)
+    session.info.pop("new_notifications", None)
+    if user_ids and _loop is not None:
+        coro = push_badges(user_ids, notifications)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is _loop:
+            _loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, _loop)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    for key in ("badge_users", "notification_events", "new_notifications"):
+        session.info.pop(key, None)
+
+
+def _load_badges(user_ids) -> dict:
+    """user_id -> (university, badges) for the given users, in a short-lived session."""
+    db = SessionLocal()
+    try:
+        users = db.query(User).filter(User.id.in_(user_ids)).all()
+        return {u.id: (u.university, get_badges(db, u)) for u in users}
+    finally:
+        db.close()
+
+
+async def current_badges(user_id: int) -> Optional[dict]:
+    """One user's counts, loaded off the event loop."""
+    loaded = await run_in_threadpool(_load_badges, [user_id])
+    return loaded[user_id][1] if user_id in loaded else None
+
+
+def _visible_to(event: dict, user_id: int, university: Optional[str]) -> bool:
+    if event["recipient_user_id"] is not None:
+        return event["recipient_user_id"] == user_id
+    return event["target_university"] is None or event["target_university"] == university
+
+
+async def push_badges(user_ids: set, notifications: Optional[list] = None) -> None:
+    """
+    Send a `badges` event with current counts to each user that has an open WebSocket,
+    after a `notification` event for each of `notifications` the user can see.
+    """
+    from ..routers.ws import manager
+
+    if ALL_CONNECTED in user_ids:
+        targets = await manager.online_users()
+    else:
+        targets = {user_id for user_id in user_ids if await manager.is_online(user_id)}
+    if not targets:
+        return
+
+    try:
+        counts = await run_in_threadpool(_load_badges, targets)
+    except Exception as e:
+        print(f"[badges] Failed to load counts: {e}")
+        return
+    for user_id, (university, badges) in counts.items():
+        for notification in notifications or ():
+            if _visible_to(notification, user_id, university):
+                payload = {k: v for k, v in notification.items() if k not in ("recipient_user_id", "target_university")}
+                await manager.send_to_user(user_id, {"type": "notification", "notification": payload})
+        await manager.send_to_user(user_id, {"type": "badges", **badges})
@@ -0,0 +1,91 @@
+"""
+Cached GET /listings results.
+Browse requests are mostly the same few filter combinations, so the ordered page of
+listing ids for each normalized set of filters is kept in the shared cache for a short
+TTL. Entries are user-agnostic: they hold (listing id, seller id) pairs and the caller
+drops hidden sellers (suspended / blocked, see visibility.py) afterwards.
+
+Any committed change to a listing, or to a seller's sponsorship or university, bumps a
+version number that is part of every key, so stale entries are never read again and
+simply age out. View-count-only updates don't count as changes.
+"""
+import hashlib
+import json
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..models.listing import Listing
+from ..models.user import User
+from .cache import get_cache
+
+BROWSE_CACHE_TTL_SECONDS = 30
+# Unpaginated requests can return the whole catalog; don't cache lists longer than this
+MAX_CACHED_IDS = 2000
+
+_VERSION_KEY = "browse:version"
+_IGNORED_LISTING_FIELDS = {"view_count", "updated_at"}
+_BROWSE_USER_FIELDS = {"is_sponsor", "sponsored_category", "sponsored_universities", "university"}
+
+
+def _cache_key(params: dict) -> str:
+    version = get_cache().get(_VERSION_KEY) or 0
+    if isinstance(version, bytes):
+        version = version.decode()
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"browse:{version}:{digest}"
+
+
+def get_cached_page(params: dict) -> tuple:
+    """
+    Returns (key, entry). `entry` is {"ids": [[listing_id, seller_id], ...], "next": cursor | None},
+    or None on a miss; pass `key` back to store_page so a miss is stored under the version
+    that was current when it started.
+    """
+    key = _cache_key(params)
+    raw = get_cache().get(key)
+    return key, (json.loads(raw) if raw is not None else None)
+
+
+def store_page(key: str, listings: list, next_cursor: Optional[str]) -> None:
+    if len(listings) > MAX_CACHED_IDS:
+        return
+    entry = {"ids": [[l.id, l.seller_id] for l in listings], "next": next_cursor}
+    get_cache().set(key, json.dumps(entry), ex=BROWSE_CACHE_TTL_SECONDS)
+
+
+def invalidate_browse_cache() -> None:
+    get_cache().incr(_VERSION_KEY)
+
+
+def _affects_browse(obj) -> bool:
+    if isinstance(obj, Listing):
+        fields = _IGNORED_LISTING_FIELDS
+        state = inspect(obj)
+        return any(
+            attr.history.has_changes() for attr in state.attrs if attr.key not in fields
+        )
+    if isinstance(obj, User):
+        state = inspect(obj)
+        return any(state.attrs[name].history.has_changes() for name in _BROWSE_USER_FIELDS)
+    return False
+
+
+@event.listens_for(Session, "before_flush")
+def _track_browse_changes(session, flush_context, instances):
+    if session.info.get("browse_changed"):
+        return
+    if any(isinstance(obj, Listing) for obj in session.new) or \
+            any(isinstance(obj, Listing) for obj in session.deleted) or \
+            any(_affects_browse(obj) for obj in session.dirty):
+        session.info["browse_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("browse_changed", False):
+        invalidate_browse_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("browse_changed", None)
@@ -0,0 +1,90 @@
+"""
+Shared key/value cache used for cached query results.
+Backends implement the small subset of the Redis client API we rely on
+(get / set with `ex` / incr / delete), so a redis.Redis client or any stand-in with
+the same methods can be plugged in. The default is an in-process LRU, which is
+per worker; set REDIS_URL to share entries and invalidations across workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol, Union
+from ..config import settings
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class CacheBackend(Protocol):
+    def get(self, name: str) -> Optional[Union[bytes, str]]: ...
+    def set(self, name: str, value: Union[bytes, str], ex: Optional[int] = None) -> bool: ...
+    def incr(self, name: str) -> int: ...
+    def delete(self, *names: str) -> int: ...
+
+
+class LRUCache:
+    """Thread-safe in-process cache with per-key expiry and least-recently-used eviction."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()   # name -> (value, expires_at | None)
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[name]
+                return None
+            self._data.move_to_end(name)
+            return value
+
+    def set(self, name, value, ex=None):
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[name] = (value, expires_at)
+            self._data.move_to_end(name)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return True
+
+    def incr(self, name):
+        with self._lock:
+            value, expires_at = self._data.get(name, (0, None))
+            value = int(value) + 1
+            self._data[name] = (value, expires_at)
+            self._data.move_to_end(name)
+            return value
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    """The configured cache backend, created on first use."""
+    global _backend
+    if _backend is None:
+        _backend = _create_backend()
+    return _backend
+
+
+def set_cache(backend: CacheBackend) -> None:
+    """Swap the backend, e.g. for a Redis stand-in in tests."""
+    global _backend
+    _backend = backend
+
+
+def _create_backend() -> CacheBackend:
+    if settings.redis_url:
+        try:
+            import redis
+            return redis.Redis.from_url(settings.redis_url)
+        except ImportError:
+            print("WARNING: REDIS_URL is set but the redis package is not installed - using in-process cache")
+    return LRUCache()
@@ -1,18 +1,22 @@
-import cloudinary
-import cloudinary.uploader
 from fastapi import UploadFile, HTTPException
+from functools import lru_cache
 import os
 
-# Configure Cloudinary with environment variables
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
-
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+@lru_cache(maxsize=None)
+def get_uploader():
+    """cloudinary.uploader, configured from the environment on first use"""
+    import cloudinary
+    import cloudinary.uploader
+    cloudinary.config(
+        cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.getenv("CLOUDINARY_API_KEY"),
+        api_secret=os.getenv("CLOUDINARY_API_SECRET")
+    )
+    return cloudinary.uploader
+
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
     return '.' in filename and \
@@ -51,7 +55,7 @@ async def upload_image(file: UploadFile, folder: str = "unicycle") -> dict:
     
     try:
         # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
+        result = get_uploader().upload(
             contents,
             folder=folder,
             resource_type="image",
@@ -75,7 +79,7 @@ async def upload_image(file: UploadFile, folder: str = "unicycle") -> dict:
 async def delete_image(public_id: str) -> bool:
     """Delete an image from Cloudinary"""
     try:
-        result = cloudinary.uploader.destroy(public_id)
+        result = get_uploader().destroy(public_id)
         return result.get("result") == "ok"
     except Exception:
         return False
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Connection pool settings and metrics for the sync and async engines.
+
+Sizing: every sync endpoint runs in one of anyio's THREADPOOL_SIZE worker threads and holds a
+pooled connection while it does, and a few background threads (scheduler, outbox worker, push
+receipts, view flushes) hold more. Unless DB_MAX_OVERFLOW is set, the sync
+pool may grow to THREADPOOL_SIZE + BACKGROUND_CONNECTIONS, so a thread never waits on the pool
+just because the pool is smaller than the threadpool feeding it. The async engine serves the
+event loop, not the threadpool, and keeps its own DB_POOL_SIZE + DB_MAX_OVERFLOW (default 10).
+
+Metrics come from pool events (connect / checkout / checkin / detach / invalidate), plus the time each
+checkout waited for a free connection. pool_stats() reports them per engine. SQLite keeps
+SQLAlchemy's default pool sizing; it is still instrumented.
+
+On PostgreSQL every connection gets `SET statement_timeout` (DB_STATEMENT_TIMEOUT_MS, 0 = none),
+so a runaway query is cancelled instead of holding its connection indefinitely.
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from ..config import settings
+
+THREADPOOL_SIZE = settings.threadpool_size
+BACKGROUND_CONNECTIONS = 4
+SLOW_CHECKOUT_SECONDS = 0.1
+DEFAULT_ASYNC_MAX_OVERFLOW = 10
+
+_metrics: dict = {}  # engine name -> PoolMetrics
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.invalidations = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.slow_checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if seconds >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+        if timed_out:
+            print(f"[db-pool] {self.name}: no connection after {seconds:.1f}s (pool exhausted)")
+
+    def checked_out(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            stats = {
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "avg_wait_ms": round(self.wait_total / waits * 1000, 2) if waits else None,
+                "max_wait_ms": round(self.wait_max * 1000, 1),
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                pool_size=pool.size(),
+                max_overflow=pool._max_overflow,
+                idle=pool.checkedin(),
+                # Negative while the pool hasn't filled up to pool_size yet
+                overflow=max(0, pool.overflow()),
+            )
+        return stats
+
+
+class _TimedCheckout:
+    """Times how long each checkout waits for a connection (there is no event before a checkout)."""
+
+    _metrics_name: str
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            _metrics[self._metrics_name].record_wait(time.monotonic() - started, timed_out=True)
+            raise
+        _metrics[self._metrics_name].record_wait(time.monotonic() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    _metrics_name = "sync"
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    _metrics_name = "async"
+
+
+def engine_options(url: str, name: str) -> dict:
+    """create_engine / create_async_engine keyword arguments for the `sync` or `async` engine."""
+    options = {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+    if name == "sync":
+        max_overflow = settings.db_max_overflow
+        if max_overflow is None:
+            max_overflow = max(0, THREADPOOL_SIZE + BACKGROUND_CONNECTIONS - settings.db_pool_size)
+        elif settings.db_pool_size + max_overflow < THREADPOOL_SIZE:
+            print(f"[db-pool] DB_POOL_SIZE + DB_MAX_OVERFLOW ({settings.db_pool_size + max_overflow}) is below "
+                  f"THREADPOOL_SIZE ({THREADPOOL_SIZE}): sync endpoints will queue for connections")
+        poolclass = InstrumentedQueuePool
+    else:
+        max_overflow = settings.db_max_overflow if settings.db_max_overflow is not None else DEFAULT_ASYNC_MAX_OVERFLOW
+        poolclass = InstrumentedAsyncQueuePool
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.db_pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    return options
+
+
+def instrument(engine, name: str) -> None:
+    """Collect pool metrics for a sync Engine (for an AsyncEngine, pass its .sync_engine)."""
+    metrics = _metrics[name] = PoolMetrics(name)
+    is_postgres = engine.dialect.name == "postgresql"
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        with metrics._lock:
+            metrics.connects += 1
+        if is_postgres and settings.db_statement_timeout_ms:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET statement_timeout = {int(settings.db_statement_timeout_ms)}")
+            cursor.close()
+            # psycopg2 opened a transaction for the SET; don't leave the connection inside it
+            dbapi_connection.commit()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checked_out()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checked_in()
+
+    @event.listens_for(engine, "detach")
+    def on_detach(dbapi_connection, connection_record):
+        # Leaves the pool without a checkin (the backplane's LISTEN connection)
+        metrics.checked_in()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with metrics._lock:
+            metrics.invalidations += 1
+
+
+def pool_stats() -> dict:
+    """Per-engine pool metrics for this worker."""
+    from ..database import async_engine, engine
+    pools = {"sync": engine.pool, "async": async_engine.sync_engine.pool}
+    return {
+        "threadpool_size": THREADPOOL_SIZE,
+        **{name: metrics.snapshot(pools[name]) for name, metrics in _metrics.items()},
+    }
@@ -2,11 +2,13 @@
 Shared dependency functions for route protection
 """
 from fastapi import Depends, HTTPException, status, Header
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models.user import User
-from .auth import verify_token
+from . import principal
 
 
 def get_current_user_optional(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
@@ -19,16 +21,15 @@ def get_current_user_optional(authorization: Optional[str] = Header(None), db: S
     except IndexError:
         return None
 
-    email = verify_token(token)
+    email = principal.token_email(token)
     if not email:
         return None
 
-    user = db.query(User).filter(User.email == email).first()
-    return user
+    return load_user(db, email)
 
 
-def get_current_user_required(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    """Require authenticated and verified user"""
+def _email_from_header(authorization: Optional[str]) -> str:
+    """Email from a `Bearer <token>` header, or 401"""
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,14 +44,40 @@ def get_current_user_required(authorization: Optional[str] = Header(None), db: S
             detail="Invalid authorization header"
         )
 
-    email = verify_token(token)
+    email = principal.token_email(token)
     if not email:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
+    return email
+
 
+def load_user(db: Session, email: str) -> Optional[User]:
+    """The user for a token, from the principal cache when it has a fresh snapshot"""
+    user = principal.cached_user(email)
+    if user is not None:
+        return db.merge(user, load=False)
+    generation = principal.generation()
     user = db.query(User).filter(User.email == email).first()
+    if user:
+        principal.remember(user, generation)
+    return user
+
+
+async def load_user_async(db: AsyncSession, email: str) -> Optional[User]:
+    user = principal.cached_user(email)
+    if user is not None:
+        return await db.merge(user, load=False)
+    generation = principal.generation()
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if user:
+        principal.remember(user, generation)
+    return user
+
+
+def _require_active(user: Optional[User]) -> User:
+    """The user if they exist, are verified and aren't suspended"""
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,6 +101,21 @@ def get_current_user_required(authorization: Optional[str] = Header(None), db: S
     return user
 
 
+def get_current_user_required(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    """Require authenticated and verified user"""
+    email = _email_from_header(authorization)
+    return _require_active(load_user(db, email))
+
+
+async def get_current_user_required_async(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Async variant of get_current_user_required, for endpoints using get_async_db"""
+    email = _email_from_header(authorization)
+    return _require_active(await load_user_async(db, email))
+
+
 def get_admin_required(current_user: User = Depends(get_current_user_required)):
     """Require authenticated admin user"""
     if not current_user.is_admin:
@@ -1,19 +1,42 @@
-import resend
+"""
+Transactional emails.
+
+Each send_*_email() renders its template and queues the email on the outbox (utils/outbox.py).
+Pass the caller's session as `db` to commit the email together with the change that caused it;
+without one it is committed right away on its own session. The outbox worker hands queued
+emails to the sink in batches of up to EMAIL_BATCH_SIZE (Resend's batch endpoint limit),
+holding back any beyond EMAIL_RECIPIENT_LIMIT per recipient per EMAIL_RECIPIENT_WINDOW_SECONDS.
+That limit is kept in memory, so it is per worker process: with N workers running the outbox a
+recipient can get up to N times the limit, and a restart forgets what was sent.
+
+Templates are compiled once at import: the layouts are filled with each email's fixed parts,
+leaving only the per-email values, which are HTML-escaped when rendered.
+
+Without RESEND_API_KEY emails go to ConsoleSink; tests can install a MemorySink with set_email_sink().
+"""
 import os
 import secrets
 import html
+import threading
+import time
+from collections import deque
+from string import Template
 from datetime import datetime, timedelta, timezone
+from ..database import SessionLocal
+from .outbox import RetryLater, enqueue, job_handler
 
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
 if not RESEND_API_KEY:
     print("WARNING: RESEND_API_KEY not set - emails will be printed to console only")
-else:
-    resend.api_key = RESEND_API_KEY
 
 FROM_EMAIL = "noreply@unicycleapp.ca"
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "")
 
+EMAIL_BATCH_SIZE = 100
+EMAIL_RECIPIENT_LIMIT = 10
+EMAIL_RECIPIENT_WINDOW_SECONDS = 3600
+
 
 def generate_verification_token():
     return secrets.token_urlsafe(32)
@@ -26,191 +49,326 @@ def is_token_expired(token_created_at: datetime) -> bool:
     return datetime.now(timezone.utc) > expiry_time
 
 
-def _send(to: str, subject: str, html_content: str):
-    """Internal helper to send via Resend or fall back to console."""
-    if not RESEND_API_KEY:
-        print(f"[email] No RESEND_API_KEY -- would send to {to}: {subject}")
-        return None
-    params: resend.Emails.SendParams = {
-        "from": FROM_EMAIL,
-        "to": [to],
-        "subject": subject,
-        "html": html_content,
-    }
-    return resend.Emails.send(params)
+# SINKS
 
+class ConsoleSink:
+    """Prints emails instead of sending them (no RESEND_API_KEY)."""
+
+    def send_batch(self, emails: list) -> None:
+        for email in emails:
+            print(f"[email] No RESEND_API_KEY -- would send to {email['to']}: {email['subject']}")
+
+
+class ResendSink:
+    """Sends through Resend's batch endpoint; the SDK is imported on the first batch."""
+
+    def send_batch(self, emails: list) -> None:
+        import resend
+        resend.api_key = RESEND_API_KEY
+        resend.Batch.send([{
+            "from": FROM_EMAIL,
+            "to": [email["to"]],
+            "subject": email["subject"],
+            "html": email["html"],
+        } for email in emails])
+
+
+class MemorySink:
+    """Keeps delivered emails in `sent`, for tests."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, emails: list) -> None:
+        self.sent.extend(emails)
+
+
+_sink = ResendSink() if RESEND_API_KEY else ConsoleSink()
+
+
+def set_email_sink(sink) -> None:
+    """Replace where queued emails are delivered (any object with send_batch(emails))."""
+    global _sink
+    _sink = sink
+
+
+# QUEUE
+
+_recent_lock = threading.Lock()
+_recent: dict = {}  # recipient -> monotonic times of emails this process's sink accepted in the window
+
+
+def _queue(to: str, subject: str, html_content: str, db=None) -> None:
+    if not to:
+        return
+    if db is not None:
+        enqueue(db, "email", to=to, subject=subject, html=html_content)
+        return
+    own = SessionLocal()
+    try:
+        enqueue(own, "email", to=to, subject=subject, html=html_content)
+        own.commit()
+    finally:
+        own.close()
+
+
+@job_handler("email", batch_size=EMAIL_BATCH_SIZE)
+def deliver_emails(emails: list) -> dict:
+    """
+    Send a batch of queued emails, deferring those over a recipient's limit.
+    The limit counts only what this process has sent (see the module docstring).
+    """
+    errors = {}
+    ready = []
+    in_batch: dict = {}  # recipient -> emails to them already in this batch
+    now = time.monotonic()
+    with _recent_lock:
+        for i, email in enumerate(emails):
+            recipient = email["to"].lower()
+            sent = _recent.get(recipient, deque())
+            while sent and sent[0] <= now - EMAIL_RECIPIENT_WINDOW_SECONDS:
+                sent.popleft()
+            if len(sent) + in_batch.get(recipient, 0) >= EMAIL_RECIPIENT_LIMIT:
+                window_start = sent[0] if sent else now
+                errors[i] = RetryLater(window_start + EMAIL_RECIPIENT_WINDOW_SECONDS - now)
+            else:
+                in_batch[recipient] = in_batch.get(recipient, 0) + 1
+                ready.append(i)
+        for recipient in [r for r, sent in _recent.items() if not sent]:
+            del _recent[recipient]
+    if ready:
+        try:
+            _sink.send_batch([emails[i] for i in ready])
+        except Exception as e:
+            errors.update((i, e) for i in ready)
+            return errors
+        # Only sends the sink accepted count against the limit; a failed batch is retried in full
+        sent_at = time.monotonic()
+        with _recent_lock:
+            for i in ready:
+                _recent.setdefault(emails[i]["to"].lower(), deque()).append(sent_at)
+    return errors
+
+
+# TEMPLATES
+
+def _compile(layout: str, **parts) -> Template:
+    """Fill a layout's fixed parts once; the remaining $placeholders are filled by _render()."""
+    return Template(Template(layout).safe_substitute(parts))
 
-def send_verification_email(email: str, name: str, token: str):
-    verification_link = f"{FRONTEND_URL}/verify-email?token={token}"
-    print(f"[email] Sending verification email to {email} -- link: {verification_link}")
 
-    html_content = f"""
+def _render(template: Template, **values) -> str:
+    return template.substitute({key: html.escape(str(value)) for key, value in values.items()})
+
+
+_STYLED_LAYOUT = """
         <!DOCTYPE html>
         <html>
         <head>
             <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #22c55e 0%, #16a34a 100%); color: white; padding: 30px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .button {{ display: inline-block; background: #22c55e; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold; }}
-                .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #666; }}
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: linear-gradient(135deg, #22c55e 0%, #16a34a 100%); color: white; padding: 30px; text-align: center; border-radius: 8px 8px 0 0; }
+                .content { background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px; }
+                .button { display: inline-block; background: #22c55e; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold; }
+                .footer { text-align: center; margin-top: 20px; font-size: 12px; color: #666; }
             </style>
         </head>
         <body>
             <div class="container">
                 <div class="header">
-                    <h1>Welcome to UniCycle!</h1>
+                    <h1>$heading</h1>
                 </div>
-                <div class="content">
-                    <p>Hi {html.escape(name)},</p>
-                    <p>Thanks for joining UniCycle -- the student marketplace for Montreal universities!</p>
-                    <p>Click below to verify your student email and set your password:</p>
-                    <center>
-                        <a href="{verification_link}" class="button">Verify Email Address</a>
-                    </center>
-                    <p><small>Or copy and paste this link:</small><br>
-                    <small style="color: #22c55e;">{verification_link}</small></p>
-                    <p><strong>This link expires in 24 hours.</strong></p>
+                <div class="content">$content
                 </div>
-                <div class="footer">
-                    <p>If you didn't create an account, ignore this email.</p>
+                <div class="footer">$footer
                     <p>&copy; 2025 UniCycle</p>
                 </div>
             </div>
         </body>
         </html>
-    """
-    _send(email, "Verify your UniCycle student account", html_content)
+"""
 
+_PLAIN_LAYOUT = """
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">$content
+            </div>
+        </body>
+        </html>
+"""
 
-def send_reset_email(email: str, name: str, token: str):
-    reset_link = f"{FRONTEND_URL}/reset-password?reset_token={token}"
-    print(f"[email] Sending password reset email to {email} -- link: {reset_link}")
-
-    html_content = f"""
+_BANNER_LAYOUT = """
         <!DOCTYPE html>
         <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #22c55e 0%, #16a34a 100%); color: white; padding: 30px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .button {{ display: inline-block; background: #22c55e; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold; }}
-                .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #666; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Reset Your Password</h1>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="background: $color; color: white; padding: 24px 30px; border-radius: 8px 8px 0 0;">
+                    <h2 style="margin: 0;">$heading</h2>
                 </div>
-                <div class="content">
-                    <p>Hi {html.escape(name)},</p>
-                    <p>We received a request to reset your UniCycle password. Click below to set a new one:</p>
+                <div style="background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px;">$content
                     <center>
-                        <a href="{reset_link}" class="button">Reset Password</a>
+                        <a href="$$link" style="display: inline-block; background: #16a34a; color: white; padding: 12px 28px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold;">$button</a>
                     </center>
-                    <p><small>Or copy and paste this link:</small><br>
-                    <small style="color: #22c55e;">{reset_link}</small></p>
-                    <p><strong>This link expires in 24 hours.</strong></p>
-                    <p style="font-size: 14px; color: #666;">If you didn't request this, you can safely ignore this email.</p>
-                </div>
-                <div class="footer">
-                    <p>&copy; 2025 UniCycle</p>
+                    <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
                 </div>
             </div>
         </body>
         </html>
-    """
-    _send(email, "Reset your UniCycle password", html_content)
+"""
 
+_VERIFICATION = _compile(
+    _STYLED_LAYOUT,
+    heading="Welcome to UniCycle!",
+    content="""
+                    <p>Hi $name,</p>
+                    <p>Thanks for joining UniCycle -- the student marketplace for Montreal universities!</p>
+                    <p>Click below to verify your student email and set your password:</p>
+                    <center>
+                        <a href="$link" class="button">Verify Email Address</a>
+                    </center>
+                    <p><small>Or copy and paste this link:</small><br>
+                    <small style="color: #22c55e;">$link</small></p>
+                    <p><strong>This link expires in 24 hours.</strong></p>""",
+    footer="""
+                    <p>If you didn't create an account, ignore this email.</p>""",
+)
 
-def send_suspension_email(email: str, name: str):
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+_RESET = _compile(
+    _STYLED_LAYOUT,
+    heading="Reset Your Password",
+    content="""
+                    <p>Hi $name,</p>
+                    <p>We received a request to reset your UniCycle password. Click below to set a new one:</p>
+                    <center>
+                        <a href="$link" class="button">Reset Password</a>
+                    </center>
+                    <p><small>Or copy and paste this link:</small><br>
+                    <small style="color: #22c55e;">$link</small></p>
+                    <p><strong>This link expires in 24 hours.</strong></p>
+                    <p style="font-size: 14px; color: #666;">If you didn't request this, you can safely ignore this email.</p>""",
+    footer="",
+)
+
+_SUSPENSION = _compile(_PLAIN_LAYOUT, content="""
                 <h2 style="color: #ef4444;">Account Suspended</h2>
-                <p>Hi {html.escape(name)},</p>
+                <p>Hi $name,</p>
                 <p>Your UniCycle account has been <strong>suspended</strong> due to a violation of our community guidelines.</p>
                 <p>If you believe this is a mistake, please reply to this email and our team will review your case within 24-48 hours.</p>
-                <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
-            </div>
-        </body>
-        </html>
-    """
-    _send(email, "Your UniCycle account has been suspended", html_content)
+                <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>""")
 
+_ROW = '<tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">{label}</td><td style="padding: 8px; border: 1px solid #e5e7eb;">${field}</td></tr>'
 
-def send_report_email(
-    reporter_name: str,
-    reporter_email: str,
-    reporter_university: str,
-    reportee_name: str,
-    reportee_email: str,
-    reportee_university: str,
-    reason: str,
-    details: str = "",
-):
-    _rn = html.escape(reporter_name)
-    _re = html.escape(reporter_email)
-    _ru = html.escape(reporter_university)
-    _dn = html.escape(reportee_name)
-    _de = html.escape(reportee_email)
-    _du = html.escape(reportee_university)
-    _rs = html.escape(reason)
-    _dt = html.escape(details) if details else "-"
-
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+_REPORT = _compile(_PLAIN_LAYOUT, content=f"""
                 <h2 style="color: #ef4444;">User Report Received</h2>
                 <table style="width: 100%; border-collapse: collapse; margin: 16px 0;">
                     <tr style="background: #fef2f2;">
                         <th colspan="2" style="padding: 10px; text-align: left; border: 1px solid #fecaca;">Reported User</th>
                     </tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">Name</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_dn}</td></tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">Email</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_de}</td></tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">University</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_du}</td></tr>
+                    {_ROW.format(label="Name", field="reportee_name")}
+                    {_ROW.format(label="Email", field="reportee_email")}
+                    {_ROW.format(label="University", field="reportee_university")}
                     <tr style="background: #f0fdf4;">
                         <th colspan="2" style="padding: 10px; text-align: left; border: 1px solid #bbf7d0;">Reporter</th>
                     </tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">Name</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_rn}</td></tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">Email</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_re}</td></tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">University</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_ru}</td></tr>
+                    {_ROW.format(label="Name", field="reporter_name")}
+                    {_ROW.format(label="Email", field="reporter_email")}
+                    {_ROW.format(label="University", field="reporter_university")}
                     <tr style="background: #fffbeb;">
                         <th colspan="2" style="padding: 10px; text-align: left; border: 1px solid #fde68a;">Report Details</th>
                     </tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">Reason</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_rs}</td></tr>
-                    <tr><td style="padding: 8px; border: 1px solid #e5e7eb; font-weight: 600;">Details</td><td style="padding: 8px; border: 1px solid #e5e7eb;">{_dt}</td></tr>
-                </table>
-            </div>
-        </body>
-        </html>
-    """
-    _send(ADMIN_EMAIL, f"[UniCycle Report] {_rn} reported {_dn}", html_content)
-
+                    {_ROW.format(label="Reason", field="reason")}
+                    {_ROW.format(label="Details", field="details")}
+                </table>""")
 
-def send_direct_email(email: str, name: str, subject: str, message: str):
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+_DIRECT = _compile(_PLAIN_LAYOUT, content="""
                 <h2>Message from UniCycle Team</h2>
-                <p>Hi {html.escape(name)},</p>
-                <div style="background: white; border-left: 4px solid #22c55e; padding: 15px 20px; margin: 15px 0; white-space: pre-wrap;">{html.escape(message)}</div>
-                <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
-            </div>
-        </body>
-        </html>
-    """
-    _send(email, subject, html_content)
+                <p>Hi $name,</p>
+                <div style="background: white; border-left: 4px solid #22c55e; padding: 15px 20px; margin: 15px 0; white-space: pre-wrap;">$message</div>
+                <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>""")
+
+_NEW_MESSAGE = _compile(
+    _BANNER_LAYOUT, color="#16a34a", heading="New message on UniCycle", button="View Message",
+    content="""
+                    <p>Hi $name,</p>
+                    <p><strong>$sender_name</strong> sent you a message about <strong>$listing_title</strong>.</p>""",
+)
+
+_LISTING_EXPIRY = _compile(
+    _BANNER_LAYOUT, color="#d97706", heading="Your listing is expiring soon", button="Renew Listing",
+    content="""
+                    <p>Hi $name,</p>
+                    <p>Your listing <strong>$listing_title</strong> will be deactivated in <strong>$days_left $day_word</strong>.</p>
+                    <p>Renew it from your My Listings page to keep it visible to buyers.</p>""",
+)
+
+_REVIEW_PROMPT = _compile(
+    _BANNER_LAYOUT, color="#16a34a", heading="How was your purchase?", button="Leave a Review",
+    content="""
+                    <p>Hi $name,</p>
+                    <p>You recently purchased <strong>$listing_title</strong> from <strong>$seller_name</strong>.</p>
+                    <p>Help the community by leaving a quick review!</p>""",
+)
+
+_SAVED_SEARCH_ALERT = _compile(
+    _BANNER_LAYOUT, color="#2563eb", heading="New listings match your search", button="View Listings",
+    content="""
+                    <p>Hi $name,</p>
+                    <p><strong>$match_count new $item_word</strong> matching <em>$search_desc</em> were just listed on UniCycle.</p>""",
+)
+
+
+# EMAILS
+
+def send_verification_email(email: str, name: str, token: str, db=None):
+    verification_link = f"{FRONTEND_URL}/verify-email?token={token}"
+    print(f"[email] Sending verification email to {email} -- link: {verification_link}")
+    html_content = _render(_VERIFICATION, name=name, link=verification_link)
+    _queue(email, "Verify your UniCycle student account", html_content, db)
+
+
+def send_reset_email(email: str, name: str, token: str, db=None):
+    reset_link = f"{FRONTEND_URL}/reset-password?reset_token={token}"
+    print(f"[email] Sending password reset email to {email} -- link: {reset_link}")
+    html_content = _render(_RESET, name=name, link=reset_link)
+    _queue(email, "Reset your UniCycle password", html_content, db)
+
+
+def send_suspension_email(email: str, name: str, db=None):
+    html_content = _render(_SUSPENSION, name=name)
+    _queue(email, "Your UniCycle account has been suspended", html_content, db)
+
+
+def send_report_email(
+    reporter_name: str,
+    reporter_email: str,
+    reporter_university: str,
+    reportee_name: str,
+    reportee_email: str,
+    reportee_university: str,
+    reason: str,
+    details: str = "",
+    db=None,
+):
+    html_content = _render(
+        _REPORT,
+        reporter_name=reporter_name,
+        reporter_email=reporter_email,
+        reporter_university=reporter_university,
+        reportee_name=reportee_name,
+        reportee_email=reportee_email,
+        reportee_university=reportee_university,
+        reason=reason,
+        details=details or "-",
+    )
+    subject = f"[UniCycle Report] {html.escape(reporter_name)} reported {html.escape(reportee_name)}"
+    _queue(ADMIN_EMAIL, subject, html_content, db)
+
+
+def send_direct_email(email: str, name: str, subject: str, message: str, db=None):
+    html_content = _render(_DIRECT, name=name, message=message)
+    _queue(email, subject, html_content, db)
 
 
 def send_message_email(
@@ -218,28 +376,13 @@ def send_message_email(
     recipient_name: str,
     sender_name: str,
     listing_title: str,
+    db=None,
 ):
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: #16a34a; color: white; padding: 24px 30px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">New message on UniCycle</h2>
-                </div>
-                <div style="background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px;">
-                    <p>Hi {html.escape(recipient_name)},</p>
-                    <p><strong>{html.escape(sender_name)}</strong> sent you a message about <strong>{html.escape(listing_title)}</strong>.</p>
-                    <center>
-                        <a href="{FRONTEND_URL}" style="display: inline-block; background: #16a34a; color: white; padding: 12px 28px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold;">View Message</a>
-                    </center>
-                    <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
-                </div>
-            </div>
-        </body>
-        </html>
-    """
-    _send(recipient_email, f"{sender_name} sent you a message on UniCycle", html_content)
+    html_content = _render(
+        _NEW_MESSAGE, name=recipient_name, sender_name=sender_name, listing_title=listing_title,
+        link=FRONTEND_URL,
+    )
+    _queue(recipient_email, f"{sender_name} sent you a message on UniCycle", html_content, db)
 
 
 def send_listing_expiry_email(
@@ -248,30 +391,14 @@ def send_listing_expiry_email(
     listing_title: str,
     listing_id: int,
     days_left: int,
+    db=None,
 ):
     day_word = "day" if days_left == 1 else "days"
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: #d97706; color: white; padding: 24px 30px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">Your listing is expiring soon</h2>
-                </div>
-                <div style="background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px;">
-                    <p>Hi {html.escape(seller_name)},</p>
-                    <p>Your listing <strong>{html.escape(listing_title)}</strong> will be deactivated in <strong>{days_left} {day_word}</strong>.</p>
-                    <p>Renew it from your My Listings page to keep it visible to buyers.</p>
-                    <center>
-                        <a href="{FRONTEND_URL}" style="display: inline-block; background: #16a34a; color: white; padding: 12px 28px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold;">Renew Listing</a>
-                    </center>
-                    <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
-                </div>
-            </div>
-        </body>
-        </html>
-    """
-    _send(seller_email, f"Your listing '{listing_title}' expires in {days_left} {day_word}", html_content)
+    html_content = _render(
+        _LISTING_EXPIRY, name=seller_name, listing_title=listing_title, days_left=days_left,
+        day_word=day_word, link=FRONTEND_URL,
+    )
+    _queue(seller_email, f"Your listing '{listing_title}' expires in {days_left} {day_word}", html_content, db)
 
 
 def send_review_prompt_email(
@@ -280,29 +407,13 @@ def send_review_prompt_email(
     seller_name: str,
     listing_title: str,
     seller_id: int,
+    db=None,
 ):
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: #16a34a; color: white; padding: 24px 30px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">How was your purchase?</h2>
-                </div>
-                <div style="background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px;">
-                    <p>Hi {html.escape(buyer_name)},</p>
-                    <p>You recently purchased <strong>{html.escape(listing_title)}</strong> from <strong>{html.escape(seller_name)}</strong>.</p>
-                    <p>Help the community by leaving a quick review!</p>
-                    <center>
-                        <a href="{FRONTEND_URL}/user/{seller_id}" style="display: inline-block; background: #16a34a; color: white; padding: 12px 28px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold;">Leave a Review</a>
-                    </center>
-                    <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
-                </div>
-            </div>
-        </body>
-        </html>
-    """
-    _send(buyer_email, f"How was buying from {seller_name} on UniCycle?", html_content)
+    html_content = _render(
+        _REVIEW_PROMPT, name=buyer_name, listing_title=listing_title, seller_name=seller_name,
+        link=f"{FRONTEND_URL}/user/{seller_id}",
+    )
+    _queue(buyer_email, f"How was buying from {seller_name} on UniCycle?", html_content, db)
 
 
 def send_saved_search_alert_email(
@@ -311,26 +422,11 @@ def send_saved_search_alert_email(
     search_desc: str,
     match_count: int,
     frontend_url: str,
+    db=None,
 ):
     item_word = "item" if match_count == 1 else "items"
-    html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background: #2563eb; color: white; padding: 24px 30px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">New listings match your search</h2>
-                </div>
-                <div style="background: #f9f9f9; padding: 30px; border-radius: 0 0 8px 8px;">
-                    <p>Hi {html.escape(name)},</p>
-                    <p><strong>{match_count} new {item_word}</strong> matching <em>{html.escape(search_desc)}</em> were just listed on UniCycle.</p>
-                    <center>
-                        <a href="{frontend_url}" style="display: inline-block; background: #16a34a; color: white; padding: 12px 28px; text-decoration: none; border-radius: 6px; margin: 20px 0; font-weight: bold;">View Listings</a>
-                    </center>
-                    <p style="font-size: 13px; color: #666;">&copy; 2025 UniCycle</p>
-                </div>
-            </div>
-        </body>
-        </html>
-    """
-    _send(email, f"{match_count} new {item_word} match your saved search on UniCycle", html_content)
+    html_content = _render(
+        _SAVED_SEARCH_ALERT, name=name, match_count=match_count, item_word=item_word,
+        search_desc=search_desc, link=frontend_url,
+    )
+    _queue(email, f"{match_count} new {item_word} match your saved search on UniCycle", html_content, db)
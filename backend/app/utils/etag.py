@@ -0,0 +1,56 @@
+"""
+ETag / If-None-Match helpers for read endpoints.
+ETags are derived from ids and updated_at timestamps (plus view_count, which the
+write-behind view counter changes without touching updated_at), so a matching request
+can be answered with 304 before the ORM objects are serialized through Pydantic.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+# Responses depend on the caller (blocks, auth), so only the client may cache them,
+# and it must revalidate every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from arbitrary reprs (ids, timestamps, counters)."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _stamp(obj) -> tuple:
+    if obj is None:
+        return (None,)
+    return (obj.id, obj.updated_at or obj.created_at)
+
+
+def listing_etag_parts(listing) -> tuple:
+    return _stamp(listing) + (listing.view_count,) + _stamp(listing.seller)
+
+
+def listings_etag(listings: list, *extra) -> str:
+    """ETag over an ordered list of listings (order is part of the response)."""
+    return make_etag(extra, [listing_etag_parts(l) for l in listings])
+
+
+def user_etag(user) -> str:
+    return make_etag(_stamp(user))
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set the ETag on `response`; if the request's If-None-Match already matches it,
+    return a 304 the endpoint should return instead of its body. Other headers already
+    set on `response` (e.g. X-Next-Cursor) are carried over to the 304.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    header = request.headers.get("if-none-match")
+    if header:
+        # If-None-Match uses weak comparison, so ignore a W/ prefix a proxy may have added
+        candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+        if etag in candidates or "*" in candidates:
+            headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+            return Response(status_code=304, headers=headers)
+    return None
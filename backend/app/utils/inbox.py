@@ -0,0 +1,100 @@
+"""
+Maintains conversation_summaries, the denormalized inbox rows behind GET /messages/conversations.
+Each participant of a conversation has one row with their last visible message and unread count,
+so the inbox is a single indexed query instead of loading every message of every conversation.
+
+Every function here only stages changes on the caller's session; they are committed together
+with the message / read-state change that caused them.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..models.message import Conversation, ConversationSummary, Message
+from .badges import touch
+
+PREVIEW_LENGTH = 120
+
+
+def _preview(message: Message) -> str:
+    return (message.text or "")[:PREVIEW_LENGTH]
+
+
+def _participants(conversation: Conversation) -> tuple:
+    return (conversation.buyer_id, conversation.seller_id)
+
+
+def create_summaries(db: Session, conversation: Conversation, first_message: Message) -> None:
+    """Add both participants' rows for a new conversation and its first message."""
+    for user_id in _participants(conversation):
+        db.add(ConversationSummary(
+            conversation_id=conversation.id,
+            user_id=user_id,
+            last_message_id=first_message.id,
+            last_message_preview=_preview(first_message),
+            last_activity_at=func.now(),  # same clock as the message's created_at
+            unread_count=0 if user_id == first_message.sender_id else 1,
+        ))
+    touch(db, *_participants(conversation))
+
+
+def record_message(db: Session, conversation: Conversation, message: Message) -> None:
+    """Make a just-flushed message the last one for both participants and count it as unread for the recipient."""
+    # Sending also unarchives the conversation for both, which changes both badge counts
+    touch(db, *_participants(conversation))
+    updated = db.query(ConversationSummary).filter(
+        ConversationSummary.conversation_id == conversation.id
+    ).update({
+        ConversationSummary.last_message_id: message.id,
+        ConversationSummary.last_message_preview: _preview(message),
+        ConversationSummary.last_activity_at: func.now(),
+    }, synchronize_session=False)
+    if updated < 2:
+        # Rows missing (e.g. created before summaries existed); rebuild them from the messages
+        for user_id in _participants(conversation):
+            refresh_summary(db, conversation, user_id)
+        return
+    db.query(ConversationSummary).filter(
+        ConversationSummary.conversation_id == conversation.id,
+        ConversationSummary.user_id != message.sender_id
+    ).update({
+        ConversationSummary.unread_count: ConversationSummary.unread_count + 1
+    }, synchronize_session=False)
+
+
+def mark_read(db: Session, conversation_id: int, user_id: int) -> None:
+    db.query(ConversationSummary).filter(
+        ConversationSummary.conversation_id == conversation_id,
+        ConversationSummary.user_id == user_id,
+        ConversationSummary.unread_count != 0
+    ).update({ConversationSummary.unread_count: 0}, synchronize_session=False)
+    touch(db, user_id)
+
+
+def refresh_summary(db: Session, conversation: Conversation, user_id: int) -> None:
+    """Recompute one participant's row from the messages (after they hide a message, or to repair it)."""
+    db.flush()
+    hidden_column = Message.hidden_by_buyer if user_id == conversation.buyer_id else Message.hidden_by_seller
+    last = db.query(Message).filter(
+        Message.conversation_id == conversation.id,
+        hidden_column.isnot(True)
+    ).order_by(Message.id.desc()).first()
+    unread = db.query(Message).filter(
+        Message.conversation_id == conversation.id,
+        Message.sender_id != user_id,
+        Message.is_read == False
+    ).count()
+
+    summary = db.get(ConversationSummary, (conversation.id, user_id))
+    if summary is None:
+        summary = ConversationSummary(conversation_id=conversation.id, user_id=user_id)
+        db.add(summary)
+    summary.last_message_id = last.id if last else None
+    summary.last_message_preview = _preview(last) if last else None
+    # Copied in SQL rather than through Python so the stored value keeps the DB's own format
+    # (SQLite keeps datetimes as text, and mixed formats would break the inbox ordering)
+    if last:
+        summary.last_activity_at = select(Message.created_at).where(Message.id == last.id).scalar_subquery()
+    else:
+        summary.last_activity_at = select(func.coalesce(Conversation.created_at, func.now())).where(
+            Conversation.id == conversation.id
+        ).scalar_subquery()
+    summary.unread_count = unread
@@ -0,0 +1,225 @@
+"""
+Transactional outbox for side effects that shouldn't hold up a request (push, email,
+notifications). enqueue() adds a job row to the caller's session, so it is committed
+together with the change that caused it, or not at all. A worker thread started in
+main.py picks up due jobs, runs the registered handler, and retries failures with
+exponential backoff until OUTBOX_MAX_ATTEMPTS, after which the row is kept with
+status "failed" for inspection. A handler can raise RetryLater to run a job again later
+without using up an attempt (e.g. when a rate limit is hit).
+
+Handlers registered with a batch_size get all due jobs of their kind at once (up to
+batch_size per call), for APIs that accept many items per request.
+
+Jobs are claimed with FOR UPDATE SKIP LOCKED on PostgreSQL, so every worker process
+can run the outbox. A claimed job is leased for OUTBOX_LEASE_SECONDS; if its worker
+dies, another one retries it afterwards. Handlers must therefore tolerate running
+more than once.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.outbox_job import OutboxJob
+
+OUTBOX_POLL_SECONDS = 5
+OUTBOX_BATCH_SIZE = 100  # jobs claimed per query; batch handlers get up to this many at once
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_LEASE_SECONDS = 120
+
+_handlers: dict = {}
+_wake = threading.Event()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+_stats_lock = threading.Lock()
+_stats = {"succeeded": 0, "retried": 0, "deferred": 0, "failed": 0}
+
+
+class RetryLater(Exception):
+    """Raised by a handler to run the job again in `seconds` without counting it as a failed attempt."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"retry in {seconds:.0f}s")
+        self.seconds = seconds
+
+
+def job_handler(kind: str, batch_size: int = 1):
+    """
+    Register the function that runs jobs of `kind`; it is called with the job's payload as keyword arguments.
+
+    With batch_size > 1 it is called with a list of payloads instead, and returns a dict of
+    {index: exception} for the jobs that failed (None if all succeeded); raising fails them all.
+    """
+    def register(fn: Callable) -> Callable:
+        _handlers[kind] = (fn, batch_size)
+        return fn
+    return register
+
+
+def enqueue(db, kind: str, **payload) -> None:
+    """Stage a job on the caller's session (sync or async); it runs once the session commits."""
+    db.add(OutboxJob(kind=kind, payload=json.dumps(payload)))
+    db.info["outbox_enqueued"] = True
+
+
+def _backoff_seconds(attempts: int) -> int:
+    # 30s, 1m, 2m, 4m, 8m ...
+    return 30 * 2 ** (attempts - 1)
+
+
+def _claim(db: Session) -> list:
+    now = datetime.now(timezone.utc)
+    query = db.query(OutboxJob).filter(
+        OutboxJob.status == "pending",
+        OutboxJob.run_at <= now
+    ).order_by(OutboxJob.run_at).limit(OUTBOX_BATCH_SIZE)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    jobs = query.all()
+    claimed = []
+    for job in jobs:
+        job.attempts += 1
+        job.run_at = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        claimed.append((job.id, job.kind, job.payload, job.attempts))
+    db.commit()
+    return claimed
+
+
+def _run(jobs: list) -> None:
+    """Run claimed jobs of one kind: singly, or in one call for a batch handler."""
+    kind = jobs[0][1]
+    fn, batch_size = _handlers.get(kind, (None, 1))
+    if fn is None:
+        error = LookupError(f"No handler registered for outbox job kind {kind!r}")
+        errors = {i: error for i in range(len(jobs))}
+    elif batch_size > 1:
+        try:
+            errors = fn([json.loads(payload) for _, _, payload, _ in jobs]) or {}
+        except Exception as e:
+            errors = {i: e for i in range(len(jobs))}
+    else:
+        errors = {}
+        for i, (_, _, payload, _) in enumerate(jobs):
+            try:
+                fn(**json.loads(payload))
+            except Exception as e:
+                errors[i] = e
+    for i, (job_id, _, _, attempts) in enumerate(jobs):
+        _finish(job_id, kind, attempts, errors.get(i))
+
+
+def _finish(job_id: int, kind: str, attempts: int, error: Optional[Exception]) -> None:
+    db = SessionLocal()
+    try:
+        job = db.get(OutboxJob, job_id)
+        if job is None:
+            return
+        if error is None:
+            db.delete(job)
+            outcome = "succeeded"
+        elif isinstance(error, RetryLater):
+            job.attempts -= 1
+            job.run_at = datetime.now(timezone.utc) + timedelta(seconds=error.seconds)
+            outcome = "deferred"
+        elif attempts >= OUTBOX_MAX_ATTEMPTS:
+            job.status = "failed"
+            job.last_error = repr(error)[:2000]
+            outcome = "failed"
+            print(f"[outbox] Job {job_id} ({kind}) failed for good after {attempts} attempts: {error}")
+        else:
+            job.run_at = datetime.now(timezone.utc) + timedelta(seconds=_backoff_seconds(attempts))
+            job.last_error = repr(error)[:2000]
+            outcome = "retried"
+            print(f"[outbox] Job {job_id} ({kind}) failed, retrying: {error}")
+        db.commit()
+    finally:
+        db.close()
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def run_due_jobs() -> int:
+    """Run every job that is due. Returns how many were run."""
+    total = 0
+    while not _stop.is_set():
+        db = SessionLocal()
+        try:
+            batch = _claim(db)
+        finally:
+            db.close()
+        by_kind: dict = {}
+        for job in batch:
+            by_kind.setdefault(job[1], []).append(job)
+        for kind, jobs in by_kind.items():
+            batch_size = _handlers.get(kind, (None, 1))[1]
+            if batch_size > 1:
+                for i in range(0, len(jobs), batch_size):
+                    _run(jobs[i:i + batch_size])
+            else:
+                for job in jobs:
+                    _run([job])
+        total += len(batch)
+        if len(batch) < OUTBOX_BATCH_SIZE:
+            break
+    return total
+
+
+def _work():
+    while not _stop.is_set():
+        _wake.clear()
+        try:
+            ran = run_due_jobs()
+        except Exception as e:
+            print(f"[outbox] Worker error: {e}")
+            ran = 0
+            time.sleep(1)
+        if not ran:
+            _wake.wait(OUTBOX_POLL_SECONDS)
+
+
+def start_outbox_worker() -> None:
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        if not _stop.is_set():
+            return
+        _thread.join()  # still finishing after stop_outbox_worker()
+    _stop.clear()
+    _thread = threading.Thread(target=_work, name="outbox-worker", daemon=True)
+    _thread.start()
+
+
+def stop_outbox_worker() -> None:
+    """Let the job in progress finish; anything left runs on the next start (or another worker)."""
+    _stop.set()
+    _wake.set()
+    if _thread is not None:
+        _thread.join(timeout=10)
+
+
+def outbox_stats(db: Session) -> dict:
+    """Jobs waiting / failed in the table, plus this worker's outcomes since process start."""
+    counts = dict(db.query(OutboxJob.status, func.count(OutboxJob.id)).group_by(OutboxJob.status).all())
+    oldest = db.query(func.min(OutboxJob.created_at)).filter(OutboxJob.status == "pending").scalar()
+    with _stats_lock:
+        worker = dict(_stats)
+    return {
+        "pending": counts.get("pending", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_pending_at": oldest,
+        "worker": worker,
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    # Run jobs committed by this process right away instead of at the next poll
+    if session.info.pop("outbox_enqueued", False):
+        _wake.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("outbox_enqueued", None)
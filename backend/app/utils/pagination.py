@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination helpers.
+A cursor is an opaque, URL-safe token holding the sort key of the last row
+on the previous page, so the next page is a range scan instead of an OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal, tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(sort: str, key: list) -> str:
+    """Pack the sort mode and the last row's sort key into an opaque token."""
+    payload = {"s": sort, "k": [_encode_value(v) for v in key]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, key_length: int) -> list:
+    """
+    Unpack a cursor produced by encode_cursor.
+    Raises 400 if the token is malformed or was issued for a different sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = [_decode_value(v) for v in payload["k"]]
+        cursor_sort = payload["s"]
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if cursor_sort != sort or len(key) != key_length:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the requested sort order"
+        )
+    return key
+
+
+def keyset_condition(sort_key: list, last_key: list, descending: bool, dialect_name: str):
+    """
+    Row-value condition selecting rows strictly after `last_key` in `sort_key` order.
+
+    SQLite stores datetimes as text, and CURRENT_TIMESTAMP defaults ("... 12:00:00") don't
+    compare correctly with bound values ("... 12:00:00.000000"), so there both sides of
+    datetime columns are normalized with julianday().
+    """
+    columns, bounds = [], []
+    for col, value in zip(sort_key, last_key):
+        bound = literal(value, type_=col.type)
+        if dialect_name == "sqlite" and isinstance(value, datetime):
+            col, bound = func.julianday(col), func.julianday(bound)
+        columns.append(col)
+        bounds.append(bound)
+    if descending:
+        return tuple_(*columns) < tuple_(*bounds)
+    return tuple_(*columns) > tuple_(*bounds)
@@ -0,0 +1,116 @@
+"""
+bcrypt hashing and verification in a dedicated process pool, for the async auth endpoints.
+
+A bcrypt call costs ~250ms of CPU. Run inline it holds one of the threadpool slots every sync
+endpoint shares, so a burst of logins stalls browse and messaging. Here it runs in
+PASSWORD_POOL_WORKERS separate processes, and at most PASSWORD_MAX_PENDING calls may wait for
+them; beyond that the endpoint answers 503 instead of queueing without bound.
+
+verify_and_update() also returns a new hash when the stored one was made with other cost
+parameters (BCRYPT_ROUNDS changed), so login can upgrade it transparently.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from ..config import settings
+
+PASSWORD_POOL_WORKERS = settings.password_pool_workers or min(2, os.cpu_count() or 1)
+PASSWORD_MAX_PENDING = 64
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_pending = 0
+_stats = {"completed": 0, "rejected": 0, "peak_pending": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+
+@lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# Run in the pool's processes
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> tuple:
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+def start_password_pool() -> None:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn rather than fork: the app process already runs threads (scheduler, outbox, ...)
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+
+def stop_password_pool() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def _submit(fn, *args):
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests right now. Please try again in a moment.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+        _stats["peak_pending"] = max(_stats["peak_pending"], _pending)
+    started = time.monotonic()
+    try:
+        start_password_pool()
+        return await asyncio.wrap_future(_pool.submit(fn, *args))
+    finally:
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with _lock:
+            _pending -= 1
+            _stats["completed"] += 1
+            _stats["total_ms"] += elapsed_ms
+            _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_and_update(password: str, hashed: str) -> tuple:
+    """(valid, new_hash): new_hash is set when a valid hash should be replaced with one at the current cost."""
+    return await _submit(_verify_and_update, password, hashed, BCRYPT_ROUNDS)
+
+
+def password_pool_stats() -> dict:
+    """Queue depth and latency (queueing + hashing) of this worker's password pool."""
+    with _lock:
+        completed = _stats["completed"]
+        return {
+            "workers": PASSWORD_POOL_WORKERS,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "pending": _pending,
+            "max_pending": PASSWORD_MAX_PENDING,
+            "peak_pending": _stats["peak_pending"],
+            "completed": completed,
+            "rejected": _stats["rejected"],
+            "avg_ms": round(_stats["total_ms"] / completed, 1) if completed else None,
+            "max_ms": round(_stats["max_ms"], 1),
+        }
@@ -0,0 +1,125 @@
+"""
+Cache of authenticated principals, so most requests skip the users lookup.
+
+- Tokens: the email (sub) a JWT was issued for, memoized until the token's exp.
+- Users: a snapshot of the user's row, keyed by id (with an email -> id index) and kept
+  for PRINCIPAL_TTL_SECONDS. The auth dependencies turn it back into a session-attached
+  User with merge(load=False), which issues no query; attributes an endpoint changes are
+  written with the usual UPDATE.
+
+Credentials (the password hash and the verification / reset token) are left out of the
+snapshot: a rebuilt User loads them from the database when they are read, so password
+checks never use a stale hash.
+
+Every commit that changes or deletes a User through the ORM (suspend, verify, admin
+toggles, profile / password updates, ...) drops that user's snapshot; bulk UPDATEs must
+call invalidate_users() themselves. As in visibility.py, the TTL bounds how stale a
+worker can be for changes made by another process.
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from ..models.user import User
+from .auth import decode_token
+
+PRINCIPAL_TTL_SECONDS = 30
+MAX_CACHED_TOKENS = 10_000
+MAX_CACHED_USERS = 10_000
+
+CREDENTIAL_COLUMNS = {"hashed_password", "verification_token", "token_created_at"}
+_COLUMNS = [attr.key for attr in User.__mapper__.column_attrs if attr.key not in CREDENTIAL_COLUMNS]
+
+_lock = threading.Lock()
+_tokens: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (email, exp as a unix timestamp)
+_users: "OrderedDict[int, tuple]" = OrderedDict()   # user_id -> (column values, loaded_at)
+_ids: dict = {}                                      # email -> user_id
+# Bumped on every invalidation so a load that raced with one isn't cached
+_generation = 0
+
+
+def token_email(token: str) -> Optional[str]:
+    """The email a valid, unexpired token was issued for, or None."""
+    now = time.time()
+    with _lock:
+        entry = _tokens.get(token)
+        if entry:
+            if entry[1] > now:
+                _tokens.move_to_end(token)
+                return entry[0]
+            del _tokens[token]
+    claims = decode_token(token)
+    if not claims or claims.get("sub") is None:
+        return None
+    if claims.get("exp") is not None:
+        with _lock:
+            _tokens[token] = (claims["sub"], float(claims["exp"]))
+            while len(_tokens) > MAX_CACHED_TOKENS:
+                _tokens.popitem(last=False)
+    return claims["sub"]
+
+
+def cached_user(email: str) -> Optional[User]:
+    """A detached User rebuilt from a fresh snapshot, or None on a miss."""
+    with _lock:
+        user_id = _ids.get(email)
+        entry = _users.get(user_id) if user_id is not None else None
+        if not entry or time.monotonic() - entry[1] >= PRINCIPAL_TTL_SECONDS:
+            return None
+        _users.move_to_end(user_id)
+        values = entry[0]
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def generation() -> int:
+    """Read before loading a user from the database and pass to remember()."""
+    return _generation
+
+
+def remember(user: User, loaded_generation: int) -> None:
+    """Snapshot a user just loaded from the database (unless it was invalidated meanwhile)."""
+    values = {key: getattr(user, key) for key in _COLUMNS}
+    with _lock:
+        if loaded_generation != _generation:
+            return
+        _users[user.id] = (values, time.monotonic())
+        _users.move_to_end(user.id)
+        _ids[user.email] = user.id
+        while len(_users) > MAX_CACHED_USERS:
+            _, (evicted, _) = _users.popitem(last=False)
+            _ids.pop(evicted["email"], None)
+
+
+def invalidate_users(*user_ids: int) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in user_ids:
+            entry = _users.pop(user_id, None)
+            if entry:
+                _ids.pop(entry[0]["email"], None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    # dirty / deleted still hold the pre-flush state here
+    changed = {obj.id for obj in chain(session.dirty, session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("principal_users", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    user_ids = session.info.pop("principal_users", None)
+    if user_ids:
+        invalidate_users(*user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("principal_users", None)
@@ -2,49 +2,269 @@
 Expo Push Notification utility.
 Uses the Expo Push API to send notifications to mobile devices.
 No Firebase/APNs credentials needed — Expo handles that.
+
+Notifications are queued on a dispatcher that sends them in batches of up to
+PUSH_BATCH_SIZE over one pooled HTTP connection, at most PUSH_FLUSH_SECONDS after the
+first one was queued. Expo answers each batch with a ticket per message; the receipts
+for those tickets are fetched PUSH_RECEIPT_DELAY_SECONDS later. A DeviceNotRegistered
+error in either clears the token from the user, so we stop pushing to uninstalled apps.
+
+Tickets awaiting receipts are kept in memory only: those still pending when the
+process exits are not checked.
 """
+import threading
+import time
+from collections import deque
+from typing import Optional
 import httpx
+from ..config import settings
+
+EXPO_API_URL = "https://exp.host/--/api/v2/push"
+PUSH_BATCH_SIZE = 100  # Expo's limit per send request
+RECEIPT_BATCH_SIZE = 1000  # Expo's limit per getReceipts request
+PUSH_FLUSH_SECONDS = 0.5
+PUSH_RECEIPT_DELAY_SECONDS = 15 * 60  # Expo: receipts are usually ready within 15 minutes
+PUSH_MAX_ATTEMPTS = 3
+
+_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Content-Type": "application/json",
+}
+
+
+def is_expo_token(token: Optional[str]) -> bool:
+    return bool(token) and token.startswith("ExponentPushToken")
+
+
+def _forget_tokens(tokens: set) -> None:
+    """Clear push tokens Expo reported as no longer registered."""
+    from ..database import SessionLocal
+    from ..models.user import User
+    from .principal import invalidate_users
+
+    db = SessionLocal()
+    try:
+        user_ids = [row.id for row in db.query(User.id).filter(User.push_token.in_(tokens))]
+        db.query(User).filter(User.push_token.in_(tokens)).update(
+            {User.push_token: None}, synchronize_session=False
+        )
+        db.commit()
+        # The bulk UPDATE skips the session hooks that drop cached principals
+        invalidate_users(*user_ids)
+        print(f"[push] Cleared {len(tokens)} unregistered push token(s)")
+    finally:
+        db.close()
+
+
+class PushDispatcher:
+    """Batches Expo push messages and checks their receipts from a background thread."""
+
+    def __init__(self, api_url: Optional[str] = None, access_token: Optional[str] = None,
+                 receipt_delay: float = PUSH_RECEIPT_DELAY_SECONDS):
+        self.api_url = (api_url or EXPO_API_URL).rstrip("/")
+        self.receipt_delay = receipt_delay
+        self._headers = dict(_HEADERS)
+        if access_token:
+            self._headers["Authorization"] = f"Bearer {access_token}"
+        self._client: Optional[httpx.Client] = None
+        self._queue: deque = deque()
+        self._tickets: deque = deque()  # (check_after, ticket_id, token)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"queued": 0, "sent": 0, "errors": 0, "unregistered": 0, "requests": 0}
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(headers=self._headers, timeout=10.0)
+        return self._client
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    # Sending
 
-EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+    def send(self, token: str, title: str, body: str, data: dict = None) -> bool:
+        """Queue a notification. Returns False if the token isn't an Expo push token."""
+        if not is_expo_token(token):
+            return False
+        message = {
+            "to": token,
+            "title": title,
+            "body": body,
+            "sound": "default",
+            "badge": 1,
+        }
+        if data:
+            message["data"] = data
+        with self._lock:
+            self._queue.append(message)
+            self._stats["queued"] += 1
+            full = len(self._queue) >= PUSH_BATCH_SIZE
+        if not self.running:
+            self.flush()  # no dispatcher thread (scripts, shell): send right away
+        elif full:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Send everything queued now. Returns how many messages were sent."""
+        sent = 0
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(PUSH_BATCH_SIZE, len(self._queue)))]
+            if not batch:
+                return sent
+            self._send_batch(batch)
+            sent += len(batch)
+
+    def _post(self, path: str, payload) -> Optional[dict]:
+        """POST to Expo, retrying rate limits, server errors and failed connections."""
+        for attempt in range(1, PUSH_MAX_ATTEMPTS + 1):
+            retry = False
+            try:
+                self._count("requests")
+                resp = self.client.post(f"{self.api_url}/{path}", json=payload)
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    retry = True
+                    error = f"HTTP {resp.status_code}"
+                else:
+                    resp.raise_for_status()
+                    return resp.json()
+            except httpx.ConnectError as e:
+                # Nothing reached Expo, so retrying can't deliver a message twice
+                retry = True
+                error = e
+            except Exception as e:
+                error = e
+            if not retry or attempt == PUSH_MAX_ATTEMPTS:
+                print(f"[push] {path} failed: {error}")
+                return None
+            time.sleep(2 ** (attempt - 1))
+        return None
+
+    def _send_batch(self, batch: list) -> None:
+        result = self._post("send", batch)
+        if result is None:
+            self._count("errors", len(batch))
+            return
+        tickets = result.get("data") or []
+        check_after = time.monotonic() + self.receipt_delay
+        unregistered = set()
+        sent = errors = 0
+        with self._lock:
+            for message, ticket in zip(batch, tickets):
+                if ticket.get("status") == "ok":
+                    sent += 1
+                    if ticket.get("id"):
+                        self._tickets.append((check_after, ticket["id"], message["to"]))
+                else:
+                    errors += 1
+                    if (ticket.get("details") or {}).get("error") == "DeviceNotRegistered":
+                        unregistered.add(message["to"])
+                    else:
+                        print(f"[push] Expo rejected a notification: {ticket.get('message')}")
+        self._count("sent", sent)
+        self._count("errors", errors + max(0, len(batch) - len(tickets)))
+        self._unregister(unregistered)
+
+    # Receipts
+
+    def check_receipts(self, force: bool = False) -> int:
+        """Fetch receipts for tickets that are due (all of them with force). Returns how many were checked."""
+        checked = 0
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = []
+                while self._tickets and (force or self._tickets[0][0] <= now) and len(due) < RECEIPT_BATCH_SIZE:
+                    _, ticket_id, token = self._tickets.popleft()
+                    due.append((ticket_id, token))
+            if not due:
+                return checked
+            checked += len(due)
+            result = self._post("getReceipts", {"ids": [ticket_id for ticket_id, _ in due]})
+            if result is None:
+                continue
+            receipts = result.get("data") or {}
+            unregistered = set()
+            errors = 0
+            for ticket_id, token in due:
+                receipt = receipts.get(ticket_id)
+                if receipt is None or receipt.get("status") == "ok":
+                    continue
+                errors += 1
+                if (receipt.get("details") or {}).get("error") == "DeviceNotRegistered":
+                    unregistered.add(token)
+                else:
+                    print(f"[push] Delivery failed: {receipt.get('message')}")
+            self._count("errors", errors)
+            self._unregister(unregistered)
+
+    def _unregister(self, tokens: set) -> None:
+        if not tokens:
+            return
+        self._count("unregistered", len(tokens))
+        try:
+            _forget_tokens(tokens)
+        except Exception as e:
+            print(f"[push] Failed to clear unregistered tokens: {e}")
+
+    # Background thread
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            self._wake.wait(PUSH_FLUSH_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.check_receipts()
+            except Exception as e:
+                print(f"[push] Dispatcher error: {e}")
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if self._thread is not None:
+            self._thread.join()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._work, name="push-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Send what is still queued; receipts not yet due are dropped."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+        if self._tickets:
+            print(f"[push] {len(self._tickets)} receipt(s) left unchecked at shutdown")
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "queue": len(self._queue), "awaiting_receipts": len(self._tickets)}
+
+
+dispatcher = PushDispatcher(api_url=settings.expo_api_url, access_token=settings.expo_access_token)
 
 
 def send_push_notification(token: str, title: str, body: str, data: dict = None) -> bool:
     """
-    Send a push notification via the Expo Push API.
-    Returns True on success, False on failure.
+    Queue a push notification via the Expo Push API.
+    Returns False if the token can't receive pushes, True once it is queued.
 
     token: Expo push token (e.g. "ExponentPushToken[xxxxxx]")
     """
-    if not token or not token.startswith("ExponentPushToken"):
-        return False
-
-    payload = {
-        "to": token,
-        "title": title,
-        "body": body,
-        "sound": "default",
-        "badge": 1,
-    }
-    if data:
-        payload["data"] = data
-
-    try:
-        resp = httpx.post(
-            EXPO_PUSH_URL,
-            json=payload,
-            headers={
-                "Accept": "application/json",
-                "Accept-Encoding": "gzip, deflate",
-                "Content-Type": "application/json",
-            },
-            timeout=5.0,
-        )
-        result = resp.json()
-        # Expo returns {"data": {"status": "ok"}} or {"data": {"status": "error", ...}}
-        ticket = result.get("data", {})
-        if isinstance(ticket, list):
-            ticket = ticket[0] if ticket else {}
-        return ticket.get("status") == "ok"
-    except Exception as e:
-        print(f"[push] Failed to send push notification: {e}")
-        return False
+    return dispatcher.send(token, title, body, data)
@@ -0,0 +1,257 @@
+"""
+Run scheduled jobs once across all workers, and keep a history of their runs.
+
+Every uvicorn worker starts the same APScheduler jobs (main.py). A job wrapped with
+leader_job() only runs on the leader: the worker holding the scheduler lock, which it
+keeps for its lifetime. On PostgreSQL that is a session-level advisory lock on a
+connection kept out of the pool; on SQLite (a single host) an exclusive lock on a file
+next to the database. The database / OS releases it when the worker exits, and the next
+worker whose schedule fires takes over. Each job also holds its own lock while it runs, so
+a run can't overlap one still going on a former leader.
+
+Every run the leader starts is recorded in job_runs with its duration, the number the job
+returned as rows processed, and the error if it raised.
+
+Jobs that work on per-process state (flush_views) are scheduled without the wrapper.
+"""
+import functools
+import os
+import socket
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, engine
+from ..models.job_run import JobRun
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+WORKER_ID = f"{socket.gethostname()[:40]}:{os.getpid()}"
+LOCK_NAMESPACE = "unicycle"
+
+_guard = threading.Lock()
+_leader = None
+
+
+def _lock_key(name: str) -> int:
+    # Advisory locks take a bigint; any stable hash of the name will do
+    return zlib.crc32(f"{LOCK_NAMESPACE}:{name}".encode())
+
+
+class _AdvisoryLock:
+    """pg_try_advisory_lock on a dedicated connection, held until release() or the connection closes."""
+
+    def __init__(self, name: str):
+        self.key = _lock_key(name)
+        self._connection = None
+
+    def acquire(self) -> bool:
+        if self._connection is not None:
+            return True
+        connection = engine.raw_connection()
+        connection.detach()   # holds the lock outside the pool; closing it releases the lock
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT pg_try_advisory_lock({self.key})")
+            acquired = cursor.fetchone()[0]
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if acquired:
+            self._connection = connection
+        else:
+            connection.close()
+        return acquired
+
+    def alive(self) -> bool:
+        """Whether the lock is still held; a lost connection means it was released."""
+        if self._connection is None:
+            return False
+        try:
+            cursor = self._connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            self._connection.commit()
+            return True
+        except Exception:
+            self.release()
+            return False
+
+    def release(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+class _FileLock:
+    """A non-blocking exclusive lock on `<database file>.<name>.lock`, for SQLite."""
+
+    def __init__(self, name: str):
+        database = engine.url.database
+        if database and database != ":memory:":
+            prefix = os.path.abspath(database)
+        else:
+            prefix = os.path.join(tempfile.gettempdir(), f"{LOCK_NAMESPACE}-{os.getpid()}")
+        self.path = f"{prefix}.{name.replace(':', '-')}.lock"
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def alive(self) -> bool:
+        return self._file is not None
+
+    def release(self) -> None:
+        lock_file, self._file = self._file, None
+        if lock_file is not None:
+            # Closing the file drops the lock on every platform
+            lock_file.close()
+
+
+def _make_lock(name: str):
+    return _AdvisoryLock(name) if engine.dialect.name == "postgresql" else _FileLock(name)
+
+
+def is_leader() -> bool:
+    """Whether this worker runs the scheduled jobs, claiming the role if no one holds it."""
+    global _leader
+    with _guard:
+        if _leader is None:
+            _leader = _make_lock("scheduler")
+        if _leader.alive():
+            return True
+        try:
+            acquired = _leader.acquire()
+        except Exception as e:
+            print(f"[scheduler] Leader election failed: {e}")
+            return False
+        if acquired:
+            print(f"[scheduler] {WORKER_ID} is now the scheduler leader.")
+        return acquired
+
+
+def release_leadership() -> None:
+    with _guard:
+        if _leader is not None:
+            _leader.release()
+
+
+def _record(job: str, started_at: datetime, duration_ms: float, rows: Optional[int], error: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        db.add(JobRun(
+            job=job,
+            worker_id=WORKER_ID,
+            status="failed" if error else "succeeded",
+            started_at=started_at,
+            duration_ms=duration_ms,
+            rows_processed=rows,
+            error=error,
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[scheduler] Could not record the {job} run: {e}")
+    finally:
+        db.close()
+
+
+def leader_job(name: str, fn: Callable[[], Optional[int]]) -> Callable[[], None]:
+    """
+    Wrap a scheduled job so it only runs on the leader, one run at a time, and is recorded in job_runs.
+
+    `fn` returns the number of rows it processed (or None); an exception marks the run failed.
+    """
+    @functools.wraps(fn)
+    def run() -> None:
+        if not is_leader():
+            return
+        lock = _make_lock(f"job:{name}")
+        if not lock.acquire():
+            print(f"[scheduler] {name} is still running on another worker; skipped.")
+            return
+        started_at = datetime.now(timezone.utc)
+        started = time.monotonic()
+        rows, error = None, None
+        try:
+            rows = fn()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"[{name}] Job error: {e}")
+        finally:
+            lock.release()
+        _record(name, started_at, (time.monotonic() - started) * 1000, rows, error)
+    return run
+
+
+def job_history(db: Session, job: Optional[str] = None, limit: int = 50) -> dict:
+    """Cost of each job over its recorded runs, and the most recent runs."""
+    summary_query = db.query(
+        JobRun.job,
+        func.count(JobRun.id),
+        func.sum(case((JobRun.status == "failed", 1), else_=0)),
+        func.avg(JobRun.duration_ms),
+        func.max(JobRun.duration_ms),
+        func.sum(JobRun.rows_processed),
+        func.max(JobRun.started_at),
+    ).group_by(JobRun.job)
+    runs_query = db.query(JobRun).order_by(JobRun.started_at.desc(), JobRun.id.desc())
+    if job:
+        summary_query = summary_query.filter(JobRun.job == job)
+        runs_query = runs_query.filter(JobRun.job == job)
+    with _guard:
+        leader = _leader is not None and _leader.alive()
+
+    return {
+        "worker_id": WORKER_ID,
+        "leader": leader,
+        "jobs": [
+            {
+                "job": name,
+                "runs": runs,
+                "failures": failures or 0,
+                "avg_ms": round(avg_ms, 1),
+                "max_ms": round(max_ms, 1),
+                "rows_processed": rows or 0,
+                "last_started_at": last_started_at,
+            }
+            for name, runs, failures, avg_ms, max_ms, rows, last_started_at in summary_query.all()
+        ],
+        "runs": [
+            {
+                "job": run.job,
+                "worker_id": run.worker_id,
+                "status": run.status,
+                "started_at": run.started_at,
+                "duration_ms": round(run.duration_ms, 1),
+                "rows_processed": run.rows_processed,
+                "error": run.error,
+            }
+            for run in runs_query.limit(limit).all()
+        ],
+    }
@@ -0,0 +1,88 @@
+"""
+Full-text search for listings and requests.
+PostgreSQL uses the generated `search_vector` tsvector column (GIN-indexed, accent-folded
+with unaccent); SQLite uses the `<table>_fts` FTS5 table kept in sync by triggers.
+Both are created by migration d1a7e4c93f20. A database without them (e.g. one built by
+create_all only) falls back to ILIKE so search still works, just without ranking.
+"""
+import re
+import unicodedata
+from sqlalchemy import Double, cast, func, inspect, literal_column, or_, select, table, column, text
+from sqlalchemy.orm import Session, Query
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+MAX_SEARCH_TERMS = 8
+
+# (dialect, table name) -> "tsvector" | "fts5" | "like"; the schema doesn't change at runtime
+_backend_cache: dict = {}
+
+
+def fold_accents(value: str) -> str:
+    """Lowercase and strip diacritics, e.g. "Chaise Économique" -> "chaise economique"."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def search_terms(search: str) -> list:
+    """Split a user query into accent-folded word tokens safe to embed in tsquery/FTS5 syntax."""
+    return _WORD_RE.findall(fold_accents(search))[:MAX_SEARCH_TERMS]
+
+
+def _search_backend(db: Session, table_name: str) -> str:
+    bind = db.get_bind()
+    key = (bind.dialect.name, table_name)
+    if key not in _backend_cache:
+        backend = "like"
+        if bind.dialect.name == "postgresql":
+            columns = {col["name"] for col in inspect(bind).get_columns(table_name)}
+            if "search_vector" in columns:
+                backend = "tsvector"
+        elif bind.dialect.name == "sqlite":
+            exists = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": f"{table_name}_fts"}
+            ).first()
+            if exists:
+                backend = "fts5"
+        _backend_cache[key] = backend
+    return _backend_cache[key]
+
+
+def apply_search(db: Session, query: Query, model, search: str):
+    """
+    Filter `query` down to rows of `model` (Listing or Request) matching `search`.
+    Every term must match, and each term also matches as a prefix ("text" finds "textbook").
+
+    Returns (query, rank) where rank is a relevance expression (higher = better),
+    or None when only the ILIKE fallback is available.
+    """
+    terms = search_terms(search)
+    table_name = model.__tablename__
+    backend = _search_backend(db, table_name)
+
+    if not terms or backend == "like":
+        search_term = f"%{search}%"
+        query = query.filter(
+            or_(model.title.ilike(search_term), model.description.ilike(search_term))
+        )
+        return query, None
+
+    if backend == "tsvector":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        vector = literal_column(f"{table_name}.search_vector")
+        query = query.filter(vector.op("@@")(tsquery))
+        # ts_rank_cd is a float4, which doesn't survive the round trip through a keyset
+        # cursor (a Python float): cast it so the cursor compares with the exact value
+        return query, cast(func.ts_rank_cd(vector, tsquery), Double)
+
+    # FTS5: implicit AND between quoted prefix terms
+    fts_name = f"{table_name}_fts"
+    fts = table(fts_name, column("rowid"), column(fts_name))
+    matches = fts.c[fts_name].op("MATCH")(" ".join(f'"{t}"*' for t in terms))
+    query = query.filter(model.id.in_(select(fts.c.rowid).where(matches)))
+    # bm25() is lower-is-better; negate it so callers can always sort rank DESC.
+    # Title weighted 10x description, mirroring the A/B weights on PostgreSQL.
+    rank = select(-func.bm25(literal_column(fts_name), 10.0, 1.0)).where(
+        matches, fts.c.rowid == model.id
+    ).scalar_subquery()
+    return query, rank
@@ -0,0 +1,72 @@
+"""
+Process-local cache of the system_settings table.
+The table is a handful of admin-controlled key/value rows that are read on hot paths
+(e.g. sponsored_pins_in_all on every GET /listings), so all rows are loaded in one query
+and served from memory until the TTL expires.
+
+update_setting invalidates explicitly. The TTL bounds how stale a worker can be for
+changes made by a different process.
+"""
+import threading
+import time
+from typing import Optional
+from sqlalchemy.orm import Session
+from ..models.system_setting import SystemSetting
+
+SETTINGS_TTL_SECONDS = 30
+
+_lock = threading.Lock()
+_values: Optional[dict] = None
+_loaded_at = 0.0
+# Bumped on every invalidation so a load that raced with one isn't cached
+_generation = 0
+_hits = 0
+_misses = 0
+
+
+def _all_settings(db: Session) -> dict:
+    global _values, _loaded_at, _hits, _misses
+    with _lock:
+        if _values is not None and time.monotonic() - _loaded_at < SETTINGS_TTL_SECONDS:
+            _hits += 1
+            return _values
+        _misses += 1
+        generation = _generation
+    values = {row.key: row.value for row in db.query(SystemSetting.key, SystemSetting.value).all()}
+    with _lock:
+        if generation == _generation:
+            _values, _loaded_at = values, time.monotonic()
+    return values
+
+
+def get_setting(db: Session, key: str, default: Optional[str] = None) -> Optional[str]:
+    """Raw string value of a setting, or `default` if the key isn't set."""
+    return _all_settings(db).get(key, default)
+
+
+def get_bool_setting(db: Session, key: str, default: bool = False) -> bool:
+    value = get_setting(db, key)
+    if value is None:
+        return default
+    return value.strip().lower() in ("true", "1", "yes", "on")
+
+
+def get_int_setting(db: Session, key: str, default: int = 0) -> int:
+    value = get_setting(db, key)
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def invalidate_settings() -> None:
+    global _values, _generation
+    with _lock:
+        _values = None
+        _generation += 1
+
+
+def settings_cache_stats() -> dict:
+    """Hit/miss counters since process start."""
+    with _lock:
+        return {"hits": _hits, "misses": _misses, "ttl_seconds": SETTINGS_TTL_SECONDS}
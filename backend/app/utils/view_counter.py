@@ -0,0 +1,96 @@
+"""
+Write-behind view counter for GET /listings/{id}.
+Views are counted in memory and added to listings.view_count in one batched UPDATE
+every VIEW_FLUSH_INTERVAL_SECONDS (scheduled in main.py), instead of a write
+transaction and row lock on every page view. A user re-opening the same listing
+within VIEW_DEDUPE_WINDOW_SECONDS only counts once.
+
+Counts are per process and additive, so several workers can flush independently.
+Views still buffered when a worker is killed without a clean shutdown are lost.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+from ..database import engine
+
+VIEW_FLUSH_INTERVAL_SECONDS = 10
+VIEW_DEDUPE_WINDOW_SECONDS = 30 * 60
+# Upper bound on (listing, viewer) pairs remembered for deduplication
+MAX_TRACKED_VIEWS = 200_000
+
+_lock = threading.Lock()
+_pending: dict = {}                               # listing_id -> views not yet written
+_recent: "OrderedDict[tuple, float]" = OrderedDict()  # (listing_id, viewer_id) -> counted_at
+_stats = {"recorded": 0, "deduplicated": 0, "flushed": 0, "flushes": 0, "flush_errors": 0}
+_last_flush_at = None
+
+
+def record_view(listing_id: int, viewer_id: int) -> bool:
+    """Buffer one view. Returns False if this viewer was already counted within the window."""
+    now = time.monotonic()
+    key = (listing_id, viewer_id)
+    with _lock:
+        # Entries are kept in counted_at order, so expired ones are always at the front
+        while _recent:
+            counted_at = next(iter(_recent.values()))
+            if now - counted_at < VIEW_DEDUPE_WINDOW_SECONDS and len(_recent) < MAX_TRACKED_VIEWS:
+                break
+            _recent.popitem(last=False)
+        if key in _recent:
+            _stats["deduplicated"] += 1
+            return False
+        _recent[key] = now
+        _pending[listing_id] = _pending.get(listing_id, 0) + 1
+        _stats["recorded"] += 1
+        return True
+
+
+def flush_views() -> int:
+    """Write buffered views to the database. Returns the number of views written."""
+    global _pending, _last_flush_at
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+
+    params = {}
+    values = []
+    for i, (listing_id, count) in enumerate(batch.items()):
+        params[f"id{i}"], params[f"n{i}"] = listing_id, count
+        values.append(f"(:id{i}, :n{i})")
+    # VALUES columns are named column1, column2 on both PostgreSQL and SQLite
+    statement = text(f"""
+        UPDATE listings SET view_count = coalesce(listings.view_count, 0) + v.n
+        FROM (SELECT column1 AS id, column2 AS n FROM (VALUES {", ".join(values)}) AS vals) AS v
+        WHERE listings.id = v.id
+    """)
+    try:
+        with engine.begin() as conn:
+            conn.execute(statement, params)
+    except Exception as e:
+        # Put the counts back so the next flush retries them
+        with _lock:
+            for listing_id, count in batch.items():
+                _pending[listing_id] = _pending.get(listing_id, 0) + count
+            _stats["flush_errors"] += 1
+        print(f"[views] Flush failed: {e}")
+        return 0
+
+    flushed = sum(batch.values())
+    with _lock:
+        _stats["flushed"] += flushed
+        _stats["flushes"] += 1
+        _last_flush_at = time.time()
+    return flushed
+
+
+def view_counter_stats() -> dict:
+    """Buffered vs flushed counts for this worker since process start."""
+    with _lock:
+        return {
+            **_stats,
+            "buffered": sum(_pending.values()),
+            "buffered_listings": len(_pending),
+            "last_flush_at": _last_flush_at,
+        }
@@ -0,0 +1,87 @@
+"""
+Who a user should not see in browse results.
+Suspended accounts are hidden from everyone; blocks hide both users from each other.
+Both sets are small and change rarely, so they're cached in process and passed to
+queries as bound id lists instead of being re-derived with subqueries on every call.
+
+toggle_suspend and toggle_block invalidate explicitly. The TTL bounds how stale a
+worker can be for changes made by a different process.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from ..models.user import User
+from ..models.user_block import UserBlock
+
+VISIBILITY_TTL_SECONDS = 60
+MAX_CACHED_BLOCK_SETS = 10_000
+
+_lock = threading.Lock()
+_suspended: tuple = (None, 0.0)                          # (frozenset of ids, loaded_at)
+_blocks: "OrderedDict[int, tuple]" = OrderedDict()        # user_id -> (frozenset of ids, loaded_at)
+# Bumped on every invalidation so a load that raced with one isn't cached
+_generation = 0
+
+
+def _fresh(loaded_at: float) -> bool:
+    return time.monotonic() - loaded_at < VISIBILITY_TTL_SECONDS
+
+
+def suspended_user_ids(db: Session) -> frozenset:
+    """Ids of all suspended users."""
+    global _suspended
+    ids, loaded_at = _suspended
+    if ids is not None and _fresh(loaded_at):
+        return ids
+    generation = _generation
+    rows = db.query(User.id).filter(User.is_suspended == True).all()
+    ids = frozenset(r.id for r in rows)
+    with _lock:
+        if generation == _generation:
+            _suspended = (ids, time.monotonic())
+    return ids
+
+
+def blocked_user_ids(db: Session, user_id: int) -> frozenset:
+    """Ids of users that `user_id` has blocked or been blocked by."""
+    with _lock:
+        entry = _blocks.get(user_id)
+        if entry and _fresh(entry[1]):
+            _blocks.move_to_end(user_id)
+            return entry[0]
+        generation = _generation
+    rows = db.query(UserBlock.blocker_id, UserBlock.blocked_id).filter(
+        (UserBlock.blocker_id == user_id) | (UserBlock.blocked_id == user_id)
+    ).all()
+    ids = frozenset(
+        r.blocked_id if r.blocker_id == user_id else r.blocker_id for r in rows
+    )
+    with _lock:
+        if generation == _generation:
+            _blocks[user_id] = (ids, time.monotonic())
+            _blocks.move_to_end(user_id)
+            while len(_blocks) > MAX_CACHED_BLOCK_SETS:
+                _blocks.popitem(last=False)
+    return ids
+
+
+def hidden_user_ids(db: Session, user_id: int) -> frozenset:
+    """Everyone whose content `user_id` should not see in browse results."""
+    return suspended_user_ids(db) | blocked_user_ids(db, user_id)
+
+
+def invalidate_suspended() -> None:
+    global _suspended, _generation
+    with _lock:
+        _suspended = (None, 0.0)
+        _generation += 1
+
+
+def invalidate_blocks(*user_ids: int) -> None:
+    """Drop cached block sets; pass both sides of a block since it applies in both directions."""
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in user_ids:
+            _blocks.pop(user_id, None)
@@ -0,0 +1,394 @@
+"""
+Cross-worker fan-out for WebSocket events (see routers/ws.py).
+
+Each worker only holds the sockets that connected to it, so an event for a user is
+delivered to the local sockets directly and also published on the backplane; every
+other worker receives it and delivers it to the sockets it holds. The backplane also
+tracks which users have a socket open on any worker (presence), which decides e.g.
+whether a new message still needs an Expo push.
+
+Backends (WS_BACKPLANE, default picked from the other settings):
+- "redis": Redis pub/sub, presence in a sorted set per user. Used when REDIS_URL is set.
+- "postgres": LISTEN/NOTIFY on a dedicated connection, presence in the ws_presence table.
+  Used when the database is PostgreSQL, so multiple workers work without extra services.
+- "memory": a single process. Several InMemoryBackplane objects sharing one
+  InMemoryHub behave like separate workers, which is what tests use.
+
+Presence entries are refreshed by a heartbeat every PRESENCE_HEARTBEAT_SECONDS and
+ignored once older than PRESENCE_TTL_SECONDS, so a crashed worker's users drop out.
+"""
+import abc
+import asyncio
+import json
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import func, select as sql_select, text
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..models.ws_presence import WebSocketPresence
+
+PRESENCE_HEARTBEAT_SECONDS = 30
+PRESENCE_TTL_SECONDS = 90
+
+CHANNEL = "ws_events"
+
+# deliver(user_id, payload) sends to this worker's sockets for the user
+Deliver = Callable[[int, dict], Awaitable[None]]
+
+
+def _new_worker_id() -> str:
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _encode(worker_id: str, user_id: int, payload: dict) -> str:
+    return json.dumps({"w": worker_id, "u": user_id, "p": payload}, separators=(",", ":"), default=str)
+
+
+class Backplane(abc.ABC):
+    """Interface shared by the backends. Methods are called from the event loop."""
+
+    def __init__(self):
+        self.worker_id = _new_worker_id()
+        self._deliver: Optional[Deliver] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def publish(self, user_id: int, payload: dict) -> None:
+        """Send `payload` to the user's sockets on every other worker."""
+
+    @abc.abstractmethod
+    async def user_connected(self, user_id: int) -> None:
+        """The user's first socket on this worker opened."""
+
+    @abc.abstractmethod
+    async def user_disconnected(self, user_id: int) -> None:
+        """The user's last socket on this worker closed."""
+
+    @abc.abstractmethod
+    async def heartbeat(self, user_ids: set) -> None:
+        """Refresh presence for the users connected to this worker."""
+
+    @abc.abstractmethod
+    async def is_online(self, user_id: int) -> bool:
+        """Whether the user has a socket open on any worker."""
+
+    @abc.abstractmethod
+    async def online_users(self) -> set:
+        """Users with a socket open on any worker."""
+
+    def _received(self, message: str) -> None:
+        """Hand a message from another worker to the event loop (safe from any thread)."""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if data.get("w") == self.worker_id or self._deliver is None or self._loop is None:
+            return
+        coro = self._deliver(int(data["u"]), data["p"])
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+
+class InMemoryHub:
+    """Stands in for the shared bus and presence store between InMemoryBackplanes."""
+
+    def __init__(self):
+        self.subscribers: list = []
+        self.presence: dict = {}   # user_id -> {worker_id: seen_at}
+
+
+class InMemoryBackplane(Backplane):
+    def __init__(self, hub: Optional[InMemoryHub] = None):
+        super().__init__()
+        self.hub = hub or InMemoryHub()
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self.hub.subscribers.append(self)
+
+    async def stop(self):
+        if self in self.hub.subscribers:
+            self.hub.subscribers.remove(self)
+        for workers in self.hub.presence.values():
+            workers.pop(self.worker_id, None)
+
+    async def publish(self, user_id, payload):
+        message = _encode(self.worker_id, user_id, payload)
+        for subscriber in list(self.hub.subscribers):
+            if subscriber is not self:
+                subscriber._received(message)
+
+    async def user_connected(self, user_id):
+        self.hub.presence.setdefault(user_id, {})[self.worker_id] = time.monotonic()
+
+    async def user_disconnected(self, user_id):
+        workers = self.hub.presence.get(user_id, {})
+        workers.pop(self.worker_id, None)
+        if not workers:
+            self.hub.presence.pop(user_id, None)
+
+    async def heartbeat(self, user_ids):
+        for user_id in user_ids:
+            await self.user_connected(user_id)
+
+    async def is_online(self, user_id):
+        cutoff = time.monotonic() - PRESENCE_TTL_SECONDS
+        return any(seen_at > cutoff for seen_at in self.hub.presence.get(user_id, {}).values())
+
+    async def online_users(self):
+        return {user_id for user_id in list(self.hub.presence) if await self.is_online(user_id)}
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub. Presence: sorted set ws:presence:{user_id} of worker ids scored by last heartbeat."""
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis.asyncio as aioredis
+        self.redis = aioredis.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"ws:presence:{user_id}"
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+        await self.redis.aclose()
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        data = message["data"]
+                        self._received(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ws] Redis backplane listener failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    async def publish(self, user_id, payload):
+        await self.redis.publish(CHANNEL, _encode(self.worker_id, user_id, payload))
+
+    async def user_connected(self, user_id):
+        await self.heartbeat({user_id})
+
+    async def user_disconnected(self, user_id):
+        await self.redis.zrem(self._key(user_id), self.worker_id)
+
+    async def heartbeat(self, user_ids):
+        if not user_ids:
+            return
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.zadd(self._key(user_id), {self.worker_id: now})
+                pipe.zremrangebyscore(self._key(user_id), "-inf", now - PRESENCE_TTL_SECONDS)
+                pipe.expire(self._key(user_id), PRESENCE_TTL_SECONDS)
+            await pipe.execute()
+
+    async def is_online(self, user_id):
+        return await self.redis.zcount(self._key(user_id), time.time() - PRESENCE_TTL_SECONDS, "+inf") > 0
+
+    async def online_users(self):
+        users = set()
+        async for key in self.redis.scan_iter(match="ws:presence:*", count=500):
+            user_id = int(key.decode().rsplit(":", 1)[1] if isinstance(key, bytes) else key.rsplit(":", 1)[1])
+            if await self.is_online(user_id):
+                users.add(user_id)
+        return users
+
+
+class PostgresBackplane(Backplane):
+    """
+    LISTEN/NOTIFY. A background thread holds one connection (taken out of the pool)
+    that LISTENs on the channel; publishing is a pg_notify through the regular pool.
+    NOTIFY payloads are limited to 8000 bytes, so longer events are sent in parts
+    within one transaction (delivered together and in order) and reassembled here.
+    """
+    # Characters per part; at most 4 bytes each in UTF-8, plus the header, stays under 8000 bytes
+    PART_SIZE = 1900
+    # Parts of one event arrive together; an event still incomplete after this long lost
+    # its publisher (or a part) and is dropped
+    PARTS_TTL_SECONDS = 30
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._parts: dict = {}   # (worker_id, message_id) -> (first part received at, [part, ...])
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self._thread = threading.Thread(target=self._listen, name="ws-backplane", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        await run_in_threadpool(self._delete_worker_rows)
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self.engine.raw_connection()
+                connection.detach()   # held for the worker's lifetime; don't count it against the pool
+                raw = connection.dbapi_connection
+                raw.autocommit = True
+                raw.cursor().execute(f"LISTEN {CHANNEL}")
+                while not self._stopped.is_set():
+                    if select.select([raw], [], [], 1.0) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self._received_part(raw.notifies.pop(0).payload)
+            except Exception as e:
+                if not self._stopped.is_set():
+                    print(f"[ws] Postgres backplane listener failed, reconnecting: {e}")
+                    time.sleep(1)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _received_part(self, notification: str):
+        # "<worker_id> <message_id> <index> <count> <data>"
+        try:
+            worker_id, message_id, index, count, data = notification.split(" ", 4)
+        except ValueError:
+            return
+        if worker_id == self.worker_id:
+            return
+        if count == "1":
+            self._received(data)
+            return
+        now = time.monotonic()
+        self._evict_stale_parts(now)
+        _, parts = self._parts.setdefault((worker_id, message_id), (now, []))
+        parts.append(data)
+        if len(parts) == int(count):
+            del self._parts[(worker_id, message_id)]
+            self._received("".join(parts))
+
+    def _evict_stale_parts(self, now: float):
+        cutoff = now - self.PARTS_TTL_SECONDS
+        for key in [key for key, (received_at, _) in self._parts.items() if received_at < cutoff]:
+            del self._parts[key]
+
+    def _notify(self, message: str):
+        message_id = uuid.uuid4().hex[:12]
+        parts = [message[i:i + self.PART_SIZE] for i in range(0, len(message), self.PART_SIZE)]
+        with self.engine.begin() as conn:
+            for index, part in enumerate(parts):
+                conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": CHANNEL, "payload": f"{self.worker_id} {message_id} {index} {len(parts)} {part}"}
+                )
+
+    async def publish(self, user_id, payload):
+        await run_in_threadpool(self._notify, _encode(self.worker_id, user_id, payload))
+
+    def _upsert(self, user_ids: set, prune: bool = False):
+        rows = [{"worker_id": self.worker_id, "user_id": user_id} for user_id in user_ids]
+        with self.engine.begin() as conn:
+            conn.execute(insert(WebSocketPresence).values(rows).on_conflict_do_update(
+                index_elements=["worker_id", "user_id"], set_={"seen_at": func.now()}
+            ))
+            if prune:
+                # Rows left behind by workers that stopped without cleaning up
+                conn.execute(WebSocketPresence.__table__.delete().where(WebSocketPresence.seen_at < self._cutoff()))
+
+    def _delete(self, user_id: int):
+        with self.engine.begin() as conn:
+            conn.execute(WebSocketPresence.__table__.delete().where(
+                WebSocketPresence.worker_id == self.worker_id, WebSocketPresence.user_id == user_id
+            ))
+
+    def _delete_worker_rows(self):
+        with self.engine.begin() as conn:
+            conn.execute(WebSocketPresence.__table__.delete().where(WebSocketPresence.worker_id == self.worker_id))
+
+    @staticmethod
+    def _cutoff() -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=PRESENCE_TTL_SECONDS)
+
+    def _select_online(self, user_id: Optional[int]) -> set:
+        query = sql_select(WebSocketPresence.user_id).where(WebSocketPresence.seen_at >= self._cutoff()).distinct()
+        if user_id is not None:
+            query = query.where(WebSocketPresence.user_id == user_id)
+        with self.engine.connect() as conn:
+            return set(conn.execute(query).scalars())
+
+    async def user_connected(self, user_id):
+        await run_in_threadpool(self._upsert, {user_id})
+
+    async def user_disconnected(self, user_id):
+        await run_in_threadpool(self._delete, user_id)
+
+    async def heartbeat(self, user_ids):
+        if user_ids:
+            await run_in_threadpool(self._upsert, user_ids, True)
+
+    async def is_online(self, user_id):
+        return bool(await run_in_threadpool(self._select_online, user_id))
+
+    async def online_users(self):
+        return await run_in_threadpool(self._select_online, None)
+
+
+def create_backplane() -> Backplane:
+    """The backend chosen by WS_BACKPLANE, or the best one the other settings allow."""
+    kind = (settings.ws_backplane or "").lower()
+    if not kind:
+        if settings.redis_url:
+            kind = "redis"
+        elif settings.database_url.startswith("postgres"):
+            kind = "postgres"
+        else:
+            kind = "memory"
+
+    if kind == "redis":
+        if not settings.redis_url:
+            print("WARNING: WS_BACKPLANE=redis needs REDIS_URL - WebSocket events stay within each worker")
+            return InMemoryBackplane()
+        try:
+            return RedisBackplane(settings.redis_url)
+        except ImportError:
+            print("WARNING: the redis package is not installed - WebSocket events stay within each worker")
+            return InMemoryBackplane()
+    if kind == "postgres":
+        from ..database import engine
+        return PostgresBackplane(engine)
+    return InMemoryBackplane()
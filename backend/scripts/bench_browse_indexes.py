@@ -0,0 +1,151 @@
+"""
+Benchmark the GET /listings browse queries against a large seeded catalog.
+
+Seeds the database at DATABASE_URL with N listings (default 200k), then requests
+GET /listings through the app for every sort mode, with and without a category
+filter, runs EXPLAIN (ANALYZE, BUFFERS) on the exact SQL it issued, and prints
+each plan and its timing.
+
+PostgreSQL only. Point DATABASE_URL at a scratch database: seed rows are not
+cleaned up. Tables and the browse indexes are created if missing.
+
+    cd backend
+    DATABASE_URL=postgresql://localhost/unicycle_bench python -m scripts.bench_browse_indexes
+    python -m scripts.bench_browse_indexes --listings 50000 --limit 50 --no-plans
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app.database import Base, engine
+from app.main import app
+from app.utils.auth import create_access_token
+
+CATEGORIES = [
+    'Free', 'Textbooks & Course Materials', 'Electronics & Gadgets', 'Furniture & Decor',
+    'Clothing & Accessories', 'Sports & Fitness', 'Kitchen & Dining', 'School Supplies',
+    'Bikes & Transportation', 'Other',
+]
+CONDITIONS = ['New', 'Like New', 'Good', 'Fair']
+UNIVERSITIES = [
+    'McGill University', 'Concordia University', 'École de technologie supérieure (ÉTS)',
+    'Polytechnique Montréal', 'Université de Montréal (UdeM)',
+    'Université du Québec à Montréal (UQAM)', 'HEC Montréal',
+]
+SORTS = [None, 'oldest', 'price_asc', 'price_desc']
+SELLER_COUNT = 2000
+
+
+def seed(target: int) -> None:
+    """Top the catalog up to `target` listings with a realistic status mix."""
+    with engine.begin() as conn:
+        existing_users = conn.execute(text("SELECT count(*) FROM users WHERE email LIKE 'bench-%'")).scalar()
+        if existing_users < SELLER_COUNT:
+            conn.execute(text("""
+                INSERT INTO users (email, name, university, is_verified, is_admin, is_super_admin,
+                                   is_suspended, is_sponsor, boost_credits, avg_rating, review_count)
+                SELECT 'bench-' || g || '@example.com', 'Bench Seller ' || g,
+                       (:universities)[1 + g % array_length(:universities, 1)],
+                       true, false, false, g % 200 = 0, g % 250 = 0, 0, 0, 0
+                FROM generate_series(:start, :stop) AS g
+            """), {"universities": UNIVERSITIES, "start": existing_users + 1, "stop": SELLER_COUNT})
+
+        existing = conn.execute(text("SELECT count(*) FROM listings")).scalar()
+        if existing >= target:
+            print(f"[seed] {existing} listings already present, skipping")
+            return
+
+        # ~85% active & unsold, ~10% sold, ~5% deactivated; ~3% boosted; ~8% past expiry
+        conn.execute(text("""
+            INSERT INTO listings (title, description, price, original_price, category, condition,
+                                  images, safe_zone, is_active, is_sold, is_boosted, boosted_at,
+                                  boosted_until, expires_at, view_count, seller_id, created_at, updated_at)
+            SELECT 'Bench item ' || g,
+                   repeat('Gently used item in great shape, pickup on campus. ', 1 + g % 20),
+                   round((random() * 500)::numeric, 2), NULL,
+                   (:categories)[1 + g % array_length(:categories, 1)],
+                   (:conditions)[1 + g % array_length(:conditions, 1)],
+                   '["https://res.cloudinary.com/demo/image/upload/sample.jpg"]', 'Library',
+                   g % 20 <> 0, g % 10 = 0, g % 33 = 0,
+                   CASE WHEN g % 33 = 0 THEN now() - interval '1 hour' END,
+                   CASE WHEN g % 33 = 0 THEN now() + interval '47 hours' END,
+                   now() + (60 - (g % 65)) * interval '1 day',
+                   g % 50,
+                   (SELECT id FROM users WHERE email = 'bench-' || (1 + g % :sellers) || '@example.com'),
+                   now() - (g % 5000) * interval '17 minutes', now()
+            FROM generate_series(:start, :stop) AS g
+        """), {
+            "categories": CATEGORIES, "conditions": CONDITIONS, "sellers": SELLER_COUNT,
+            "start": existing + 1, "stop": target,
+        })
+        print(f"[seed] inserted {target - existing} listings")
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE users, listings, user_blocks"))
+
+
+def capture_listing_queries(client: TestClient, **params) -> list:
+    """
+    GET /listings as a seeded user and return the (statement, parameters) pairs it sent for
+    listings. Going through the endpoint keeps this in step with get_listings' signature.
+    """
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM listings" in statement:
+            captured.append((statement, parameters))
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench-1@example.com'})}"}
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(
+            "/listings/", params={k: v for k, v in params.items() if v is not None}, headers=headers
+        )
+        response.raise_for_status()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def explain(statement: str, parameters) -> list:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters).fetchall()
+    return [r[0] for r in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=200_000, help="catalog size to seed up to")
+    parser.add_argument("--limit", type=int, default=50, help="page size passed to get_listings (0 = unpaginated)")
+    parser.add_argument("--no-plans", action="store_true", help="print only the execution time per scenario")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("bench_browse_indexes needs a PostgreSQL DATABASE_URL (EXPLAIN ANALYZE).")
+
+    Base.metadata.create_all(bind=engine)
+    seed(args.listings)
+
+    scenarios = [dict(sort=s) for s in SORTS]
+    scenarios += [dict(sort=s, category='Electronics & Gadgets') for s in SORTS]
+    scenarios += [dict(sort=None, university=UNIVERSITIES[0])]
+
+    # Not entered as a context manager, so the app's startup jobs don't run
+    client = TestClient(app)
+    for scenario in scenarios:
+        scenario["limit"] = args.limit or None
+        label = ", ".join(f"{k}={v}" for k, v in scenario.items() if v is not None)
+        for statement, parameters in capture_listing_queries(client, **scenario):
+            plan = explain(statement, parameters)
+            timing = next((line.strip() for line in plan if line.strip().startswith("Execution Time")), "")
+            print(f"\n=== {label or 'default'} — {timing}")
+            if not args.no_plans:
+                print("\n".join(plan))
+
+
+if __name__ == "__main__":
+    main()
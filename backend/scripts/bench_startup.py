@@ -0,0 +1,87 @@
+"""
+Benchmark cold start: importing app.main, running its startup hooks and serving the first request.
+
+Each run is a fresh interpreter (no warm module cache), which imports the app, enters a
+TestClient (startup hooks) and sends GET /health. Prints the median of every phase and
+exits non-zero when the median total goes over --budget seconds, or when importing and
+starting the app loaded one of the SDKs that should only be imported on first use.
+
+Importing the app must not touch the database (the schema is Alembic's job), so any
+DATABASE_URL works; the startup hooks do connect, so point it at a migrated database.
+
+    cd backend
+    python -m scripts.bench_startup
+    python -m scripts.bench_startup --runs 10 --budget 2.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported lazily by the code paths that use them
+LAZY_MODULES = ["stripe", "cloudinary", "resend", "sentry_sdk"]
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    status = client.get("/health").status_code
+    served = time.perf_counter()
+print(json.dumps({{
+    "import": imported - started,
+    "startup": ready - imported,
+    "first_request": served - ready,
+    "total": served - started,
+    "status": status,
+    "loaded": [m for m in {lazy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once() -> dict:
+    child = CHILD.format(backend=BACKEND_DIR, lazy=LAZY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", child], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Startup run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=3.0, help="max median seconds for import + startup + first request")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    for phase in ("import", "startup", "first_request", "total"):
+        times = [r[phase] for r in runs]
+        print(f"{phase:<14} median {statistics.median(times) * 1000:8.1f} ms   max {max(times) * 1000:8.1f} ms")
+
+    failures = []
+    if any(r["status"] != 200 for r in runs):
+        failures.append("GET /health did not return 200")
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(loaded)}")
+    total = statistics.median(r["total"] for r in runs)
+    if total > args.budget:
+        failures.append(f"median total {total:.2f}s is over the {args.budget:.2f}s budget")
+
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+    print(f"OK: median total {total:.2f}s within the {args.budget:.2f}s budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Shared fixtures.
+
+The suite runs against a throwaway SQLite database built by `alembic upgrade head`, through
+one TestClient for the whole session (its startup hooks start the outbox worker, password
+pool and WebSocket manager, and the async engine's connections belong to its event loop).
+Tests don't clean up after themselves; each one makes its own users, and listings are
+kept apart by giving every test's users their own university.
+
+    cd backend
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import itertools
+import os
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DB_DIR = tempfile.mkdtemp(prefix="unicycle-tests-")
+
+# Before anything imports app.config; these override a developer's .env
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}",
+    SECRET_KEY="test-secret-key",
+    ALGORITHM="HS256",
+    ACCESS_TOKEN_EXPIRE_MINUTES="60",
+    BCRYPT_ROUNDS="4",
+    PASSWORD_POOL_WORKERS="1",
+    RESEND_API_KEY="",
+    REDIS_URL="",
+    WS_BACKPLANE="memory",
+    SENTRY_DSN="",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+_ids = itertools.count(1)
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix}-{next(_ids)}"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+    from app.main import app
+    from app.utils.limiter import limiter
+    limiter.enabled = False
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    from app.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def university():
+    """A university no other test uses, so browse queries filtered by it only see this test's listings."""
+    return unique("University")
+
+
+@pytest.fixture
+def make_user(client, university):
+    """Create a verified user; returns (user_id, Authorization headers)."""
+    from app.database import SessionLocal
+    from app.models.user import User
+    from app.utils.auth import create_access_token
+
+    def make(**fields):
+        fields.setdefault("email", f"{unique('user')}@mail.mcgill.ca")
+        fields.setdefault("name", "Test User")
+        fields.setdefault("university", university)
+        fields.setdefault("is_verified", True)
+        session = SessionLocal()
+        try:
+            user = User(**fields)
+            session.add(user)
+            session.commit()
+            user_id = user.id
+        finally:
+            session.close()
+        return user_id, {"Authorization": f"Bearer {create_access_token({'sub': fields['email']})}"}
+    return make
+
+
+@pytest.fixture
+def make_listing(client):
+    """Create a listing through the API as the given user; returns its JSON."""
+    def make(headers, **fields):
+        body = {
+            "title": "Test listing",
+            "description": "A listing made by the test suite",
+            "price": 10,
+            "category": "Other",
+            "condition": "Good",
+            "safe_zone": "Library",
+            **fields,
+        }
+        response = client.post("/listings/", json=body, headers=headers)
+        assert response.status_code == 201, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def start_conversation(client, make_user, make_listing):
+    """A buyer contacts a new seller about a new listing; returns (conversation JSON, buyer headers, seller headers)."""
+    def start(initial_message="Is this still available?"):
+        _, seller = make_user()
+        _, buyer = make_user()
+        listing = make_listing(seller)
+        response = client.post(
+            "/messages/conversations",
+            json={"listing_id": listing["id"], "initial_message": initial_message},
+            headers=buyer,
+        )
+        assert response.status_code == 201, response.text
+        return response.json(), buyer, seller
+    return start
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import select
+from app.database import AsyncSessionLocal, _async_url
+from app.models.message import ConversationSummary, Message
+from app.models.user import User
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./unicycle.db", "sqlite+aiosqlite:///./unicycle.db"),
+    ("postgresql://u:p@db:5432/app", "postgresql+asyncpg://u:p@db:5432/app"),
+    ("postgresql://u:p@db:5432/app?sslmode=require", "postgresql+asyncpg://u:p@db:5432/app?ssl=require"),
+])
+def test_async_url_uses_the_asyncio_driver(url, expected):
+    assert _async_url(url).render_as_string(hide_password=False) == expected
+
+
+def test_async_session_reads_committed_sync_writes(client, make_user):
+    user_id, _ = make_user(name="Async Reader")
+
+    async def load():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(select(User.name).where(User.id == user_id))).scalar_one()
+
+    # On the client's event loop, which the async engine's connections belong to
+    assert client.portal.call(load) == "Async Reader"
+
+
+def test_async_endpoints_check_the_user_like_sync_ones(client, start_conversation, make_user, db):
+    conversation, buyer, _ = start_conversation()
+    url = f"/messages/conversations/{conversation['id']}/messages"
+
+    assert client.post(url, json={"text": "hi"}).status_code == 401
+    assert client.post(url, json={"text": "hi"}, headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    _, unverified = make_user(is_verified=False)
+    assert client.get(f"/messages/conversations/{conversation['id']}", headers=unverified).status_code == 403
+
+    buyer_id = conversation["buyer_id"]
+    db.get(User, buyer_id).is_suspended = True
+    db.commit()
+    assert client.post(url, json={"text": "hi"}, headers=buyer).status_code == 403
+
+
+def test_send_message_commits_the_message_and_inbox_together(client, db, start_conversation):
+    conversation, buyer, seller = start_conversation()
+    first_id = client.get(f"/messages/conversations/{conversation['id']}", headers=buyer).json()["messages"][0]["id"]
+
+    response = client.post(
+        f"/messages/conversations/{conversation['id']}/messages",
+        json={"text": "Quoting you", "reply_to_id": first_id},
+        headers=seller,
+    )
+
+    # Relationships loaded after the commit are still there for the response
+    body = response.json()
+    assert response.status_code == 201, body
+    assert body["sender"]["id"] == conversation["seller_id"]
+    assert body["reply_to"]["id"] == first_id
+
+    # The summary update ran on the same transaction through run_sync
+    assert db.get(Message, body["id"]).text == "Quoting you"
+    buyer_row = db.get(ConversationSummary, (conversation["id"], conversation["buyer_id"]))
+    assert (buyer_row.last_message_id, buyer_row.unread_count) == (body["id"], 1)
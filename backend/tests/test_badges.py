@@ -0,0 +1,104 @@
+import pytest
+from app.models.badge_counter import BadgeCounter
+from app.models.notification import Notification
+from app.models.user import User
+from app.utils.badges import get_badges
+
+
+def _badges(client, headers):
+    response = client.get("/me/badges", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def admin(make_user):
+    return make_user(is_admin=True)[1]
+
+
+def _broadcast(client, admin, target_university, title="Heads up"):
+    response = client.post(
+        "/admin/notifications/broadcast",
+        json={"title": title, "message": "Something happened", "target_university": target_university},
+        headers=admin,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_broadcasts_count_for_the_users_who_can_see_them(client, university, make_user, admin):
+    _, student = make_user()
+    _, elsewhere = make_user(university=f"{university} (other campus)")
+    # One user's counter row exists before the broadcasts, the other's is created after
+    assert _badges(client, student) == {"unread_messages": 0, "unread_notifications": 0}
+
+    _broadcast(client, admin, university)
+    _broadcast(client, admin, university)
+
+    assert _badges(client, student)["unread_notifications"] == 2
+    assert _badges(client, elsewhere)["unread_notifications"] == 0
+    assert client.get("/notifications/unread-count", headers=student).json() == {"unread_count": 2}
+
+
+def test_reading_decrements_once_and_only_for_counted_notifications(client, university, make_user, admin):
+    _, student = make_user()
+    _badges(client, student)
+    mine = _broadcast(client, admin, university)
+    _broadcast(client, admin, university)
+    theirs = _broadcast(client, admin, f"{university} (other campus)")
+
+    client.put(f"/notifications/{mine}/read", headers=student)
+    client.put(f"/notifications/{mine}/read", headers=student)
+    assert _badges(client, student)["unread_notifications"] == 1
+
+    # Not visible to this user, or doesn't exist: nothing to take off the counter
+    client.put(f"/notifications/{theirs}/read", headers=student)
+    client.put("/notifications/999999/read", headers=student)
+    assert _badges(client, student)["unread_notifications"] == 1
+
+    client.put("/notifications/read-all", headers=student)
+    assert _badges(client, student)["unread_notifications"] == 0
+
+
+def test_a_missing_counter_is_recomputed_without_committing_the_callers_session(client, db, university, make_user, admin):
+    user_id, student = make_user()
+    _broadcast(client, admin, university)
+    _badges(client, student)
+    db.query(BadgeCounter).filter(BadgeCounter.user_id == user_id).delete()
+    db.commit()
+
+    # Pending on the caller's session; get_badges must neither commit nor count it
+    db.add(Notification(title="Uncommitted", message="Never saved", type="personal", recipient_user_id=user_id, created_by=user_id))
+    assert get_badges(db, db.get(User, user_id))["unread_notifications"] == 1
+    db.rollback()
+
+    assert db.query(Notification).filter(Notification.title == "Uncommitted").count() == 0
+    assert db.get(BadgeCounter, user_id).unread_notifications == 1
+
+
+def test_unread_messages_follow_the_inbox(client, start_conversation):
+    conversation, _, seller = start_conversation()
+    assert _badges(client, seller)["unread_messages"] == 1
+    assert client.get("/messages/unread-count", headers=seller).json()["unread_count"] == 1
+
+    client.get(f"/messages/conversations/{conversation['id']}", headers=seller)
+
+    assert _badges(client, seller)["unread_messages"] == 0
+
+
+def test_unread_messages_are_pushed_over_the_websocket(client, start_conversation):
+    conversation, buyer, seller = start_conversation()
+    token = buyer["Authorization"].split()[1]
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": token})
+        assert ws.receive_json()["type"] == "ready"
+        assert ws.receive_json() == {"type": "badges", "unread_messages": 0, "unread_notifications": 0}
+
+        client.post(f"/messages/conversations/{conversation['id']}/messages", json={"text": "Yes it is"}, headers=seller)
+        event = ws.receive_json()
+        while event["type"] != "badges":
+            event = ws.receive_json()
+
+    assert event["unread_messages"] == 1
+    assert _badges(client, buyer)["unread_messages"] == 1
@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+from sqlalchemy import update
+from app.database import engine
+from app.models.listing import Listing
+from app.models.user import User
+from app.utils import cache as cache_module
+from app.utils.browse_cache import _VERSION_KEY
+from app.utils.cache import LRUCache, get_cache
+
+
+def _browse_ids(client, headers, university, **params):
+    response = client.get("/listings/", params={"university": university, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [listing["id"] for listing in response.json()]
+
+
+def _mark_sold_behind_the_cache(listing_id: int):
+    # A Core statement skips the Session events that invalidate the cache
+    with engine.begin() as conn:
+        conn.execute(update(Listing).where(Listing.id == listing_id).values(is_sold=True))
+
+
+def _version():
+    return get_cache().get(_VERSION_KEY)
+
+
+def test_lru_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    lru = LRUCache(max_entries=2)
+
+    lru.set("a", "1", ex=30)
+    lru.set("b", "2")
+    lru.get("a")          # a is now the most recently used
+    lru.set("c", "3")     # evicts b
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == ("1", None, "3")
+
+    now[0] += 30
+    assert lru.get("a") is None
+    assert lru.incr("counter") == 1 and lru.incr("counter") == 2
+
+
+def test_repeated_browse_is_served_from_the_cache(client, university, make_user, make_listing):
+    _, headers = make_user()
+    listing = make_listing(headers)
+    assert _browse_ids(client, headers, university) == [listing["id"]]
+
+    _mark_sold_behind_the_cache(listing["id"])
+
+    assert _browse_ids(client, headers, university) == [listing["id"]]
+    # A different filter combination is its own entry
+    assert _browse_ids(client, headers, university, category="Other") == []
+
+
+def test_listing_changes_invalidate_the_cache(client, university, make_user, make_listing):
+    _, headers = make_user()
+    first = make_listing(headers)
+    assert _browse_ids(client, headers, university) == [first["id"]]
+
+    second = make_listing(headers)
+    assert sorted(_browse_ids(client, headers, university)) == sorted([first["id"], second["id"]])
+
+    _mark_sold_behind_the_cache(second["id"])
+    client.put(f"/listings/{first['id']}", json={"price": 12}, headers=headers)
+    assert _browse_ids(client, headers, university) == [first["id"]]
+
+
+def test_view_counts_and_rollbacks_do_not_invalidate(client, db, make_user, make_listing):
+    _, headers = make_user()
+    listing_id = make_listing(headers)["id"]
+    version = _version()
+
+    listing = db.get(Listing, listing_id)
+    listing.view_count = (listing.view_count or 0) + 5
+    db.commit()
+    assert _version() == version
+
+    listing.title = "Renamed listing"
+    db.flush()
+    db.rollback()
+    assert _version() == version
+
+    listing.title = "Renamed listing"
+    db.commit()
+    assert _version() != version
+
+
+def test_seller_browse_fields_invalidate(client, db, make_user):
+    user_id, _ = make_user()
+    user = db.get(User, user_id)
+    version = _version()
+
+    user.name = "Renamed"
+    db.commit()
+    assert _version() == version
+
+    user.university = "Another University"
+    db.commit()
+    assert _version() != version
+
+
+def test_hidden_sellers_are_dropped_from_cached_pages(client, university, make_user, make_listing):
+    _, viewer = make_user()
+    seller_id, seller = make_user()
+    listing = make_listing(seller)
+    assert _browse_ids(client, viewer, university) == [listing["id"]]
+
+    response = client.post(f"/users/{seller_id}/block", headers=viewer)
+    assert response.status_code in (200, 201), response.text
+
+    assert _browse_ids(client, viewer, university) == []
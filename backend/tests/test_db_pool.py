@@ -0,0 +1,88 @@
+import anyio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.utils import db_pool
+from app.utils.db_pool import (
+    BACKGROUND_CONNECTIONS, DEFAULT_ASYNC_MAX_OVERFLOW, THREADPOOL_SIZE,
+    InstrumentedAsyncQueuePool, InstrumentedQueuePool, engine_options, instrument,
+)
+
+POSTGRES_URL = "postgresql://u:p@db:5432/app"
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    def override(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(db_pool.settings, name, value)
+    override(db_pool_size=10, db_max_overflow=None)
+    return override
+
+
+def test_sqlite_keeps_the_default_pool_sizing():
+    assert set(engine_options("sqlite:///./unicycle.db", "sync")) == {"pool_pre_ping", "pool_recycle"}
+
+
+def test_the_sync_pool_grows_to_cover_the_threadpool(pool_settings):
+    options = engine_options(POSTGRES_URL, "sync")
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] + options["max_overflow"] == THREADPOOL_SIZE + BACKGROUND_CONNECTIONS
+
+
+def test_an_explicit_overflow_wins_with_a_warning_if_too_small(pool_settings, capsys):
+    pool_settings(db_pool_size=5, db_max_overflow=2)
+
+    assert engine_options(POSTGRES_URL, "sync")["max_overflow"] == 2
+    assert "sync endpoints will queue for connections" in capsys.readouterr().out
+
+
+def test_the_async_pool_keeps_its_own_overflow(pool_settings):
+    options = engine_options(POSTGRES_URL, "async")
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (10, DEFAULT_ASYNC_MAX_OVERFLOW)
+
+
+class _TestPool(InstrumentedQueuePool):
+    _metrics_name = "test"
+
+
+def test_checkouts_waits_and_timeouts_are_counted(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=_TestPool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument(engine, "test")
+    metrics = db_pool._metrics["test"]
+    try:
+        with engine.connect():
+            assert (metrics.in_use, metrics.peak_in_use) == (1, 1)
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        stats = metrics.snapshot(engine.pool)
+        assert stats["in_use"] == 0 and stats["checkouts"] == 1 and stats["connects"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["max_wait_ms"] >= 50
+        assert (stats["pool_size"], stats["max_overflow"], stats["idle"]) == (1, 0, 1)
+    finally:
+        db_pool._metrics.pop("test", None)
+        engine.dispose()
+
+
+def test_startup_sizes_the_threadpool(client):
+    async def tokens():
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    assert client.portal.call(tokens) == THREADPOOL_SIZE
+
+
+def test_pool_stats_are_admin_only(client, make_user):
+    _, admin = make_user(is_admin=True)
+    _, student = make_user()
+
+    assert client.get("/admin/db-pool-stats", headers=student).status_code == 403
+    stats = client.get("/admin/db-pool-stats", headers=admin).json()
+    assert stats["threadpool_size"] == THREADPOOL_SIZE
+    assert stats["sync"]["checkouts"] > 0
+    assert "async" in stats
@@ -0,0 +1,121 @@
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from app.models.outbox_job import OutboxJob
+from app.utils import email, outbox
+from app.utils.email import EMAIL_RECIPIENT_LIMIT, EMAIL_RECIPIENT_WINDOW_SECONDS, MemorySink, deliver_emails
+from app.utils.outbox import RetryLater
+
+
+class FailingSink:
+    def send_batch(self, emails: list) -> None:
+        raise ConnectionError("provider down")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for the per-recipient limit, with an empty send history."""
+    now = [1000.0]
+    monkeypatch.setattr(email, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(email, "_recent", {})
+    return now
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = MemorySink()
+    monkeypatch.setattr(email, "_sink", sink)
+    return sink
+
+
+def _emails(count, to="student@example.com"):
+    return [{"to": to, "subject": f"Email {i}", "html": "<p>hi</p>"} for i in range(count)]
+
+
+def test_emails_over_a_recipients_limit_are_deferred_until_the_window_frees_up(clock, sink):
+    errors = deliver_emails(_emails(EMAIL_RECIPIENT_LIMIT + 2) + _emails(1, to="other@example.com"))
+
+    assert len(sink.sent) == EMAIL_RECIPIENT_LIMIT + 1
+    assert sorted(errors) == [EMAIL_RECIPIENT_LIMIT, EMAIL_RECIPIENT_LIMIT + 1]
+    assert all(isinstance(e, RetryLater) and e.seconds == EMAIL_RECIPIENT_WINDOW_SECONDS for e in errors.values())
+
+    # Recipients are matched case-insensitively
+    clock[0] += 60
+    errors = deliver_emails(_emails(1, to="Student@Example.com"))
+    assert errors[0].seconds == EMAIL_RECIPIENT_WINDOW_SECONDS - 60
+
+    clock[0] += EMAIL_RECIPIENT_WINDOW_SECONDS
+    assert deliver_emails(_emails(1)) == {}
+
+
+def test_a_failed_batch_does_not_count_against_the_limit(clock, sink, monkeypatch):
+    monkeypatch.setattr(email, "_sink", FailingSink())
+    errors = deliver_emails(_emails(EMAIL_RECIPIENT_LIMIT))
+    assert len(errors) == EMAIL_RECIPIENT_LIMIT
+    assert all(isinstance(e, ConnectionError) for e in errors.values())
+
+    monkeypatch.setattr(email, "_sink", sink)
+    assert deliver_emails(_emails(EMAIL_RECIPIENT_LIMIT)) == {}
+    assert len(sink.sent) == EMAIL_RECIPIENT_LIMIT
+
+
+def test_emails_are_queued_on_the_callers_session_with_values_escaped(db):
+    email.send_direct_email("student@example.com", "<script>alert(1)</script>", "Hello", "Tom & Jerry", db=db)
+    job = next(o for o in db.new if isinstance(o, OutboxJob))
+    payload = json.loads(job.payload)
+    db.rollback()
+
+    assert payload["to"] == "student@example.com"
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in payload["html"]
+    assert "<script>" not in payload["html"]
+    assert "Tom &amp; Jerry" in payload["html"]
+    # Discarded with the caller's change
+    assert db.query(OutboxJob).filter(OutboxJob.payload == job.payload).count() == 0
+
+
+def _seconds_until(moment: datetime) -> float:
+    if moment.tzinfo is None:  # SQLite hands back naive UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - datetime.now(timezone.utc)).total_seconds()
+
+
+@pytest.fixture
+def job(db, monkeypatch):
+    """A job for a test handler, scheduled far ahead so the running worker leaves it to the test."""
+    calls = []
+
+    def handler(outcome):
+        calls.append(outcome)
+        if outcome == "retry-later":
+            raise RetryLater(600)
+        if outcome == "fail":
+            raise ValueError("boom")
+
+    monkeypatch.setitem(outbox._handlers, "test.job", (handler, 1))
+
+    def make(outcome, attempts=0):
+        row = OutboxJob(
+            kind="test.job", payload=json.dumps({"outcome": outcome}), attempts=attempts,
+            run_at=datetime.now(timezone.utc) + timedelta(days=1),
+        )
+        db.add(row)
+        db.commit()
+        return row
+
+    def run(row):
+        # As claimed by the worker, which counts the attempt before running it
+        row.attempts += 1
+        db.commit()
+        job_id = row.id
+        outbox._run([(job_id, row.kind, row.payload, row.attempts)])
+        db.expunge(row)
+        return db.get(OutboxJob, job_id)
+
+    return SimpleNamespace(make=make, run=run, calls=calls)
+
+
+def test_retry_later_does_not_use_up_an_attempt(job):
+    row = job.run(job.make("retry-later", attempts=3))
+    assert row.status == "pending" and row.attempts == 3
+    assert 595 < _seconds_until(row.run_at) <= 600
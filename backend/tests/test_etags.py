@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from app.database import engine
+from app.models.listing import Listing
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+def _touch(listing_id: int, **values):
+    # SQLite's CURRENT_TIMESTAMP has second precision, so set a clearly later updated_at
+    with engine.begin() as conn:
+        conn.execute(update(Listing).where(Listing.id == listing_id).values(**values))
+
+
+def test_listing_revalidates_with_304_until_it_changes(client, make_user, make_listing):
+    _, headers = make_user()
+    listing_id = make_listing(headers)["id"]
+
+    first = client.get(f"/listings/{listing_id}", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get(f"/listings/{listing_id}", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    # Proxies may weaken the tag; If-None-Match compares weakly
+    assert client.get(f"/listings/{listing_id}", headers={**headers, "If-None-Match": f"W/{etag}"}).status_code == 304
+
+    _touch(listing_id, updated_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    changed = client.get(f"/listings/{listing_id}", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_view_counts_change_the_tag(client, make_user, make_listing):
+    # The view counter writes view_count without touching updated_at
+    _, headers = make_user()
+    listing_id = make_listing(headers)["id"]
+    etag = client.get(f"/listings/{listing_id}", headers=headers).headers["ETag"]
+
+    _touch(listing_id, view_count=Listing.view_count + 3)
+
+    assert client.get(f"/listings/{listing_id}", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_browse_304_carries_the_next_cursor(client, university, make_user, make_listing):
+    _, headers = make_user()
+    for i in range(3):
+        make_listing(headers, title=f"Item {i}")
+    params = {"university": university, "limit": 2}
+
+    first = client.get("/listings/", params=params, headers=headers)
+    cached = client.get("/listings/", params=params, headers={**headers, "If-None-Match": first.headers["ETag"]})
+
+    assert cached.status_code == 304
+    assert cached.headers[NEXT_CURSOR_HEADER] == first.headers[NEXT_CURSOR_HEADER]
+
+
+def test_browse_tag_changes_when_a_seller_is_hidden(client, university, make_user, make_listing):
+    _, viewer = make_user()
+    seller_id, seller = make_user()
+    make_listing(seller)
+    etag = client.get("/listings/", params={"university": university}, headers=viewer).headers["ETag"]
+
+    client.post(f"/users/{seller_id}/block", headers=viewer)
+
+    response = client.get("/listings/", params={"university": university}, headers={**viewer, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_profile_and_seller_listings_revalidate(client, make_user, make_listing):
+    seller_id, seller = make_user()
+    _, viewer = make_user()
+    make_listing(seller)
+
+    for path in (f"/users/{seller_id}", f"/listings/user/{seller_id}"):
+        etag = client.get(path, headers=viewer).headers["ETag"]
+        assert client.get(path, headers={**viewer, "If-None-Match": etag}).status_code == 304
+        assert client.get(path, headers={**viewer, "If-None-Match": '"stale"'}).status_code == 200
@@ -0,0 +1,110 @@
+import time
+import pytest
+from app.models.message import ConversationSummary
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+def _send(client, headers, conversation_id, text):
+    response = client.post(f"/messages/conversations/{conversation_id}/messages", json={"text": text}, headers=headers)
+    assert response.status_code == 201, response.text
+
+
+def _inbox(client, headers, **params):
+    response = client.get("/messages/conversations", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def inbox(client, make_user, make_listing):
+    """One buyer who has contacted one seller about three listings; returns (conversation ids oldest first, buyer, seller)."""
+    _, seller = make_user()
+    _, buyer = make_user()
+    ids = []
+    for i in range(3):
+        listing = make_listing(seller, title=f"Listing {i}")
+        response = client.post(
+            "/messages/conversations", json={"listing_id": listing["id"], "initial_message": f"hello {i}"}, headers=buyer
+        )
+        ids.append(response.json()["id"])
+    return ids, buyer, seller
+
+
+def test_inbox_rows_carry_the_last_message_and_unread_count(client, inbox):
+    ids, buyer, seller = inbox
+    _send(client, seller, ids[1], "yes, still available")
+
+    seller_rows = {row["id"]: row for row in _inbox(client, seller)}
+    buyer_rows = {row["id"]: row for row in _inbox(client, buyer)}
+
+    assert sorted(seller_rows) == sorted(ids)
+    assert [seller_rows[i]["unread_count"] for i in ids] == [1, 1, 1]
+    assert [buyer_rows[i]["unread_count"] for i in ids] == [0, 1, 0]
+    assert seller_rows[ids[1]]["last_message"]["text"] == "yes, still available"
+    assert seller_rows[ids[0]]["last_message"]["text"] == "hello 0"
+
+
+def test_new_activity_moves_a_conversation_to_the_top(client, inbox):
+    ids, buyer, seller = inbox
+    assert [row["id"] for row in _inbox(client, seller)] == list(reversed(ids))
+
+    time.sleep(1.1)  # SQLite's CURRENT_TIMESTAMP has one-second resolution
+    _send(client, buyer, ids[0], "still there?")
+
+    assert [row["id"] for row in _inbox(client, seller)] == [ids[0], ids[2], ids[1]]
+
+
+def test_opening_a_conversation_clears_its_unread_count(client, inbox):
+    ids, _, seller = inbox
+    client.get(f"/messages/conversations/{ids[0]}", headers=seller)
+
+    rows = {row["id"]: row["unread_count"] for row in _inbox(client, seller)}
+    assert rows == {ids[0]: 0, ids[1]: 1, ids[2]: 1}
+    assert client.get("/messages/unread-count", headers=seller).json()["unread_count"] == 2
+
+
+def test_hiding_the_last_message_falls_back_for_that_user_only(client, inbox):
+    ids, buyer, seller = inbox
+    _send(client, seller, ids[0], "reply to hide")
+    last_id = client.get(f"/messages/conversations/{ids[0]}", params={"limit": 1}, headers=seller).json()["messages"][0]["id"]
+
+    client.delete(f"/messages/conversations/{ids[0]}/messages/{last_id}", headers=seller)
+
+    assert {r["id"]: r for r in _inbox(client, seller)}[ids[0]]["last_message"]["text"] == "hello 0"
+    assert {r["id"]: r for r in _inbox(client, buyer)}[ids[0]]["last_message"]["text"] == "reply to hide"
+
+
+def test_archived_conversations_are_listed_apart_until_a_new_message(client, inbox):
+    ids, buyer, seller = inbox
+    assert client.delete(f"/messages/conversations/{ids[0]}", headers=seller).status_code == 204
+
+    assert ids[0] not in [row["id"] for row in _inbox(client, seller)]
+    assert [row["id"] for row in _inbox(client, seller, include_archived=True)] == [ids[0]]
+    # Archived conversations don't count towards the unread badge
+    assert client.get("/messages/unread-count", headers=seller).json()["unread_count"] == 2
+
+    _send(client, buyer, ids[0], "are you there?")
+    assert ids[0] in [row["id"] for row in _inbox(client, seller)]
+
+
+def test_inbox_pages_cover_every_conversation_once(client, inbox):
+    ids, _, seller = inbox
+    first = client.get("/messages/conversations", params={"limit": 2}, headers=seller)
+    second = client.get(
+        "/messages/conversations", params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]}, headers=seller
+    )
+
+    assert [row["id"] for row in first.json() + second.json()] == list(reversed(ids))
+    assert NEXT_CURSOR_HEADER not in second.headers
+
+
+def test_sending_rebuilds_missing_summaries(client, db, inbox):
+    ids, buyer, seller = inbox
+    db.query(ConversationSummary).filter(ConversationSummary.conversation_id.in_(ids[:2])).delete(synchronize_session=False)
+    db.commit()
+
+    # Sending repairs the conversation's rows from its messages; migration a3c1f7e9d245
+    # backfills the rest (see test_migrations)
+    _send(client, buyer, ids[0], "second message")
+    rows = {row["id"]: row["unread_count"] for row in _inbox(client, seller)}
+    assert rows == {ids[0]: 2, ids[2]: 1}
@@ -0,0 +1,75 @@
+import json
+from sqlalchemy import event
+from app.database import engine
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+CARD_FIELDS = {
+    "id", "title", "price", "original_price", "category", "condition", "images",
+    "is_sold", "is_boosted", "seller_id", "seller", "created_at",
+}
+
+
+def test_card_rows_hold_only_what_the_grid_renders(client, university, make_user, make_listing):
+    seller_id, headers = make_user(name="Card Seller")
+    make_listing(headers, images=["https://img/1.jpg", "https://img/2.jpg", "https://img/3.jpg"])
+
+    [card] = client.get("/listings/", params={"university": university, "fields": "card"}, headers=headers).json()
+
+    assert set(card) == CARD_FIELDS
+    assert json.loads(card["images"]) == ["https://img/1.jpg"]
+    assert card["seller"] == {"id": seller_id, "name": "Card Seller", "is_sponsor": False, "sponsored_category": None}
+
+
+def test_the_default_is_still_the_full_listing(client, university, make_user, make_listing):
+    _, headers = make_user()
+    make_listing(headers, images=["https://img/1.jpg", "https://img/2.jpg"])
+
+    for params in ({}, {"fields": "full"}):
+        [listing] = client.get("/listings/", params={"university": university, **params}, headers=headers).json()
+        assert listing["description"] == "A listing made by the test suite"
+        assert len(json.loads(listing["images"])) == 2
+        assert "university" in listing["seller"]
+
+
+def test_card_queries_skip_the_text_columns(client, university, make_user, make_listing):
+    _, headers = make_user()
+    make_listing(headers)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM listings" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        client.get("/listings/", params={"university": university, "fields": "card", "sort": "oldest"}, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert statements
+    for statement in statements:
+        assert "listings.description" not in statement
+        assert "listings.safe_zone_address" not in statement
+        assert "avatar_url" not in statement and "hashed_password" not in statement
+
+
+def test_card_pages_follow_the_cursor_and_have_their_own_etag(client, university, make_user, make_listing):
+    _, headers = make_user()
+    ids = [make_listing(headers, title=f"Item {i}")["id"] for i in range(3)]
+    params = {"university": university, "limit": 2}
+
+    card = client.get("/listings/", params={**params, "fields": "card"}, headers=headers)
+    full = client.get("/listings/", params=params, headers=headers)
+    rest = client.get(
+        "/listings/", params={**params, "fields": "card", "cursor": card.headers[NEXT_CURSOR_HEADER]}, headers=headers
+    )
+
+    assert [c["id"] for c in card.json() + rest.json()] == sorted(ids, reverse=True)
+    assert card.headers["ETag"] != full.headers["ETag"]
+    again = client.get("/listings/", params={**params, "fields": "card"}, headers={**headers, "If-None-Match": card.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_unknown_projection_is_rejected(client, make_user):
+    _, headers = make_user()
+    assert client.get("/listings/", params={"fields": "everything"}, headers=headers).status_code == 422
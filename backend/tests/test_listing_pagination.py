@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from app.utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def _all_pages(client, headers, **params):
+    """Follow X-Next-Cursor from the first page to the last; returns the pages' listing ids."""
+    pages, cursor = [], None
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/listings/", params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([listing["id"] for listing in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+        assert len(pages) < 20, "cursor never ran out"
+
+
+@pytest.fixture
+def seller_listings(make_user, make_listing):
+    _, headers = make_user()
+    # Repeated prices, so the id tiebreaker decides the order within a price
+    ids = [make_listing(headers, title=f"Item {i}", price=price)["id"] for i, price in enumerate([5, 20, 5, 15, 20, 5, 30])]
+    return headers, ids
+
+
+@pytest.mark.parametrize("sort", [None, "oldest", "price_asc", "price_desc"])
+def test_pages_cover_every_listing_once_in_order(client, university, seller_listings, sort):
+    headers, ids = seller_listings
+    params = {"university": university, **({"sort": sort} if sort else {})}
+    unpaginated = [listing["id"] for listing in client.get("/listings/", params=params, headers=headers).json()]
+
+    pages = _all_pages(client, headers, limit=3, **params)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [listing_id for page in pages for listing_id in page] == unpaginated
+    assert sorted(unpaginated) == sorted(ids)
+
+
+def test_price_sort_breaks_ties_by_id(client, university, seller_listings):
+    headers, _ = seller_listings
+    listings = client.get("/listings/", params={"university": university, "sort": "price_asc"}, headers=headers).json()
+    keys = [(listing["price"], listing["id"]) for listing in listings]
+    assert keys == sorted(keys)
+
+
+def test_listings_created_while_paging_do_not_shift_later_pages(client, university, seller_listings, make_listing):
+    headers, ids = seller_listings
+    first = client.get("/listings/", params={"university": university, "limit": 3}, headers=headers)
+
+    # With OFFSET this would push the first page's last row onto the second page
+    make_listing(headers, title="Posted meanwhile")
+    second = client.get(
+        "/listings/",
+        params={"university": university, "limit": 3, "cursor": first.headers[NEXT_CURSOR_HEADER]},
+        headers=headers,
+    )
+
+    first_ids = [listing["id"] for listing in first.json()]
+    second_ids = [listing["id"] for listing in second.json()]
+    assert not set(first_ids) & set(second_ids)
+    assert second_ids == sorted(set(ids) - set(first_ids), reverse=True)[:3]
+
+
+def test_last_page_has_no_cursor(client, university, seller_listings):
+    headers, ids = seller_listings
+    response = client.get("/listings/", params={"university": university, "limit": len(ids)}, headers=headers)
+    assert len(response.json()) == len(ids)
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_malformed_cursor_is_rejected(client, make_user):
+    _, headers = make_user()
+    response = client.get("/listings/", params={"limit": 2, "cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_cursor_from_another_sort_is_rejected(client, university, seller_listings):
+    headers, _ = seller_listings
+    first = client.get("/listings/", params={"university": university, "limit": 2, "sort": "price_asc"}, headers=headers)
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+
+    response = client.get(
+        "/listings/", params={"university": university, "limit": 2, "sort": "oldest", "cursor": cursor}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_cursor_round_trips_datetimes():
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor("newest", [1, created_at, 42])
+
+    assert decode_cursor(cursor, "newest", 3) == [1, created_at, 42]
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, "newest", 2)
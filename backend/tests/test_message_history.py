@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import event, text
+from app.database import async_engine, engine
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+def _send(client, headers, conversation_id, text):
+    response = client.post(f"/messages/conversations/{conversation_id}/messages", json={"text": text}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _history(client, headers, conversation_id, **params):
+    response = client.get(f"/messages/conversations/{conversation_id}", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [m["text"] for m in response.json()["messages"]], response.headers.get(NEXT_CURSOR_HEADER)
+
+
+@pytest.fixture
+def chat(client, start_conversation):
+    """A conversation holding messages "0" (the opener) to "7", alternating senders."""
+    conversation, buyer, seller = start_conversation(initial_message="0")
+    for i in range(1, 8):
+        _send(client, seller if i % 2 else buyer, conversation["id"], str(i))
+    return conversation["id"], buyer, seller
+
+
+def test_without_paging_every_message_is_returned_oldest_first(client, chat):
+    conversation_id, buyer, _ = chat
+    texts, cursor = _history(client, buyer, conversation_id)
+    assert texts == [str(i) for i in range(8)]
+    assert cursor is None
+
+
+def test_before_cursor_walks_back_through_older_pages(client, chat):
+    conversation_id, buyer, _ = chat
+
+    latest, cursor = _history(client, buyer, conversation_id, limit=3)
+    older, cursor = _history(client, buyer, conversation_id, limit=3, before=cursor)
+    oldest, cursor = _history(client, buyer, conversation_id, limit=3, before=cursor)
+
+    assert (latest, older, oldest) == (["5", "6", "7"], ["2", "3", "4"], ["0", "1"])
+    assert cursor is None
+
+
+def test_after_cursor_fetches_newer_messages(client, chat):
+    conversation_id, buyer, seller = chat
+    latest_id = client.get(f"/messages/conversations/{conversation_id}", params={"limit": 1}, headers=buyer).json()["messages"][0]["id"]
+
+    assert _history(client, buyer, conversation_id, after=latest_id, limit=3) == ([], None)
+
+    for text in ("8", "9", "10", "11"):
+        _send(client, seller, conversation_id, text)
+    newer, cursor = _history(client, buyer, conversation_id, after=latest_id, limit=3)
+    assert newer == ["8", "9", "10"]
+    assert _history(client, buyer, conversation_id, after=cursor, limit=3) == (["11"], None)
+
+
+def test_opening_marks_only_the_other_sides_messages_read(client, chat):
+    conversation_id, buyer, seller = chat
+    assert client.get("/messages/unread-count", headers=buyer).json()["unread_count"] == 4
+
+    messages = client.get(f"/messages/conversations/{conversation_id}", params={"limit": 2}, headers=buyer).json()["messages"]
+
+    # The whole conversation is read, not just the page that was fetched
+    assert client.get("/messages/unread-count", headers=buyer).json()["unread_count"] == 0
+    assert client.get("/messages/unread-count", headers=seller).json()["unread_count"] == 4
+    assert messages[-1]["text"] == "7"
+
+
+def test_hidden_messages_are_left_out_for_the_hider_only(client, chat):
+    conversation_id, buyer, seller = chat
+    response = client.get(f"/messages/conversations/{conversation_id}", params={"limit": 1}, headers=buyer)
+    last_id = response.json()["messages"][0]["id"]
+
+    assert client.delete(f"/messages/conversations/{conversation_id}/messages/{last_id}", headers=buyer).status_code == 204
+
+    assert _history(client, buyer, conversation_id, limit=2)[0] == ["5", "6"]
+    assert _history(client, seller, conversation_id, limit=2)[0] == ["6", "7"]
+
+
+def test_only_participants_can_read_a_conversation(client, chat, make_user):
+    conversation_id, _, _ = chat
+    _, outsider = make_user()
+    assert client.get(f"/messages/conversations/{conversation_id}", headers=outsider).status_code == 403
+    assert client.get("/messages/conversations/999999", headers=outsider).status_code == 404
+
+
+def test_history_pages_read_the_conversation_id_index(client, chat):
+    conversation_id, buyer, _ = chat
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM messages" in statement and "ORDER BY messages.id DESC" in statement:
+            captured.append((statement, parameters))
+
+    # The endpoint reads through the async engine
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        _history(client, buyer, conversation_id, limit=3)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    [(statement, parameters)] = captured
+    with engine.connect() as conn:
+        plan = " | ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+        names = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert "ix_messages_conversation_id_id" in names
+    # SQLite's id is the rowid, which every index already ends with, so either conversation
+    # index returns the page in id order; PostgreSQL needs the composite one for that
+    assert "USING INDEX ix_messages_conversation_id" in plan
+    assert "TEMP B-TREE" not in plan
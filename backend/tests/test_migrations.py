@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(db_path, *args):
+    """Run a command from backend/ against its own SQLite database."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    result = subprocess.run(args, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def _alembic(db_path, *args):
+    return _run(db_path, sys.executable, "-m", "alembic", *args)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "migrated.db"
+
+
+def test_importing_the_app_runs_no_ddl_and_loads_no_optional_sdks(db_path):
+    loaded = _run(db_path, sys.executable, "-c", (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('sentry_sdk', 'cloudinary', 'resend') if m in sys.modules))"
+    ))
+
+    assert loaded.splitlines()[-1] == "[]"
+    assert not db_path.exists() or sqlite3.connect(db_path).execute("SELECT name FROM sqlite_master").fetchall() == []
+
+
+def _mapped_objects(object, name, type_, reflected, compare_to):
+    # The FTS5 tables are raw DDL in d1a7e4c93f20; alembic/env.py skips them the same way
+    return not (type_ == "table" and name.startswith(("listings_fts", "requests_fts")))
+
+
+def test_upgrade_head_builds_what_the_models_describe(client):
+    # The suite's database was built by `alembic upgrade head` (see conftest)
+    from app.database import Base, engine
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_object": _mapped_objects})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_the_catch_up_revision_fills_in_what_startup_used_to_add(db_path):
+    _alembic(db_path, "upgrade", "d9f3b6c2e814")
+    with sqlite3.connect(db_path) as conn:
+        # As on a database only ever upgraded by Alembic
+        conn.execute("ALTER TABLE listings DROP COLUMN view_count")
+        conn.execute("DELETE FROM system_settings")
+
+    _alembic(db_path, "upgrade", "head")
+
+    with sqlite3.connect(db_path) as conn:
+        assert "view_count" in {row[1] for row in conn.execute("PRAGMA table_info(listings)")}
+        assert conn.execute("SELECT value FROM system_settings WHERE key = 'sponsored_pins_in_all'").fetchone() == ("false",)
+
+
+def test_conversation_summaries_are_backfilled_from_existing_messages(db_path):
+    _alembic(db_path, "upgrade", "5b2e9f0c7a61")
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO users (id, email, name, university) VALUES (?, ?, 'Test User', 'McGill')",
+            [(1, "buyer@mail.mcgill.ca"), (2, "seller@mail.mcgill.ca")],
+        )
+        conn.execute(
+            "INSERT INTO listings (id, title, description, price, category, condition, safe_zone, seller_id) "
+            "VALUES (1, 'Calculus textbook', 'Used', 20, 'Textbooks', 'Good', 'Library', 2)"
+        )
+        conn.executemany(
+            "INSERT INTO conversations (id, listing_id, buyer_id, seller_id, created_at) VALUES (?, 1, 1, 2, ?)",
+            [(1, "2026-01-01 10:00:00"), (2, "2026-01-02 10:00:00")],
+        )
+        conn.executemany(
+            "INSERT INTO messages (id, conversation_id, sender_id, text, is_read, hidden_by_seller, created_at) "
+            "VALUES (?, 1, ?, ?, ?, ?, ?)",
+            [
+                (1, 1, "Is it still available?", True, False, "2026-01-01 10:00:00"),
+                (2, 2, "Yes", False, False, "2026-01-01 11:00:00"),
+                (3, 1, "x" * 200, False, True, "2026-01-01 12:00:00"),
+            ],
+        )
+
+    _alembic(db_path, "upgrade", "a3c1f7e9d245")
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT conversation_id, user_id, last_message_id, last_message_preview, last_activity_at, unread_count "
+            "FROM conversation_summaries ORDER BY conversation_id, user_id"
+        ).fetchall()
+    assert rows == [
+        (1, 1, 3, "x" * 120, "2026-01-01 12:00:00", 1),
+        # The seller hid the last message: their row shows the one before it
+        (1, 2, 2, "Yes", "2026-01-01 11:00:00", 1),
+        # No messages yet: the conversation's own timestamp
+        (2, 1, None, None, "2026-01-02 10:00:00", 0),
+        (2, 2, None, None, "2026-01-02 10:00:00", 0),
+    ]
@@ -0,0 +1,107 @@
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.models.notification import Notification
+from app.models.outbox_job import OutboxJob
+from app.utils import outbox
+from app.utils.outbox import OUTBOX_MAX_ATTEMPTS, enqueue, job_handler, run_due_jobs
+
+
+@pytest.fixture
+def worker_paused(client):
+    """Stop the app's outbox worker so the test decides when jobs run."""
+    outbox.stop_outbox_worker()
+    outbox._stop.clear()
+    yield
+    outbox.start_outbox_worker()
+
+
+def _jobs_for_message(db, message_id):
+    db.expire_all()
+    return {
+        job.kind: job for job in db.query(OutboxJob).filter(OutboxJob.kind.like("message_%"))
+        if json.loads(job.payload).get("message_id") == message_id
+    }
+
+
+def _reply(client, conversation, headers, text="Yes, still available"):
+    response = client.post(f"/messages/conversations/{conversation['id']}/messages", json={"text": text}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_a_message_commits_its_side_effects_as_jobs(client, db, worker_paused, start_conversation):
+    conversation, buyer, _ = start_conversation()
+    message_id = _reply(client, conversation, buyer)
+
+    jobs = _jobs_for_message(db, message_id)
+    assert set(jobs) == {"message_push", "message_notification", "message_email"}
+    assert json.loads(jobs["message_notification"].payload)["recipient_id"] == conversation["seller_id"]
+
+    run_due_jobs()
+
+    assert _jobs_for_message(db, message_id) == {}
+    notification = db.query(Notification).filter(Notification.recipient_user_id == conversation["seller_id"]).one()
+    assert notification.title == "New message from Test User"
+
+
+def test_no_push_job_for_a_recipient_with_a_socket_open(client, db, worker_paused, start_conversation):
+    conversation, buyer, seller = start_conversation()
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": seller["Authorization"].split()[1]})
+        assert ws.receive_json()["type"] == "ready"
+        message_id = _reply(client, conversation, buyer)
+
+    assert set(_jobs_for_message(db, message_id)) == {"message_notification", "message_email"}
+    run_due_jobs()
+
+
+def test_jobs_are_discarded_with_a_rolled_back_change(db):
+    enqueue(db, "test_discarded", value=1)
+    db.rollback()
+    assert db.query(OutboxJob).filter(OutboxJob.kind == "test_discarded").count() == 0
+
+
+def test_failures_back_off_then_stay_failed(db, worker_paused):
+    calls = []
+
+    @job_handler("test_always_fails")
+    def always_fails(value):
+        calls.append(value)
+        raise ConnectionError("provider down")
+
+    try:
+        enqueue(db, "test_always_fails", value=7)
+        db.commit()
+        job = db.query(OutboxJob).filter(OutboxJob.kind == "test_always_fails").one()
+
+        run_due_jobs()
+        db.refresh(job)
+        run_at = job.run_at if job.run_at.tzinfo else job.run_at.replace(tzinfo=timezone.utc)
+        assert (job.status, job.attempts) == ("pending", 1)
+        assert "provider down" in job.last_error
+        # First retry after 30s; nothing runs before then
+        assert 25 < (run_at - datetime.now(timezone.utc)).total_seconds() <= 30
+        run_due_jobs()
+        assert calls == [7]
+
+        for _ in range(OUTBOX_MAX_ATTEMPTS - 1):
+            job.run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+            db.commit()
+            run_due_jobs()
+            db.refresh(job)
+        assert (job.status, job.attempts) == ("failed", OUTBOX_MAX_ATTEMPTS)
+        assert len(calls) == OUTBOX_MAX_ATTEMPTS
+    finally:
+        outbox._handlers.pop("test_always_fails", None)
+        db.query(OutboxJob).filter(OutboxJob.kind == "test_always_fails").delete()
+        db.commit()
+
+
+def test_outbox_stats_are_admin_only(client, make_user):
+    _, admin = make_user(is_admin=True)
+    _, student = make_user()
+
+    assert client.get("/admin/outbox-stats", headers=student).status_code == 403
+    assert set(client.get("/admin/outbox-stats", headers=admin).json()) == {"pending", "failed", "oldest_pending_at", "worker"}
@@ -0,0 +1,72 @@
+from app.models.user import User
+from app.utils import passwords
+from app.utils.passwords import BCRYPT_ROUNDS, hash_password, verify_and_update
+
+
+def _login(client, email, password):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+
+def _hash_at(rounds: int, password: str) -> str:
+    return passwords._context(rounds).hash(password)
+
+
+def test_hashes_made_in_the_pool_verify_in_the_pool(client):
+    hashed = client.portal.call(hash_password, "correct horse")
+
+    assert hashed.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert client.portal.call(verify_and_update, "correct horse", hashed) == (True, None)
+    assert client.portal.call(verify_and_update, "wrong horse", hashed) == (False, None)
+
+
+def test_login_checks_the_password_and_upgrades_an_outdated_hash(client, db, make_user):
+    email = "upgrade@mail.mcgill.ca"
+    user_id, _ = make_user(email=email, hashed_password=_hash_at(BCRYPT_ROUNDS + 1, "old-cost-password"))
+
+    assert _login(client, email, "not-the-password").status_code == 401
+    assert db.get(User, user_id).hashed_password.startswith(f"$2b${BCRYPT_ROUNDS + 1:02d}$")
+
+    response = _login(client, email, "old-cost-password")
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    new_hash = db.get(User, user_id).hashed_password
+    assert new_hash.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    # ...and the upgraded hash still logs in
+    assert _login(client, email, "old-cost-password").status_code == 200
+
+
+def test_a_changed_password_replaces_the_old_one(client, make_user):
+    email = "changer@mail.mcgill.ca"
+    _, headers = make_user(email=email, hashed_password=_hash_at(BCRYPT_ROUNDS, "first-password"))
+
+    response = client.post(
+        "/auth/change-password",
+        json={"current_password": "first-password", "new_password": "second-password"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert _login(client, email, "first-password").status_code == 401
+    assert _login(client, email, "second-password").status_code == 200
+
+
+def test_logins_beyond_the_pending_limit_are_turned_away(client, make_user, monkeypatch):
+    email = "busy@mail.mcgill.ca"
+    make_user(email=email, hashed_password=_hash_at(BCRYPT_ROUNDS, "password"))
+    rejected = passwords.password_pool_stats()["rejected"]
+    monkeypatch.setattr(passwords, "PASSWORD_MAX_PENDING", 0)
+
+    response = _login(client, email, "password")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert passwords.password_pool_stats()["rejected"] == rejected + 1
+
+
+def test_pool_stats_are_admin_only(client, make_user):
+    _, admin = make_user(is_admin=True)
+    _, student = make_user()
+
+    assert client.get("/admin/password-pool-stats", headers=student).status_code == 403
+    stats = client.get("/admin/password-pool-stats", headers=admin).json()
+    assert stats["workers"] == 1 and stats["bcrypt_rounds"] == BCRYPT_ROUNDS
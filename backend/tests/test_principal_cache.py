@@ -0,0 +1,97 @@
+import pytest
+from jose import jwt
+from sqlalchemy import update
+from app.config import settings
+from app.models.user import User
+from app.utils import principal
+from app.utils.auth import get_password_hash
+from app.utils.push import _forget_tokens
+
+
+def _me(client, headers):
+    return client.get("/auth/me", headers=headers)
+
+
+def _update_behind_the_cache(db, user_id, **values):
+    # A bulk UPDATE, as another process would make it: no session hooks drop the snapshot
+    db.execute(update(User).where(User.id == user_id).values(**values))
+    db.commit()
+
+
+def test_a_snapshot_serves_requests_until_the_user_changes(client, db, make_user):
+    user_id, headers = make_user(name="Before")
+    assert _me(client, headers).json()["name"] == "Before"
+
+    _update_behind_the_cache(db, user_id, name="After")
+    assert _me(client, headers).json()["name"] == "Before"
+
+    principal.invalidate_users(user_id)
+    assert _me(client, headers).json()["name"] == "After"
+
+
+def test_snapshots_leave_out_credentials(client, make_user):
+    user_id, headers = make_user(hashed_password=get_password_hash("secret-password"), verification_token="abc")
+    _me(client, headers)
+
+    values, _ = principal._users[user_id]
+    assert not principal.CREDENTIAL_COLUMNS & set(values)
+
+
+def test_committed_orm_changes_drop_the_snapshot(client, make_user):
+    _, admin = make_user(is_admin=True)
+    user_id, headers = make_user()
+    assert _me(client, headers).status_code == 200
+
+    client.put(f"/admin/users/{user_id}/suspend", headers=admin)
+
+    assert user_id not in principal._users
+    assert _me(client, headers).status_code == 403
+
+
+def test_unregistered_push_tokens_drop_the_snapshot(client, db, make_user):
+    user_id, headers = make_user(push_token="ExponentPushToken[cached-1]")
+    _me(client, headers)
+    assert user_id in principal._users
+
+    _forget_tokens({"ExponentPushToken[cached-1]"})
+
+    assert user_id not in principal._users
+    assert db.get(User, user_id).push_token is None
+
+
+def test_boost_credits_are_spent_from_the_database(client, db, make_user, make_listing):
+    user_id, headers = make_user(boost_credits=0)
+    listing = make_listing(headers)
+    assert _me(client, headers).json()["boost_credits"] == 0
+
+    # A credit granted behind the cache can be spent straight away...
+    _update_behind_the_cache(db, user_id, boost_credits=1)
+    assert client.post(f"/listings/{listing['id']}/boost-free", headers=headers).status_code == 200
+    assert _me(client, headers).json()["boost_credits"] == 0
+
+    # ...and a spent one can't be spent again from a stale snapshot
+    _me(client, headers)
+    assert client.post(f"/listings/{listing['id']}/boost-free", headers=headers).status_code == 400
+    db.expire_all()
+    assert db.get(User, user_id).boost_credits == 0
+
+
+def test_change_password_checks_the_current_hash_not_a_cached_one(client, db, make_user):
+    user_id, headers = make_user(hashed_password=get_password_hash("first-password"))
+    _me(client, headers)
+    _update_behind_the_cache(db, user_id, hashed_password=get_password_hash("second-password"))
+
+    change = {"current_password": "first-password", "new_password": "third-password"}
+    assert client.post("/auth/change-password", json=change, headers=headers).status_code == 400
+
+    change["current_password"] = "second-password"
+    assert client.post("/auth/change-password", json=change, headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-token",
+    jwt.encode({"sub": "nobody@mail.mcgill.ca", "exp": 1}, settings.secret_key, algorithm=settings.algorithm),
+])
+def test_invalid_and_expired_tokens_are_rejected(client, token):
+    assert principal.token_email(token) is None
+    assert _me(client, {"Authorization": f"Bearer {token}"}).status_code == 401
@@ -0,0 +1,137 @@
+import json
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.models.user import User
+from app.utils import push
+from app.utils.push import PUSH_BATCH_SIZE, PushDispatcher
+
+
+class QueuedDispatcher(PushDispatcher):
+    """As if the background thread were running: send() only queues, and tests flush by hand."""
+    running = True
+
+
+class FakeExpo:
+    """Answers the Expo push API; tokens containing "Gone" are reported as DeviceNotRegistered."""
+
+    def __init__(self, failures=()):
+        self.requests = []
+        self.failures = list(failures)  # responses to return (status codes or exceptions) before answering normally
+        self.unregistered_receipts = set()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        self.requests.append((request.url.path.rsplit("/", 1)[1], payload, request.headers))
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return httpx.Response(failure)
+        if request.url.path.endswith("/send"):
+            return httpx.Response(200, json={"data": [
+                {"status": "error", "message": "gone", "details": {"error": "DeviceNotRegistered"}}
+                if "Gone" in message["to"] else {"status": "ok", "id": f"ticket:{message['to']}"}
+                for message in payload
+            ]})
+        return httpx.Response(200, json={"data": {
+            ticket_id: {"status": "error", "details": {"error": "DeviceNotRegistered"}}
+            if ticket_id in self.unregistered_receipts else {"status": "ok"}
+            for ticket_id in payload["ids"]
+        }})
+
+
+@pytest.fixture
+def expo(monkeypatch):
+    # Retries back off with time.sleep; don't actually wait
+    monkeypatch.setattr(push, "time", SimpleNamespace(sleep=lambda seconds: None, monotonic=time.monotonic))
+    return FakeExpo()
+
+
+def _dispatcher(expo, cls=QueuedDispatcher, **kwargs) -> PushDispatcher:
+    dispatcher = cls(api_url="https://push.test/api", **kwargs)
+    dispatcher._client = httpx.Client(headers=dispatcher._headers, transport=httpx.MockTransport(expo))
+    return dispatcher
+
+
+def test_only_expo_tokens_are_queued(expo):
+    dispatcher = _dispatcher(expo)
+    assert dispatcher.send("not-a-token", "t", "b") is False
+    assert dispatcher.send("", "t", "b") is False
+    assert dispatcher.send("ExponentPushToken[a]", "t", "b", data={"conversation_id": 1}) is True
+    assert dispatcher.stats()["queue"] == 1
+
+
+def test_queued_messages_are_sent_in_batches(expo):
+    dispatcher = _dispatcher(expo, access_token="secret")
+    for i in range(PUSH_BATCH_SIZE * 2 + 50):
+        dispatcher.send(f"ExponentPushToken[{i}]", "Title", "Body")
+
+    assert dispatcher.flush() == PUSH_BATCH_SIZE * 2 + 50
+
+    assert [len(payload) for _, payload, _ in expo.requests] == [PUSH_BATCH_SIZE, PUSH_BATCH_SIZE, 50]
+    assert expo.requests[0][2]["authorization"] == "Bearer secret"
+    assert dispatcher.stats()["sent"] == PUSH_BATCH_SIZE * 2 + 50
+    assert dispatcher.stats()["awaiting_receipts"] == PUSH_BATCH_SIZE * 2 + 50
+
+
+def test_without_the_thread_send_goes_out_immediately(expo):
+    dispatcher = _dispatcher(expo, cls=PushDispatcher)
+    dispatcher.send("ExponentPushToken[now]", "t", "b")
+    assert len(expo.requests) == 1
+    assert dispatcher.stats()["queue"] == 0
+
+
+def test_rate_limits_server_errors_and_connection_failures_are_retried(expo):
+    expo.failures = [429, httpx.ConnectError("refused")]
+    dispatcher = _dispatcher(expo)
+    dispatcher.send("ExponentPushToken[retry]", "t", "b")
+    dispatcher.flush()
+
+    assert len(expo.requests) == 3
+    assert dispatcher.stats()["sent"] == 1
+
+
+def test_client_errors_and_exhausted_retries_are_not_retried_further(expo):
+    expo.failures = [400, 503, 503, 503]
+    dispatcher = _dispatcher(expo)
+    dispatcher.send("ExponentPushToken[bad]", "t", "b")
+    dispatcher.flush()
+    dispatcher.send("ExponentPushToken[down]", "t", "b")
+    dispatcher.flush()
+
+    assert len(expo.requests) == 1 + push.PUSH_MAX_ATTEMPTS
+    assert dispatcher.stats()["errors"] == 2
+    assert dispatcher.stats()["sent"] == 0
+
+
+def test_unregistered_devices_lose_their_token(expo, db, make_user):
+    gone_id, _ = make_user(push_token="ExponentPushToken[Gone-1]")
+    kept_id, _ = make_user(push_token="ExponentPushToken[kept-1]")
+    dispatcher = _dispatcher(expo)
+    dispatcher.send("ExponentPushToken[Gone-1]", "t", "b")
+    dispatcher.send("ExponentPushToken[kept-1]", "t", "b")
+
+    dispatcher.flush()
+
+    assert db.get(User, gone_id).push_token is None
+    assert db.get(User, kept_id).push_token == "ExponentPushToken[kept-1]"
+    assert dispatcher.stats()["unregistered"] == 1
+
+
+def test_receipts_are_checked_once_due_and_clear_unregistered_tokens(expo, db, make_user):
+    user_id, _ = make_user(push_token="ExponentPushToken[uninstalled-1]")
+    dispatcher = _dispatcher(expo, receipt_delay=3600)
+    dispatcher.send("ExponentPushToken[uninstalled-1]", "t", "b")
+    dispatcher.send("ExponentPushToken[fine-1]", "t", "b")
+    dispatcher.flush()
+    expo.unregistered_receipts.add("ticket:ExponentPushToken[uninstalled-1]")
+
+    assert dispatcher.check_receipts() == 0
+    assert dispatcher.check_receipts(force=True) == 2
+
+    receipt_requests = [payload for path, payload, _ in expo.requests if path == "getReceipts"]
+    assert len(receipt_requests) == 1 and len(receipt_requests[0]["ids"]) == 2
+    assert db.get(User, user_id).push_token is None
+    assert dispatcher.stats()["awaiting_receipts"] == 0
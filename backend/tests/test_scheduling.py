@@ -0,0 +1,90 @@
+import uuid
+import pytest
+from app.models.job_run import JobRun
+from app.utils import scheduling
+from app.utils.scheduling import _FileLock, _make_lock, is_leader, job_history, leader_job
+
+
+@pytest.fixture
+def job_name():
+    """A job no other test records runs for."""
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def _runs(db, name):
+    return db.query(JobRun).filter(JobRun.job == name).order_by(JobRun.id).all()
+
+
+def test_a_file_lock_is_held_by_one_holder_at_a_time(client, job_name):
+    first, second = _FileLock(job_name), _FileLock(job_name)
+
+    assert first.acquire() and first.acquire()  # re-acquiring a held lock is a no-op
+    assert not second.acquire()
+
+    first.release()
+    assert second.acquire() and second.alive()
+    second.release()
+
+
+def test_the_leader_keeps_the_role_and_others_cannot_take_it(client, db):
+    assert is_leader() and is_leader()
+    assert job_history(db)["leader"] is True
+    assert not _make_lock("scheduler").acquire()
+
+
+def test_runs_are_recorded_with_rows_or_the_error(client, db, job_name):
+    def succeed():
+        return 12
+
+    def fail():
+        raise RuntimeError("upstream unavailable")
+
+    leader_job(job_name, succeed)()
+    leader_job(job_name, fail)()
+
+    succeeded, failed = _runs(db, job_name)
+    assert (succeeded.status, succeeded.rows_processed, succeeded.error) == ("succeeded", 12, None)
+    assert succeeded.worker_id == scheduling.WORKER_ID and succeeded.duration_ms >= 0
+    assert (failed.status, failed.rows_processed) == ("failed", None)
+    assert failed.error == "RuntimeError: upstream unavailable"
+
+
+def test_a_run_still_going_elsewhere_is_not_overlapped(client, db, job_name):
+    calls = []
+    running = _make_lock(f"job:{job_name}")
+    assert running.acquire()
+    try:
+        leader_job(job_name, lambda: calls.append(1))()
+    finally:
+        running.release()
+    assert calls == [] and _runs(db, job_name) == []
+
+    # The lock is released after each run, so the next one goes ahead
+    leader_job(job_name, lambda: calls.append(1))()
+    leader_job(job_name, lambda: calls.append(1))()
+    assert calls == [1, 1] and len(_runs(db, job_name)) == 2
+
+
+def test_workers_that_are_not_the_leader_skip_the_job(client, db, job_name, monkeypatch):
+    calls = []
+    monkeypatch.setattr(scheduling, "is_leader", lambda: False)
+
+    leader_job(job_name, lambda: calls.append(1))()
+
+    assert calls == [] and _runs(db, job_name) == []
+
+
+def test_job_runs_endpoint_summarises_each_job(client, make_user, job_name):
+    _, admin = make_user(is_admin=True)
+    _, student = make_user()
+    leader_job(job_name, lambda: 3)()
+    leader_job(job_name, lambda: 4)()
+    leader_job(job_name, lambda: 1 / 0)()
+
+    assert client.get("/admin/job-runs", headers=student).status_code == 403
+    history = client.get("/admin/job-runs", params={"job": job_name, "limit": 2}, headers=admin).json()
+
+    [summary] = history["jobs"]
+    assert (summary["job"], summary["runs"], summary["failures"], summary["rows_processed"]) == (job_name, 3, 1, 7)
+    assert [run["status"] for run in history["runs"]] == ["failed", "succeeded"]
+    assert history["runs"][0]["error"].startswith("ZeroDivisionError")
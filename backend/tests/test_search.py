@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.models.listing import Listing
+from app.utils import search
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.search import apply_search, fold_accents, search_terms
+
+
+@pytest.fixture
+def seller(make_user):
+    return make_user()[1]
+
+
+def _titles(client, headers, university, search, **params):
+    response = client.get("/listings/", params={"university": university, "search": search, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [listing["title"] for listing in response.json()]
+
+
+def test_search_terms_are_accent_folded_words():
+    assert fold_accents("Chaise Économique") == "chaise economique"
+    assert search_terms("  Vélo & 'road' bike!* ") == ["velo", "road", "bike"]
+    assert search_terms("'&|!:*()") == []
+
+
+def test_search_ignores_accents_and_case(client, university, seller, make_listing):
+    make_listing(seller, title="Chaise économique", description="Une chaise en bois très solide")
+
+    assert _titles(client, seller, university, "economique") == ["Chaise économique"]
+    assert _titles(client, seller, university, "ÉCON") == ["Chaise économique"]
+
+
+def test_every_term_must_match_as_a_prefix(client, university, seller, make_listing):
+    make_listing(seller, title="Calculus textbook", description="Stewart, early transcendentals")
+    make_listing(seller, title="Desk lamp", description="Good for reading calculus at night")
+
+    assert sorted(_titles(client, seller, university, "calc")) == ["Calculus textbook", "Desk lamp"]
+    assert _titles(client, seller, university, "text calc") == ["Calculus textbook"]
+    assert _titles(client, seller, university, "calc chemistry") == []
+
+
+def test_relevance_puts_title_matches_first(client, university, seller, make_listing):
+    make_listing(seller, title="Desk lamp", description="Good for reading calculus at night")
+    make_listing(seller, title="Calculus textbook", description="Stewart, early transcendentals")
+
+    assert _titles(client, seller, university, "calculus", sort="relevance") == ["Calculus textbook", "Desk lamp"]
+
+
+def test_relevance_pages_cover_every_match_once(client, university, seller, make_listing):
+    # Several identical ranks, so the cursor has to get ties right
+    for i in range(5):
+        make_listing(seller, title=f"Calculus notes {i}", description="calculus " * (i % 2 + 1) + "summary sheets")
+
+    ids, cursor = [], None
+    for _ in range(10):
+        params = {"university": university, "search": "calculus", "sort": "relevance", "limit": 2}
+        response = client.get("/listings/", params={**params, **({"cursor": cursor} if cursor else {})}, headers=seller)
+        ids += [listing["id"] for listing in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert len(ids) == 5
+    assert len(set(ids)) == 5
+
+
+def test_postgres_rank_is_a_double_so_cursors_round_trip(db, monkeypatch):
+    # ts_rank_cd is a float4; a float cursor value would not compare equal to it
+    monkeypatch.setattr(search, "_search_backend", lambda db, table_name: "tsvector")
+    _, rank = apply_search(db, db.query(Listing), Listing, "calculus")
+
+    assert str(rank.compile(dialect=postgresql.dialect())).startswith("CAST(ts_rank_cd(")
+    assert str(rank.type.compile(dialect=postgresql.dialect())) == "DOUBLE PRECISION"
+
+
+def test_index_follows_updates_and_deletes(client, university, seller, make_listing):
+    listing = make_listing(seller, title="Desk lamp", description="Adjustable arm, warm light")
+
+    client.put(f"/listings/{listing['id']}", json={"title": "Bright lamp"}, headers=seller)
+    assert _titles(client, seller, university, "bright") == ["Bright lamp"]
+    assert _titles(client, seller, university, "desk") == []
+
+    client.delete(f"/listings/{listing['id']}", headers=seller)
+    assert _titles(client, seller, university, "lamp") == []
+
+
+def test_query_syntax_characters_are_not_an_error(client, university, seller):
+    assert client.get("/listings/", params={"university": university, "search": "'&|!:*()"}, headers=seller).status_code == 200
+
+
+def test_requests_are_searchable(client, seller):
+    response = client.post("/requests/", json={
+        "title": "Looking for a vélo", "description": "Any bike works fine", "category": "Sports"
+    }, headers=seller)
+    assert response.status_code == 201, response.text
+
+    found = client.get("/requests/", params={"search": "velo"}, headers=seller).json()
+    assert [request["title"] for request in found] == ["Looking for a vélo"]
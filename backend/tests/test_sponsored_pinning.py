@@ -0,0 +1,57 @@
+import pytest
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest.fixture
+def catalog(university, make_user, make_listing):
+    """A sponsor's two oldest, priciest Electronics listings, then five regular ones."""
+    _, sponsor = make_user(is_sponsor=True, sponsored_category="Electronics", sponsored_universities=f'["{university}"]')
+    _, seller = make_user()
+    sponsored = [make_listing(sponsor, category="Electronics", price=900 + i)["id"] for i in range(2)]
+    regular = [make_listing(seller, category="Electronics", price=10 + i)["id"] for i in range(5)]
+    return seller, sponsored, regular
+
+
+def _pages(client, headers, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get("/listings/", params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([listing["id"] for listing in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("sort", [None, "oldest", "price_asc", "price_desc"])
+def test_sponsors_lead_the_first_page_of_their_category_for_every_sort(client, university, catalog, sort):
+    headers, sponsored, regular = catalog
+    params = {"university": university, "category": "Electronics", "limit": 3, **({"sort": sort} if sort else {})}
+
+    pages = _pages(client, headers, **params)
+
+    ids = [listing_id for page in pages for listing_id in page]
+    assert sorted(ids[:2]) == sorted(sponsored)
+    assert sorted(ids[2:]) == sorted(regular)
+    assert [len(page) for page in pages] == [3, 3, 1]
+
+
+def test_sponsors_are_not_pinned_outside_their_category(client, university, catalog):
+    headers, sponsored, _ = catalog
+    ids = [listing["id"] for listing in client.get(
+        "/listings/", params={"university": university, "sort": "price_asc"}, headers=headers
+    ).json()]
+    assert ids[-2:] == sponsored
+
+
+def test_a_cursor_from_an_unpinned_view_is_rejected_in_a_pinned_one(client, university, catalog):
+    headers, _, _ = catalog
+    unpinned = client.get("/listings/", params={"university": university, "limit": 2}, headers=headers)
+
+    response = client.get(
+        "/listings/",
+        params={"university": university, "category": "Electronics", "limit": 2,
+                "cursor": unpinned.headers[NEXT_CURSOR_HEADER]},
+        headers=headers,
+    )
+    assert response.status_code == 400
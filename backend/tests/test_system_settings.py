@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+import pytest
+from app.models.system_setting import SystemSetting
+from app.utils import system_settings
+from app.utils.system_settings import (
+    SETTINGS_TTL_SECONDS, get_bool_setting, get_int_setting, get_setting, invalidate_settings, settings_cache_stats,
+)
+
+
+@pytest.fixture
+def settings_rows(db):
+    db.add_all([
+        SystemSetting(key="test_flag", value=" Yes "),
+        SystemSetting(key="test_limit", value="25"),
+        SystemSetting(key="test_bad_limit", value="lots"),
+    ])
+    db.commit()
+    invalidate_settings()
+    yield
+    db.query(SystemSetting).filter(SystemSetting.key.like("test_%")).delete(synchronize_session=False)
+    db.commit()
+    invalidate_settings()
+
+
+def test_typed_lookups(db, settings_rows):
+    assert get_bool_setting(db, "test_flag") is True
+    assert get_bool_setting(db, "test_missing", default=True) is True
+    assert get_int_setting(db, "test_limit") == 25
+    assert get_int_setting(db, "test_bad_limit", default=7) == 7
+    assert get_setting(db, "test_missing") is None
+
+
+def test_lookups_are_served_from_memory_until_invalidated_or_expired(db, settings_rows, monkeypatch):
+    now = [time.monotonic()]
+    monkeypatch.setattr(system_settings, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    get_setting(db, "test_limit")
+    before = settings_cache_stats()
+
+    db.query(SystemSetting).filter(SystemSetting.key == "test_limit").update({"value": "50"})
+    db.commit()
+    assert get_int_setting(db, "test_limit") == 25
+    assert get_int_setting(db, "test_limit") == 25
+    after = settings_cache_stats()
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (2, 0)
+
+    now[0] += SETTINGS_TTL_SECONDS
+    assert get_int_setting(db, "test_limit") == 50
+
+    db.query(SystemSetting).filter(SystemSetting.key == "test_limit").update({"value": "75"})
+    db.commit()
+    invalidate_settings()
+    assert get_int_setting(db, "test_limit") == 75
+
+
+def test_updating_a_setting_applies_to_the_next_browse_request(client, university, make_user, make_listing):
+    _, super_admin = make_user(is_admin=True, is_super_admin=True)
+    # Targeted at this test's university; untargeted sponsors show up at every school
+    _, sponsor = make_user(is_sponsor=True, sponsored_category="Electronics", sponsored_universities=f'["{university}"]')
+    _, seller = make_user()
+    sponsored = make_listing(sponsor, category="Electronics")["id"]
+    regular = make_listing(seller)["id"]
+
+    def first_listing():
+        return client.get("/listings/", params={"university": university}, headers=seller).json()[0]["id"]
+
+    assert first_listing() == regular
+    try:
+        client.put("/admin/settings/sponsored_pins_in_all", json={"value": "true"}, headers=super_admin)
+        assert first_listing() == sponsored
+    finally:
+        client.put("/admin/settings/sponsored_pins_in_all", json={"value": "false"}, headers=super_admin)
+    assert first_listing() == regular
+
+
+def test_cache_stats_are_admin_only(client, make_user):
+    _, admin = make_user(is_admin=True)
+    _, student = make_user()
+
+    assert client.get("/admin/settings/cache-stats", headers=student).status_code == 403
+    assert set(client.get("/admin/settings/cache-stats", headers=admin).json()) == {"hits", "misses", "ttl_seconds"}
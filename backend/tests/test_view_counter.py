@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+import pytest
+from app.models.listing import Listing
+from app.utils import view_counter
+from app.utils.view_counter import VIEW_DEDUPE_WINDOW_SECONDS, flush_views, record_view, view_counter_stats
+
+# Views are also flushed by the scheduler in the background, so these tests check what
+# reaches the database rather than what a particular flush_views() call returned.
+
+
+def _stored_views(db, listing_id: int) -> int:
+    db.expire_all()
+    return db.get(Listing, listing_id).view_count or 0
+
+
+@pytest.fixture
+def listing_id(make_user, make_listing):
+    return make_listing(make_user()[1])["id"]
+
+
+def test_views_are_buffered_then_written_in_one_flush(client, db, make_user, listing_id):
+    viewers = [make_user()[1] for _ in range(3)]
+    before = _stored_views(db, listing_id)
+
+    for headers in viewers:
+        assert client.get(f"/listings/{listing_id}", headers=headers).status_code == 200
+    flush_views()
+
+    assert _stored_views(db, listing_id) == before + 3
+
+
+def test_repeat_views_and_owner_views_are_not_counted(client, db, make_user, make_listing):
+    owner_id, owner = make_user()
+    listing_id = make_listing(owner)["id"]
+    _, viewer = make_user()
+
+    for _ in range(3):
+        client.get(f"/listings/{listing_id}", headers=viewer)
+        client.get(f"/listings/{listing_id}", headers=owner)
+    flush_views()
+
+    assert _stored_views(db, listing_id) == 1
+
+
+def test_a_viewer_counts_again_after_the_dedupe_window(monkeypatch, db, listing_id):
+    now = [50_000.0]
+    monkeypatch.setattr(view_counter, "time", SimpleNamespace(monotonic=lambda: now[0], time=time.time))
+
+    assert record_view(listing_id, viewer_id=10**6) is True
+    assert record_view(listing_id, viewer_id=10**6) is False
+    now[0] += VIEW_DEDUPE_WINDOW_SECONDS
+    assert record_view(listing_id, viewer_id=10**6) is True
+    flush_views()
+
+    assert _stored_views(db, listing_id) == 2
+
+
+def test_a_failed_flush_keeps_the_views_for_the_next_one(monkeypatch, db, listing_id):
+    class BrokenEngine:
+        def begin(self):
+            raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(view_counter, "engine", BrokenEngine())
+    record_view(listing_id, viewer_id=10**6 + 1)
+    errors = view_counter_stats()["flush_errors"]
+
+    assert flush_views() == 0
+    assert view_counter_stats()["flush_errors"] > errors
+    assert view_counter_stats()["buffered"] >= 1
+
+    monkeypatch.undo()
+    flush_views()
+    assert _stored_views(db, listing_id) == 1
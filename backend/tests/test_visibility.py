@@ -0,0 +1,91 @@
+import time
+from types import SimpleNamespace
+from app.models.user_block import UserBlock
+from app.utils import visibility
+from app.utils.visibility import VISIBILITY_TTL_SECONDS
+
+
+def _listing_ids(client, headers, university):
+    response = client.get("/listings/", params={"university": university}, headers=headers)
+    assert response.status_code == 200, response.text
+    return {listing["id"] for listing in response.json()}
+
+
+def test_suspended_sellers_are_hidden_as_soon_as_they_are_suspended(client, university, make_user, make_listing):
+    _, admin = make_user(is_admin=True)
+    seller_id, seller = make_user()
+    _, viewer = make_user()
+    listing = make_listing(seller)
+    assert listing["id"] in _listing_ids(client, viewer, university)
+
+    client.put(f"/admin/users/{seller_id}/suspend", headers=admin)
+    assert listing["id"] not in _listing_ids(client, viewer, university)
+
+    client.put(f"/admin/users/{seller_id}/suspend", headers=admin)
+    assert listing["id"] in _listing_ids(client, viewer, university)
+
+
+def test_blocks_hide_both_users_from_each_other(client, university, make_user, make_listing):
+    blocker_id, blocker = make_user()
+    blocked_id, blocked = make_user()
+    blockers_listing = make_listing(blocker)["id"]
+    blocked_listing = make_listing(blocked)["id"]
+
+    assert client.post(f"/users/{blocked_id}/block", headers=blocker).json()["blocked"] is True
+    assert blocked_listing not in _listing_ids(client, blocker, university)
+    assert blockers_listing not in _listing_ids(client, blocked, university)
+
+    client.post(f"/users/{blocked_id}/block", headers=blocker)
+    assert blocked_listing in _listing_ids(client, blocker, university)
+    assert blockers_listing in _listing_ids(client, blocked, university)
+
+
+def test_blocked_authors_requests_are_hidden(client, make_user):
+    author_id, author = make_user()
+    _, viewer = make_user()
+    created = client.post(
+        "/requests/", json={"title": "Need a desk", "description": "Any size will do", "category": "Furniture"},
+        headers=author,
+    )
+    assert created.status_code == 201, created.text
+    assert created.json()["id"] in {r["id"] for r in client.get("/requests/", headers=viewer).json()}
+
+    client.post(f"/users/{author_id}/block", headers=viewer)
+
+    assert created.json()["id"] not in {r["id"] for r in client.get("/requests/", headers=viewer).json()}
+
+
+def test_changes_made_elsewhere_apply_once_the_cached_set_expires(client, db, university, make_user, make_listing, monkeypatch):
+    now = [time.monotonic()]
+    monkeypatch.setattr(visibility, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    seller_id, seller = make_user()
+    viewer_id, viewer = make_user()
+    listing = make_listing(seller)["id"]
+    assert listing in _listing_ids(client, viewer, university)
+
+    # As another worker would: committed without invalidating this process's cache
+    db.add(UserBlock(blocker_id=viewer_id, blocked_id=seller_id))
+    db.commit()
+    assert listing in _listing_ids(client, viewer, university)
+
+    now[0] += VISIBILITY_TTL_SECONDS
+    assert listing not in _listing_ids(client, viewer, university)
+    # Entries cached at the fake time would otherwise outlive the test
+    visibility.invalidate_suspended()
+    visibility.invalidate_blocks(viewer_id, seller_id)
+
+
+def test_a_block_made_elsewhere_stops_new_conversations_at_once(client, db, make_user, make_listing):
+    seller_id, seller = make_user()
+    buyer_id, buyer = make_user()
+    listing = make_listing(seller)["id"]
+    # Caches the buyer's (empty) block set
+    client.get("/listings/", headers=buyer)
+
+    db.add(UserBlock(blocker_id=seller_id, blocked_id=buyer_id))
+    db.commit()
+
+    response = client.post(
+        "/messages/conversations", json={"listing_id": listing, "initial_message": "Hi there"}, headers=buyer
+    )
+    assert response.status_code == 403
@@ -0,0 +1,124 @@
+import time
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.routers import ws as ws_module
+
+
+def _token(headers) -> str:
+    return headers["Authorization"].split()[1]
+
+
+def _connect(client, headers):
+    """Open an authenticated /ws socket and read past its ready and badges events."""
+    ws = client.websocket_connect("/ws").__enter__()
+    ws.send_json({"type": "auth", "token": _token(headers)})
+    assert ws.receive_json()["type"] == "ready"
+    assert ws.receive_json()["type"] == "badges"
+    return ws
+
+
+def _sync(ws):
+    """Round-trip a ping, so everything sent to this socket before it has been received."""
+    ws.send_json({"type": "ping"})
+    event = ws.receive_json()
+    events = []
+    while event["type"] != "pong":
+        events.append(event)
+        event = ws.receive_json()
+    return events
+
+
+@pytest.fixture
+def sockets(client, start_conversation):
+    conversation, buyer, seller = start_conversation()
+    buyer_ws, seller_ws = _connect(client, buyer), _connect(client, seller)
+    yield conversation["id"], buyer_ws, seller_ws, seller
+    for ws in (buyer_ws, seller_ws):
+        ws.__exit__(None, None, None)
+
+
+def test_an_invalid_token_closes_the_socket(client):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": "not-a-token"})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 4001
+
+
+def test_new_messages_arrive_without_subscribing(client, sockets):
+    conversation_id, buyer_ws, _, seller = sockets
+    client.post(f"/messages/conversations/{conversation_id}/messages", json={"text": "Still available"}, headers=seller)
+
+    event = buyer_ws.receive_json()
+    while event["type"] != "new_message":
+        assert event["type"] in ("badges", "notification")
+        event = buyer_ws.receive_json()
+    assert event["conversation_id"] == conversation_id
+    assert event["message"]["text"] == "Still available"
+
+
+def test_subscribing_requires_being_a_participant(client, sockets, start_conversation):
+    conversation_id, buyer_ws, _, _ = sockets
+    other_conversation = start_conversation()[0]
+
+    buyer_ws.send_json({"type": "subscribe", "conversation_id": conversation_id})
+    assert buyer_ws.receive_json() == {"type": "subscribed", "conversation_id": conversation_id}
+
+    buyer_ws.send_json({"type": "subscribe", "conversation_id": other_conversation["id"]})
+    assert buyer_ws.receive_json()["type"] == "error"
+
+
+def test_typing_only_reaches_subscribed_sockets(client, sockets):
+    conversation_id, buyer_ws, seller_ws, _ = sockets
+
+    def typing_received():
+        # Badge and notification pushes for the opening message may arrive at any point
+        return [event for event in _sync(seller_ws) if event["type"] == "typing"]
+
+    seller_ws.send_json({"type": "subscribe", "conversation_id": conversation_id})
+    assert seller_ws.receive_json()["type"] == "subscribed"
+
+    # Typing is only relayed for conversations the sender has subscribed to
+    buyer_ws.send_json({"type": "typing", "conversation_id": conversation_id})
+    _sync(buyer_ws)
+    assert typing_received() == []
+
+    buyer_ws.send_json({"type": "subscribe", "conversation_id": conversation_id})
+    assert buyer_ws.receive_json()["type"] == "subscribed"
+    buyer_ws.send_json({"type": "typing", "conversation_id": conversation_id})
+    _sync(buyer_ws)
+    assert [event["conversation_id"] for event in typing_received()] == [conversation_id]
+
+    # ...and only to the recipient's sockets subscribed to it
+    seller_ws.send_json({"type": "unsubscribe", "conversation_id": conversation_id})
+    _sync(seller_ws)
+    buyer_ws.send_json({"type": "typing", "conversation_id": conversation_id})
+    _sync(buyer_ws)
+    assert typing_received() == []
+
+
+def test_idle_sockets_are_closed(client, monkeypatch, make_user):
+    monkeypatch.setattr(ws_module, "WS_PING_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(ws_module, "WS_IDLE_TIMEOUT_SECONDS", 0.2)
+    ws = _connect(client, make_user()[1])
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        while True:
+            assert ws.receive_json()["type"] == "ping"
+    assert closed.value.code == 4008
+    ws.__exit__(None, None, None)
+
+
+def test_legacy_per_conversation_socket_still_works(client, start_conversation):
+    conversation, buyer, seller = start_conversation()
+    with client.websocket_connect(f"/ws/conversations/{conversation['id']}") as ws:
+        ws.send_json({"type": "auth", "token": _token(buyer)})
+        # This route sends nothing once authenticated; wait until the socket is registered
+        deadline = time.monotonic() + 5
+        while conversation["buyer_id"] not in ws_module.manager.active_connections and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.post(f"/messages/conversations/{conversation['id']}/messages", json={"text": "Hi"}, headers=seller)
+        event = ws.receive_json()
+        while event["type"] != "new_message":
+            event = ws.receive_json()
+    assert event["message"]["text"] == "Hi"
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pytest
+from app.routers.ws import ConnectionManager, manager
+from app.utils import ws_backplane
+from app.utils.ws_backplane import (
+    PRESENCE_TTL_SECONDS, Backplane, InMemoryBackplane, InMemoryHub, PostgresBackplane, create_backplane,
+)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def _workers(count=2):
+    hub = InMemoryHub()
+    return [ConnectionManager(InMemoryBackplane(hub)) for _ in range(count)]
+
+
+def test_events_reach_sockets_on_other_workers():
+    async def scenario():
+        first, second = _workers()
+        await first.start()
+        await second.start()
+        here, there = FakeSocket(), FakeSocket()
+        await first.register(here, 1)
+        await second.register(there, 1)
+
+        await first.send_to_user(1, {"type": "ping"})
+        # Let the publisher and both connections' writers run
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        await first.stop()
+        await second.stop()
+        return here.sent, there.sent
+
+    here, there = asyncio.run(scenario())
+    # Delivered once on each worker: the publisher skips its own message
+    assert here == [{"type": "ping"}]
+    assert there == [{"type": "ping"}]
+
+
+def test_presence_covers_every_worker_and_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ws_backplane, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    async def scenario():
+        first, second = _workers()
+        socket = FakeSocket()
+        await first.register(socket, 7)
+        seen = [await second.is_online(7), await second.online_users()]
+
+        now[0] += PRESENCE_TTL_SECONDS
+        seen.append(await second.is_online(7))
+        await first.backplane.heartbeat({7})
+        seen.append(await second.is_online(7))
+
+        await first.disconnect(socket, 7)
+        seen.append(await second.is_online(7))
+        return seen
+
+    assert asyncio.run(scenario()) == [True, {7}, False, True, False]
+
+
+class _RecordingEngine:
+    """Collects the pg_notify payloads PostgresBackplane._notify would send."""
+
+    def __init__(self):
+        self.payloads = []
+
+    @contextmanager
+    def begin(self):
+        yield SimpleNamespace(execute=lambda statement, params: self.payloads.append(params["payload"]))
+
+
+def _listener(delivered):
+    backplane = PostgresBackplane(engine=None)
+
+    async def deliver(user_id, payload):
+        delivered.append((user_id, payload))
+    backplane._deliver = deliver
+    return backplane
+
+
+def test_large_notify_events_are_split_and_reassembled():
+    engine = _RecordingEngine()
+    publisher = PostgresBackplane(engine)
+    payload = {"type": "message", "text": "é" * 5000}
+    delivered = []
+
+    async def scenario():
+        listener = _listener(delivered)
+        listener._loop = asyncio.get_running_loop()
+        await publisher.publish(3, payload)
+        for part in engine.payloads:
+            listener._received_part(part)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert len(engine.payloads) > 1
+    assert all(len(part.encode()) < 8000 for part in engine.payloads)
+    assert delivered == [(3, payload)]
+
+
+def test_parts_of_an_event_that_never_completes_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ws_backplane, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    engine = _RecordingEngine()
+    publisher = PostgresBackplane(engine)
+    delivered = []
+
+    async def scenario():
+        listener = _listener(delivered)
+        listener._loop = asyncio.get_running_loop()
+        await publisher.publish(3, {"type": "message", "text": "a" * 5000})
+        # The publisher died after its first part
+        listener._received_part(engine.payloads[0])
+        engine.payloads.clear()
+
+        now[0] += PostgresBackplane.PARTS_TTL_SECONDS + 1
+        await publisher.publish(4, {"type": "message", "text": "b" * 5000})
+        for part in engine.payloads:
+            listener._received_part(part)
+        await asyncio.sleep(0)
+        return listener._parts
+
+    assert asyncio.run(scenario()) == {}
+    assert [user_id for user_id, _ in delivered] == [4]
+
+
+def test_a_worker_ignores_its_own_notifications():
+    engine = _RecordingEngine()
+    delivered = []
+
+    async def scenario():
+        backplane = _listener(delivered)
+        backplane.engine = engine
+        backplane._loop = asyncio.get_running_loop()
+        await backplane.publish(3, {"type": "ping"})
+        backplane._received_part(engine.payloads[0])
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert delivered == []
+
+
+def test_an_incomplete_backend_fails_when_created():
+    class PublishOnly(Backplane):
+        async def publish(self, user_id, payload):
+            pass
+
+    with pytest.raises(TypeError):
+        PublishOnly()
+
+
+@pytest.mark.parametrize("overrides, expected", [
+    ({"ws_backplane": "memory"}, InMemoryBackplane),
+    ({"ws_backplane": "", "redis_url": "", "database_url": "sqlite:///./unicycle.db"}, InMemoryBackplane),
+    ({"ws_backplane": "", "redis_url": "", "database_url": "postgresql://u:p@db/app"}, PostgresBackplane),
+    # Without REDIS_URL there is nothing to connect to; fall back rather than fail at startup
+    ({"ws_backplane": "redis", "redis_url": ""}, InMemoryBackplane),
+])
+def test_backend_choice(monkeypatch, overrides, expected):
+    for name, value in overrides.items():
+        monkeypatch.setattr(ws_backplane.settings, name, value)
+    assert type(create_backplane()) is expected
+
+
+def test_new_messages_reach_the_recipients_socket_on_another_worker(client, start_conversation):
+    conversation, buyer, _ = start_conversation()
+    socket = FakeSocket()
+    other_worker = ConnectionManager(InMemoryBackplane(manager.backplane.hub))
+
+    async def connect():
+        await other_worker.start()
+        await other_worker.register(socket, conversation["seller_id"])
+
+    client.portal.call(connect)
+    try:
+        response = client.post(
+            f"/messages/conversations/{conversation['id']}/messages", json={"text": "Still there?"}, headers=buyer
+        )
+        assert response.status_code == 201, response.text
+        deadline = time.monotonic() + 5
+        while not any(event.get("type") == "new_message" for event in socket.sent) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        client.portal.call(other_worker.stop)
+
+    [event] = [event for event in socket.sent if event.get("type") == "new_message"]
+    assert event["message"]["text"] == "Still there?"
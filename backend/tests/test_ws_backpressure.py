@@ -0,0 +1,172 @@
+import asyncio
+import time
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.routers import ws as ws_module
+from app.routers.ws import WS_IDLE_CLOSE_CODE, WS_SLOW_CONSUMER_CLOSE_CODE, ConnectionManager, manager
+
+
+class FakeSocket:
+    """Records frames; a stalled one never finishes a send."""
+
+    def __init__(self, stalled=False):
+        self.stalled = stalled
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, text):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_a_stalled_socket_does_not_hold_up_the_users_other_sockets():
+    async def scenario():
+        connections = ConnectionManager()
+        stalled, healthy = FakeSocket(stalled=True), FakeSocket()
+        await connections.register(stalled, 1)
+        await connections.register(healthy, 1)
+
+        await asyncio.wait_for(connections.send_to_user(1, {"type": "new_message"}), 1)
+        await _settle()
+        return healthy.sent, connections.stats()
+
+    sent, stats = asyncio.run(scenario())
+    assert sent == ['{"type":"new_message"}']
+    assert stats["connections"] == 2 and stats["queued_frames"] == 0
+
+
+def test_a_full_queue_drops_typing_but_closes_on_anything_else(monkeypatch):
+    monkeypatch.setattr(ws_module, "WS_SEND_QUEUE_SIZE", 2)
+    monkeypatch.setattr(ws_module, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+
+    async def scenario():
+        connections = ConnectionManager()
+        socket = FakeSocket(stalled=True)
+        await connections.register(socket, 1)
+        # The writer takes the first frame and stalls on it; two more fill the queue
+        connections.enqueue(socket, {"type": "notification"})
+        await _settle()
+        for _ in range(2):
+            connections.enqueue(socket, {"type": "notification"})
+
+        assert connections.enqueue(socket, {"type": "typing"}) is False
+        assert socket.close_code is None
+
+        assert connections.enqueue(socket, {"type": "new_message"}) is False
+        # The writer closes once the frame it is stuck on times out
+        await asyncio.sleep(0.2)
+        return socket.close_code, connections.stats(), connections.active_connections
+
+    close_code, stats, active = asyncio.run(scenario())
+    assert close_code == WS_SLOW_CONSUMER_CLOSE_CODE
+    assert stats["slow_consumer_closes"] == 1
+    assert stats["frames_dropped"] >= 2
+    assert active == {}
+
+
+def test_a_send_that_times_out_closes_the_socket(monkeypatch):
+    monkeypatch.setattr(ws_module, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+
+    async def scenario():
+        connections = ConnectionManager()
+        socket = FakeSocket(stalled=True)
+        await connections.register(socket, 1)
+        connections.enqueue(socket, {"type": "badges"})
+        await asyncio.sleep(0.2)
+        return socket.close_code, connections.active_connections
+
+    assert asyncio.run(scenario()) == (WS_SLOW_CONSUMER_CLOSE_CODE, {})
+
+
+def test_closing_waits_for_the_send_in_progress():
+    async def scenario():
+        connections = ConnectionManager()
+        socket = FakeSocket()
+        release = asyncio.Event()
+
+        async def send_text(text):
+            await release.wait()
+            socket.sent.append(text)
+        socket.send_text = send_text
+        await connections.register(socket, 1)
+        connections.enqueue(socket, {"type": "badges"})
+        connections.enqueue(socket, {"type": "notification"})
+        await _settle()
+
+        connections.close(socket, WS_IDLE_CLOSE_CODE)
+        await _settle()
+        # Only the writer touches the socket: no close while a frame is half sent
+        assert socket.close_code is None
+
+        release.set()
+        await _settle()
+        return socket.sent, socket.close_code, connections.active_connections
+
+    sent, close_code, active = asyncio.run(scenario())
+    # The frame being sent completes; the one still queued is dropped
+    assert sent == ['{"type":"badges"}']
+    assert close_code == WS_IDLE_CLOSE_CODE
+    assert active == {}
+
+
+def test_a_slow_client_on_ws_is_closed_with_4009(client, monkeypatch, make_user):
+    monkeypatch.setattr(ws_module, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+    user_id, headers = make_user()
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "auth", "token": headers["Authorization"].split()[1]})
+        assert ws.receive_json()["type"] == "ready"
+        assert ws.receive_json()["type"] == "badges"
+        [server_socket] = manager.active_connections[user_id]
+
+        async def stall(text):
+            await asyncio.Event().wait()
+        monkeypatch.setattr(server_socket, "send_text", stall)
+        client.portal.call(manager.send_to_user, user_id, {"type": "notification"})
+
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == WS_SLOW_CONSUMER_CLOSE_CODE
+
+
+def test_a_slow_client_on_a_conversation_socket_is_closed_with_4009(client, monkeypatch, start_conversation):
+    monkeypatch.setattr(ws_module, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+    conversation, buyer, _ = start_conversation()
+    user_id = conversation["buyer_id"]
+
+    with client.websocket_connect(f"/ws/conversations/{conversation['id']}") as ws:
+        ws.send_json({"type": "auth", "token": buyer["Authorization"].split()[1]})
+        # This route sends nothing once authenticated; wait until the socket is registered
+        deadline = time.monotonic() + 5
+        while user_id not in manager.active_connections and time.monotonic() < deadline:
+            time.sleep(0.01)
+        [server_socket] = manager.active_connections[user_id]
+
+        async def stall(text):
+            await asyncio.Event().wait()
+        monkeypatch.setattr(server_socket, "send_text", stall)
+        client.portal.call(manager.send_to_user, user_id, {"type": "notification"})
+
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+        # A frame arriving after the writer closed the socket ends the receive loop cleanly
+        ws.send_json({"type": "typing"})
+    assert closed.value.code == WS_SLOW_CONSUMER_CLOSE_CODE
+
+
+def test_ws_stats_are_admin_only(client, make_user):
+    _, admin = make_user(is_admin=True)
+    _, student = make_user()
+
+    assert client.get("/admin/ws-stats", headers=student).status_code == 403
+    stats = client.get("/admin/ws-stats", headers=admin).json()
+    assert {"connections", "queued_frames", "frames_dropped", "slow_consumer_closes", "backplane"} <= set(stats)
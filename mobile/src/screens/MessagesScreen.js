@@ -44,6 +44,7 @@ export default function MessagesScreen({ route }) {
     const sendTypingTimeoutRef = useRef(null);
     const flatListRef = useRef(null);
     const wsRef = useRef(null);
+    const selectedConvRef = useRef(null);
 
     const translateMessage = useCallback(async (msgId, text) => {
         if (translatedMessages[msgId]) {
@@ -88,14 +89,8 @@ export default function MessagesScreen({ route }) {
         }
     }, [activeConversation?.messages]);
 
-    // WebSocket for real-time messages
+    // One WebSocket for the whole screen; the open conversation is a subscription on it
     useEffect(() => {
-        if (!selectedConvId || selectedConvId === 'new') {
-            wsRef.current?.close();
-            wsRef.current = null;
-            return;
-        }
-
         let shouldReconnect = true;
         let reconnectDelay = 1000;
         let timeoutId = null;
@@ -103,7 +98,7 @@ export default function MessagesScreen({ route }) {
         const connect = async () => {
             if (!shouldReconnect) return;
             const wsBase = API_BASE_URL.replace(/^http/, 'ws');
-            const ws = new WebSocket(`${wsBase}/ws/conversations/${selectedConvId}`);
+            const ws = new WebSocket(`${wsBase}/ws`);
             wsRef.current = ws;
 
             ws.onopen = async () => {
@@ -115,9 +110,16 @@ export default function MessagesScreen({ route }) {
             ws.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data);
-                    if (data.type === 'new_message') {
+                    if (data.type === 'ready') {
+                        const convId = selectedConvRef.current;
+                        if (convId && convId !== 'new') {
+                            ws.send(JSON.stringify({ type: 'subscribe', conversation_id: convId }));
+                        }
+                    } else if (data.type === 'ping') {
+                        ws.send(JSON.stringify({ type: 'pong' }));
+                    } else if (data.type === 'new_message') {
                         setActiveConversation(prev => {
-                            if (!prev || prev.messages.some(m => m.id === data.message.id)) return prev;
+                            if (!prev || prev.id !== data.conversation_id || prev.messages.some(m => m.id === data.message.id)) return prev;
                             return { ...prev, messages: [...prev.messages, data.message] };
                         });
                         setConversations(prev => prev.map(c =>
@@ -126,6 +128,7 @@ export default function MessagesScreen({ route }) {
                                 : c
                         ));
                     } else if (data.type === 'typing') {
+                        if (data.conversation_id !== selectedConvRef.current) return;
                         setIsOtherTyping(true);
                         clearTimeout(typingTimeoutRef.current);
                         typingTimeoutRef.current = setTimeout(() => setIsOtherTyping(false), 3000);
@@ -157,6 +160,20 @@ export default function MessagesScreen({ route }) {
             wsRef.current?.close();
             wsRef.current = null;
         };
+    }, []);
+
+    // Move the subscription along with the selected conversation
+    useEffect(() => {
+        const previous = selectedConvRef.current;
+        selectedConvRef.current = selectedConvId;
+        const ws = wsRef.current;
+        if (!ws || ws.readyState !== 1) return;
+        if (previous && previous !== 'new' && previous !== selectedConvId) {
+            ws.send(JSON.stringify({ type: 'unsubscribe', conversation_id: previous }));
+        }
+        if (selectedConvId && selectedConvId !== 'new') {
+            ws.send(JSON.stringify({ type: 'subscribe', conversation_id: selectedConvId }));
+        }
     }, [selectedConvId]);
 
     const fetchConversations = async () => {
@@ -191,7 +208,7 @@ export default function MessagesScreen({ route }) {
     const sendTypingEvent = () => {
         if (!wsRef.current || wsRef.current.readyState !== 1) return; // 1 = OPEN
         if (sendTypingTimeoutRef.current) return;
-        wsRef.current.send(JSON.stringify({ type: 'typing' }));
+        wsRef.current.send(JSON.stringify({ type: 'typing', conversation_id: selectedConvId }));
         sendTypingTimeoutRef.current = setTimeout(() => { sendTypingTimeoutRef.current = null; }, 3000);
     };
 
@@ -38,6 +38,7 @@ export default function Messages() {
     const [showArchived, setShowArchived] = useState(false);
     const messagesEndRef = useRef(null);
     const wsRef = useRef(null);
+    const selectedConvRef = useRef(null);
     // Swipe-to-archive on touch devices
     const [swipeConv, setSwipeConv] = useState(null); // { id, offset }
     const convTouchRef = useRef(null); // { id, startX, startY }
@@ -74,14 +75,8 @@ export default function Messages() {
         }
     }, [urlConvId]);
 
-    // WebSocket for real-time messages
+    // One WebSocket for the whole screen; the open conversation is a subscription on it
     useEffect(() => {
-        if (!selectedConvId || selectedConvId === 'new') {
-            wsRef.current?.close();
-            wsRef.current = null;
-            return;
-        }
-
         const token = localStorage.getItem('token');
         const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
         const wsBase = API_URL.replace(/^http/, 'ws');
@@ -91,7 +86,7 @@ export default function Messages() {
         let timeoutId = null;
 
         const connect = () => {
-            const ws = new WebSocket(`${wsBase}/ws/conversations/${selectedConvId}`);
+            const ws = new WebSocket(`${wsBase}/ws`);
             wsRef.current = ws;
 
             ws.onopen = () => {
@@ -102,9 +97,16 @@ export default function Messages() {
             ws.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data);
-                    if (data.type === 'new_message') {
+                    if (data.type === 'ready') {
+                        const convId = selectedConvRef.current;
+                        if (convId && convId !== 'new') {
+                            ws.send(JSON.stringify({ type: 'subscribe', conversation_id: convId }));
+                        }
+                    } else if (data.type === 'ping') {
+                        ws.send(JSON.stringify({ type: 'pong' }));
+                    } else if (data.type === 'new_message') {
                         setActiveConversation(prev => {
-                            if (!prev || prev.messages.some(m => m.id === data.message.id)) return prev;
+                            if (!prev || prev.id !== data.conversation_id || prev.messages.some(m => m.id === data.message.id)) return prev;
                             return { ...prev, messages: [...prev.messages, data.message] };
                         });
                         setConversations(prev => prev.map(c =>
@@ -113,6 +115,7 @@ export default function Messages() {
                                 : c
                         ));
                     } else if (data.type === 'typing') {
+                        if (data.conversation_id !== selectedConvRef.current) return;
                         setIsOtherTyping(true);
                         clearTimeout(typingTimeoutRef.current);
                         typingTimeoutRef.current = setTimeout(() => setIsOtherTyping(false), 3000);
@@ -144,6 +147,20 @@ export default function Messages() {
             wsRef.current?.close();
             wsRef.current = null;
         };
+    }, []);
+
+    // Move the subscription along with the selected conversation
+    useEffect(() => {
+        const previous = selectedConvRef.current;
+        selectedConvRef.current = selectedConvId;
+        const ws = wsRef.current;
+        if (!ws || ws.readyState !== WebSocket.OPEN) return;
+        if (previous && previous !== 'new' && previous !== selectedConvId) {
+            ws.send(JSON.stringify({ type: 'unsubscribe', conversation_id: previous }));
+        }
+        if (selectedConvId && selectedConvId !== 'new') {
+            ws.send(JSON.stringify({ type: 'subscribe', conversation_id: selectedConvId }));
+        }
     }, [selectedConvId]);
 
     const fetchConversations = async () => {
@@ -302,7 +319,7 @@ export default function Messages() {
     const sendTypingEvent = () => {
         if (!wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) return;
         if (sendTypingTimeoutRef.current) return; // debounce: send at most once per 3s
-        wsRef.current.send(JSON.stringify({ type: 'typing' }));
+        wsRef.current.send(JSON.stringify({ type: 'typing', conversation_id: selectedConvId }));
         sendTypingTimeoutRef.current = setTimeout(() => { sendTypingTimeoutRef.current = null; }, 3000);
     };
 